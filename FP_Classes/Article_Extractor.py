@@ -0,0 +1,94 @@
+
+from bs4 import BeautifulSoup, SoupStrainer
+from threading import Lock
+
+# lxml is optional - without it the article body is extracted by BeautifulSoup with a SoupStrainer (see Div_Extractor)
+try: from lxml import html as lxml_html
+except ImportError: lxml_html = None
+
+'''
+Article_Extractor - base class for the rules that extract the body of an article from the HTML of its page
+
+    Every RSS_Article class declares how its body is extracted with the static attribute "extractor" (i.e. BC_Article.extractor is a
+    Div_Extractor for the "articleBody" div). Articles that do not declare one (i.e. articles created from the DB) use the shared
+    Div_Extractor for their articleDiv (see forDiv()).
+
+    A child class only has to implement extract() and set rule, a string that identifies the extraction (the text cached by Page_Cache is
+    keyed by it, so changing the rule extracts the text again).
+'''
+class Article_Extractor:
+
+    rule:str                    # Identifies this extraction rule, i.e. "div.articleBody"
+
+    # STATIC
+    div_extractors:dict = {}    # articleDiv -> shared Div_Extractor (see forDiv())
+    div_extractors_lock:Lock = Lock()
+
+    ''' extract(html) - extract the body of the article from the given page
+        :param html:str|bytes the HTML of the page (bytes are decoded by the parser, using the page's own charset)
+        :return the text of the body, or None if it was not found
+    '''
+    def extract(self, html) -> str: raise NotImplementedError
+
+    ''' forDiv(articleDiv) - get the shared extractor for the div with the given class
+        :param articleDiv:str the class of the div (i.e. RSS_Article.articleDiv)
+        :return Div_Extractor
+    '''
+    @staticmethod
+    def forDiv(articleDiv:str):
+        with Article_Extractor.div_extractors_lock:
+            if articleDiv not in Article_Extractor.div_extractors: Article_Extractor.div_extractors[articleDiv] = Div_Extractor(articleDiv)
+            return Article_Extractor.div_extractors[articleDiv]
+
+'''
+Div_Extractor(Article_Extractor) - extracts the text of the first element with the given tag and class (the same element as
+                                   BeautifulSoup's soup.find(tag, class_=className))
+
+    With lxml, the page is parsed by libxml2 (C) and the element is found with a single XPath query. Bytes are passed to the parser
+    as-is, so they are only decoded once. Without lxml, the page is parsed by html.parser but only the target element is built into a
+    tree (SoupStrainer), which skips building the rest of the page.
+
+    NOTE: the text of <script> and <style> elements is left out, the same as BeautifulSoup's get_text()
+'''
+class Div_Extractor(Article_Extractor):
+
+    tag:str                     # Tag of the element
+    class_name:str              # Class of the element, i.e. "articleBody" or "par parsys"
+    xpath:str                   # XPath query for the element (lxml)
+    strainer:SoupStrainer       # Only builds the element (BeautifulSoup)
+
+    ''' __init__(className, tag) - Constructor
+        :param className:str class of the element (an element with several classes matches if className is one of them, or all of them)
+        :param tag:str [optional] tag of the element
+    '''
+    def __init__(self, className:str, tag:str="div"):
+        self.tag = tag
+        self.class_name = className
+        self.rule = f"{tag}.{className}"
+        self.xpath = f"(//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {' '.join(className.split())} ')])[1]"
+        self.strainer = SoupStrainer(tag, class_=className)
+
+    def extract(self, html) -> str:
+        if lxml_html is not None: return self.__extractLxml__(html)
+
+        soup = BeautifulSoup(html, 'html.parser', parse_only=self.strainer)
+        element = soup.find(self.tag, class_=self.class_name)
+        return element.get_text() if element else None
+
+    ''' __extractLxml__(html) - extract the text of the element with lxml
+        :return the text, or None if the element was not found
+    '''
+    def __extractLxml__(self, html) -> str:
+        if not html: return None
+
+        try: document = lxml_html.document_fromstring(html)
+        except ValueError:
+            # lxml does not accept a str that declares its own encoding (i.e. <?xml version="1.0" encoding="utf-8"?>)
+            document = lxml_html.document_fromstring(html.encode("utf-8"), parser=lxml_html.HTMLParser(encoding="utf-8"))
+        except Exception: return None     # Empty or unparsable page
+
+        elements:list = document.xpath(self.xpath)
+        if not elements: return None
+
+        for e in elements[0].xpath(".//script | .//style"): e.drop_tree()     # Keeps the text after the element
+        return elements[0].text_content()
@@ -0,0 +1,231 @@
+
+from FP_Classes.RSS_Feed import RSS_Feed, RSS_Article
+from FP_Classes.FP_Exceptions.FetchTimeoutError import FetchTimeoutError
+from FP_Classes.Preprocessing_Pool import Preprocessing_Pool
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from time import perf_counter
+import requests
+import pandas as pd
+
+'''
+Fetch_Failure - a record of an article that could not be fetched, so failures can be reviewed after a cycle instead of only printed
+
+    reason is one of: "connect", "read", "total" (the deadline that was exceeded), "feed-budget" (the feed ran out of time before the
+    article was requested), "http" (bad status code), or "error" (anything else)
+'''
+class Fetch_Failure:
+
+    feed_title:str
+    article_title:str
+    article_link:str
+    reason:str
+    elapsed:float
+    message:str
+
+    def __init__(self, feedTitle:str, articleTitle:str, articleLink:str, reason:str, elapsed:float=0.0, message:str=""):
+        self.feed_title = feedTitle
+        self.article_title = articleTitle
+        self.article_link = articleLink
+        self.reason = reason
+        self.elapsed = elapsed
+        self.message = message
+
+    ''' toList() - return this failure in a meaningful list format
+        :return list
+    '''
+    def toList(self) -> list: return [self.feed_title, self.article_title, self.article_link, self.reason, round(self.elapsed, 2), self.message]
+
+'''
+Article_Fetcher - downloads the content for the articles of many RSS feeds at once over a shared pool of keep-alive connections
+
+    Instead of every RSS_Article making its own request (with a fresh connection) when it is created, the feeds are initialized with
+    process=False and then all of the pending article links from every feed are handed to Article_Fetcher.fetchFeeds(). The fetcher:
+
+        1. Downloads the articles using a single requests.Session, which keeps a pool of keep-alive connections for each host
+           (at most maxPerHost connections to any one host at a time)
+        2. Runs at most maxConnections downloads at the same time
+        3. Parses each article as soon as its body arrives (on the calling thread) rather than waiting for all downloads, and hands the
+           content to a Preprocessing_Pool so tokenizing and lemmatizing run on every core while the downloads continue (or preprocesses
+           it on the calling thread if preprocessWorkers is 1 or the pool is not available on this platform)
+
+    Every download is bounded by connect/read/total deadlines (see RSS_Article.__download__), and every feed has a time budget
+    (feedBudget). Once a feed's budget is used up, the rest of its articles are skipped rather than requested, so one slow site cannot
+    hold up the whole cycle. Every article that could not be fetched is recorded in self.failures as a Fetch_Failure.
+
+    NOTE: articles whose download fails are removed from their feed, the same as when RSS_Article.__init__ fails for a feed
+'''
+class Article_Fetcher:
+
+    max_connections:int             # Max number of downloads in flight at the same time
+    max_per_host:int                # Max number of open connections to a single host
+    connect_timeout:float           # Deadline in seconds to connect to a host
+    read_timeout:float              # Deadline in seconds between bytes from a host
+    total_timeout:float             # Deadline in seconds for a whole request
+    feed_budget:float               # Total time in seconds a single feed's articles may take (0 = no budget)
+    preprocess_workers:int          # Number of processes for preprocessing (1 = preprocess on the calling thread)
+    session:requests.Session        # Shared session (connection pool) used for every download
+    failures:list[Fetch_Failure]    # Every article that could not be fetched during the last call to fetchFeeds()
+
+    ''' __init__(maxConnections, maxPerHost, connectTimeout, readTimeout, totalTimeout, feedBudget) - Constructor
+        :param maxConnections:int max number of downloads at the same time (i.e. the "fetch-concurrency" key in config.json)
+        :param maxPerHost:int max number of keep-alive connections per host (i.e. the "fetch-per-host" key in config.json)
+        :param connectTimeout, readTimeout, totalTimeout [optional] deadlines in seconds for each request, default to RSS_Article's
+        :param feedBudget:float [optional] max time in seconds for all of one feed's articles (i.e. the "feed-time-budget" key in config.json)
+        :param preprocessWorkers:int [optional] number of processes for preprocessing, 0 for one per core (i.e. the "preprocess-workers" key in config.json)
+    '''
+    def __init__(self, maxConnections:int=16, maxPerHost:int=4, connectTimeout:float=None, readTimeout:float=None, totalTimeout:float=None, feedBudget:float=0, preprocessWorkers:int=1):
+        self.max_connections = max(1, int(maxConnections))
+        self.max_per_host = max(1, int(maxPerHost))
+        self.connect_timeout = connectTimeout or RSS_Article.connect_timeout
+        self.read_timeout = readTimeout or RSS_Article.read_timeout
+        self.total_timeout = totalTimeout or RSS_Article.total_timeout
+        self.feed_budget = feedBudget
+        self.preprocess_workers = preprocessWorkers
+        self.failures = []
+
+        # pool_block=True makes a worker wait for a free connection to a host rather than opening an extra one
+        adapter = HTTPAdapter(pool_connections=self.max_connections, pool_maxsize=self.max_per_host, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    ''' fetchFeeds(feeds) - get and process the content for all of the unprocessed articles in the given feeds
+        :param feeds a list of RSS_Feed objects (initialized with process=False)
+        :return the number of articles that were processed successfully
+    '''
+    def fetchFeeds(self, feeds:list[RSS_Feed]) -> int:
+
+        # Gather every article from every feed, keeping track of the feed it came from so failed articles can be removed
+        pending:list[tuple[RSS_Feed, RSS_Article]] = [(f, a) for f in feeds for a in f.articles]
+        failed:list[tuple[RSS_Feed, RSS_Article]] = []
+        numDone:int = 0
+        self.failures = []
+
+        print(f"[+] Article_Fetcher: fetching {len(pending)} articles from {len(feeds)} feeds with {self.max_connections} connections")
+        startTime:float = perf_counter()
+
+        # Every feed's budget starts now since all of the downloads are queued at the same time
+        feedDeadlines:dict[str, float] = {}
+        for f in feeds: feedDeadlines[f.feed_title] = startTime + self.feed_budget if self.feed_budget else float("inf")
+
+        # Start the preprocessing workers before the download threads (see Preprocessing_Pool)
+        pool:Preprocessing_Pool = None
+        if self.preprocess_workers != 1 and pending:
+            if Preprocessing_Pool.available(): pool = Preprocessing_Pool(self.preprocess_workers).start()
+            else: print("NOTICE in Article_Fetcher.fetchFeeds(): Preprocessing workers are not available on this platform. Preprocessing on the main thread.")
+
+        # Preprocessing jobs that were sent to the pool -> (feed, article, raw content)
+        jobs:dict = {}
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="fetch") as executor:
+                futures:dict = {}
+
+                for feed, article in pending:
+                    # If a div is not specified the content is not relevant (see Microsoft's implementation for an example)
+                    if not article.articleDiv:
+                        numDone += self.__preprocess__(pool, jobs, feed, article, article.article_title + " " + article.article_desc)
+                        continue
+
+                    futures[executor.submit(self.__fetch__, article.article_link, feedDeadlines[feed.feed_title])] = (feed, article)
+
+                # Parse each article as soon as its body arrives
+                for f in as_completed(futures):
+                    feed, article = futures[f]
+                    try: numDone += self.__preprocess__(pool, jobs, feed, article, article.__extractContent__(f.result()))
+                    except Exception as e:
+                        self.failures.append(Article_Fetcher.__toFailure__(feed, article, e))
+                        failed.append((feed, article))
+
+            # Collect the preprocessed content from the workers
+            for j in as_completed(jobs):
+                feed, article, rawContent = jobs[j]
+                try:
+                    _, tokens, preprocessedContent = j.result()
+                    article.__setProcessedContent__(rawContent, tokens, preprocessedContent)
+                    numDone += 1
+                except Exception as e:
+                    self.failures.append(Article_Fetcher.__toFailure__(feed, article, e))
+                    failed.append((feed, article))
+
+        finally:
+            if pool is not None: pool.shutdown()
+
+        # Remove the articles that failed from their feeds
+        for feed, article in failed: feed.articles.remove(article)
+
+        print(f"[+] Article_Fetcher: {numDone}/{len(pending)} articles processed in {perf_counter() - startTime:.1f}s")
+        if self.failures: print(self.strFailureSummary())
+        return numDone
+
+    ''' strFailureSummary() - return a summary of self.failures grouped by host and reason
+        :return str
+    '''
+    def strFailureSummary(self) -> str:
+        counts:dict[tuple[str, str], int] = {}
+        for f in self.failures:
+            key = (urlparse(f.article_link).netloc, f.reason)
+            counts[key] = counts.get(key, 0) + 1
+
+        s:str = f"NOTICE in Article_Fetcher: {len(self.failures)} articles could not be fetched:"
+        for (host, reason), c in sorted(counts.items(), key=lambda x: x[1], reverse=True): s += f"\n\t{host} | {reason} | {c} articles"
+        return s
+
+    ''' failuresToCSV(pathToFile) - save self.failures to a csv file, appending to the file if it already exists
+        :param pathToFile:str path to the csv file
+        :return False if error, True if success
+    '''
+    def failuresToCSV(self, pathToFile:str) -> bool:
+        columns = ['feed_title', 'article_title', 'article_link', 'reason', 'elapsed', 'message']
+        
+        # If the file already exists, then get the data currently there
+        try: existingDf = pd.read_csv(pathToFile)
+        except FileNotFoundError: existingDf = pd.DataFrame()
+        
+        df = pd.DataFrame([f.toList() for f in self.failures], columns=columns)
+        combined = pd.concat([existingDf, df], ignore_index=True)
+        
+        try: combined.to_csv(pathToFile, index=False)
+        except Exception as e: 
+            print("ERROR in Article_Fetcher.failuresToCSV(): there was an error writing to the csv file. Quitting.")
+            print(e)
+            return False
+        
+        return True
+
+    ''' __preprocess__(pool, jobs, feed, article, rawContent) - preprocess the content for the given article, in the pool if there is one
+        :param pool:Preprocessing_Pool or None to preprocess on the calling thread
+        :param jobs:dict the jobs sent to the pool, the new job is added as Future -> (feed, article, rawContent)
+        :return 1 if the article was preprocessed right away, 0 if it was sent to the pool
+    '''
+    def __preprocess__(self, pool:Preprocessing_Pool, jobs:dict, feed:RSS_Feed, article:RSS_Article, rawContent:str) -> int:
+        if pool is None:
+            article.__processContent__(rawContent)
+            return 1
+
+        jobs[pool.submit(article.article_link, rawContent)] = (feed, article, rawContent)
+        return 0
+
+    ''' __fetch__(link, feedDeadline)- download the HTML for the given link (runs in a worker thread)
+        :param link:str the link to the article
+        :param feedDeadline:float the time (perf_counter) at which this article's feed runs out of budget
+        :return the HTML for the article as a string
+        :raises FetchTimeoutError if the feed is out of budget or the request exceeds one of its deadlines
+    '''
+    def __fetch__(self, link:str, feedDeadline:float) -> str:
+        if perf_counter() >= feedDeadline: raise FetchTimeoutError(link, "feed-budget")
+
+        # Never let a single request run past the end of its feed's budget
+        totalTimeout:float = max(0.001, min(self.total_timeout, feedDeadline - perf_counter()))
+        return RSS_Article.__download__(self.session, link, self.connect_timeout, self.read_timeout, totalTimeout)
+
+    ''' __toFailure__(feed, article, e) - create a Fetch_Failure record from the exception raised while fetching an article
+        :return Fetch_Failure
+    '''
+    @staticmethod
+    def __toFailure__(feed:RSS_Feed, article:RSS_Article, e:Exception) -> Fetch_Failure:
+        if isinstance(e, FetchTimeoutError): return Fetch_Failure(feed.feed_title, article.article_title, article.article_link, e.reason, e.elapsed, str(e))
+        if isinstance(e, requests.exceptions.HTTPError): return Fetch_Failure(feed.feed_title, article.article_title, article.article_link, "http", message=str(e))
+        return Fetch_Failure(feed.feed_title, article.article_title, article.article_link, "error", message=str(e))
@@ -0,0 +1,212 @@
+
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
+from threading import Lock
+from zlib import crc32
+import numpy as np
+import json
+import os
+
+'''
+Duplicate_Index - a MinHash/LSH index of the stored articles for finding near-duplicate articles across feeds (i.e. the same story
+                  from BleepingComputer, HackerNews and the State Department) at ingest time
+
+    Each article is reduced to a MinHash signature of its set of word shingles (every shingle_size consecutive words of the preprocessed
+    token stream, RSS_Article.preprocessed_content): num_perm hash functions h(x) = (a*x + b) mod prime over the crc32 of every shingle,
+    computed for every shingle and every hash function at once with NumPy, and the minimum for each function. The fraction of equal values
+    in two signatures estimates the Jaccard similarity of the shingle sets. Shingles keep the word order, so two articles that only share
+    their vocabulary (i.e. two advisories about different CVEs) are not near-duplicates.
+
+    The signatures are split into bands of rows. Articles with an identical band land in the same bucket, so a lookup only compares
+    against the articles that share a bucket (on average a handful) instead of every stored article. With 16 bands of 8 rows two articles
+    share a bucket with probability ~0.5 at a similarity of ~0.7, and almost certainly at a similarity of 0.8 (the default threshold).
+
+    Articles are identified by the same key as Seen_Article_Index, so an article is never a duplicate of itself. Articles whose content
+    was not found (see RSS_Article.contentFound()) or that have fewer than min_tokens distinct tokens are never checked or indexed - they
+    would all be near-duplicates of each other.
+
+    Files (in the given directory):
+        signatures.npy ... uint32 signatures, one row per article
+        docs.json ........ [key, feed_title, article_title, article_link] for each row
+'''
+class Duplicate_Index:
+
+    threshold:float                 # Min estimated Jaccard similarity for two articles to be near-duplicates
+    signatures:np.ndarray           # uint32 MinHash signature of every article (one row per article)
+    num_signatures:int              # Number of rows of signatures that are used (the array grows in blocks)
+    docs:list[list]                 # [key, feed_title, article_title, article_link] for each row
+    doc_keys:dict[str, int]         # Article key -> row
+    buckets:list[dict[bytes, list[int]]]    # For each band, the band's values -> the rows with those values
+    lock:Lock
+
+    # STATIC
+    num_perm:int = 128              # Number of hash functions (the length of a signature)
+    bands:int = 16                  # Number of LSH bands (num_perm / bands rows each)
+    prime:int = (1 << 31) - 1       # Mersenne prime for the hash functions, so a*x + b fits in a uint64
+    seed:int = 1                    # The hash functions must be the same every run, since the signatures are saved
+    shingle_size:int = 3            # Number of consecutive words in a shingle
+    min_tokens:int = 20             # Min number of distinct tokens for an article to be checked for near-duplicates
+    perm_a:np.ndarray = np.random.RandomState(seed).randint(1, prime, size=num_perm, dtype=np.uint64)
+    perm_b:np.ndarray = np.random.RandomState(seed + 1).randint(0, prime, size=num_perm, dtype=np.uint64)
+
+    def __init__(self, threshold:float=0.8):
+        self.threshold = threshold
+        self.signatures = np.zeros((0, Duplicate_Index.num_perm), dtype=np.uint32)
+        self.num_signatures = 0
+        self.docs = []
+        self.doc_keys = {}
+        self.buckets = [{} for _ in range(Duplicate_Index.bands)]
+        self.lock = Lock()
+
+    ''' filterDuplicates(articles) - split the given (processed) articles into the new articles and the near-duplicates of articles in the
+        index (or of articles earlier in the list), adding the new articles to the index
+        :param articles a list of (processed) RSS_Article
+        :return (list of new articles, list of (duplicate article, [feed_title, article_title, article_link] of the original, similarity))
+    '''
+    def filterDuplicates(self, articles:list) -> tuple[list, list[tuple]]:
+        newArticles:list = []
+        duplicates:list[tuple] = []
+
+        with self.lock:
+            for a in articles:
+                key:str = Seen_Article_Index.articleKey(a.article_link)
+
+                # Articles without enough content (or already in the index) are never duplicates
+                if key in self.doc_keys or not Duplicate_Index.__checkable__(a):
+                    newArticles.append(a)
+                    continue
+
+                signature:np.ndarray = Duplicate_Index.signature(a.preprocessed_content)
+                match:tuple[int, float] = self.__bestMatch__(signature)
+
+                if match is not None:
+                    duplicates.append((a, self.docs[match[0]][1:], match[1]))
+                    continue
+
+                self.__add__(key, [a.feed_title, a.article_title, a.article_link], signature)
+                newArticles.append(a)
+
+        return newArticles, duplicates
+
+    ''' similar(article) - get the articles in the index that are near-duplicates of the given (processed) article
+        :param article an RSS_Article
+        :return a list of ([feed_title, article_title, article_link], similarity), most similar first
+    '''
+    def similar(self, article) -> list[tuple]:
+        if not Duplicate_Index.__checkable__(article): return []
+        key:str = Seen_Article_Index.articleKey(article.article_link)
+        signature:np.ndarray = Duplicate_Index.signature(article.preprocessed_content)
+
+        with self.lock:
+            matches:list[tuple[int, float]] = [m for m in self.__candidates__(signature) if self.docs[m[0]][0] != key]
+            return [(self.docs[row][1:], similarity) for row, similarity in sorted(matches, key=lambda m: m[1], reverse=True)]
+
+    ''' signature(text) - get the MinHash signature of the set of word shingles of the given text
+        :param text:str the preprocessed token stream (i.e. RSS_Article.preprocessed_content)
+        :return a uint32 array of length num_perm
+    '''
+    @staticmethod
+    def signature(text:str) -> np.ndarray:
+        words:list[str] = text.split()
+        n:int = max(1, min(Duplicate_Index.shingle_size, len(words)))
+        shingles = (" ".join(words[i:i + n]).encode() for i in range(max(1, len(words) - n + 1)))
+
+        # A shingle that appears more than once is only counted once (it is a set)
+        x:np.ndarray = np.unique(np.fromiter((crc32(s) for s in shingles), dtype=np.uint64)) % np.uint64(Duplicate_Index.prime)
+
+        # Every hash function for every shingle at once: (shingles x num_perm), then the min of each column
+        hashes:np.ndarray = (np.outer(x, Duplicate_Index.perm_a) + Duplicate_Index.perm_b) % np.uint64(Duplicate_Index.prime)
+        return hashes.min(axis=0).astype(np.uint32)
+
+    ''' save(directory) - save this index to the given directory
+        :param directory:str
+        :return False if error, True if success
+    '''
+    def save(self, directory:str) -> bool:
+        with self.lock: signatures, docs = self.signatures[:self.num_signatures], list(self.docs)
+
+        try:
+            if not os.path.exists(directory): os.makedirs(directory)
+            np.save(os.path.join(directory, "signatures.npy"), signatures)
+            with open(os.path.join(directory, "docs.json"), 'w') as file: json.dump(docs, file)
+        except Exception as e:
+            print(f"ERROR in Duplicate_Index.save(): there was an error writing to \"{directory}\".")
+            print(e)
+            return False
+
+        return True
+
+    ''' load(directory, threshold) - load an index saved with save()
+        :param directory:str
+        :param threshold:float [optional] see __init__()
+        :return a Duplicate_Index, or None if the index does not exist or could not be read
+    '''
+    @staticmethod
+    def load(directory:str, threshold:float=0.8):
+        try:
+            signatures:np.ndarray = np.load(os.path.join(directory, "signatures.npy"))
+            with open(os.path.join(directory, "docs.json")) as file: docs:list[list] = json.load(file)
+        except FileNotFoundError: return None
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Duplicate_Index.load(): there was an error reading \"{directory}\".")
+            print(e)
+            return None
+
+        index = Duplicate_Index(threshold)
+        for doc, signature in zip(docs, signatures): index.__add__(doc[0], doc[1:], signature)
+        return index
+
+    ''' __checkable__(article) - check if the given article has enough content to be checked for near-duplicates
+        :return bool
+    '''
+    @staticmethod
+    def __checkable__(article) -> bool:
+        if not article.contentFound(): return False
+        tokens:dict[str, int] = article.article_tokens
+        return tokens is not None and len(tokens) >= Duplicate_Index.min_tokens
+
+    ''' __add__(key, doc, signature)- add an article's signature to the index and its buckets
+        :return void
+    '''
+    def __add__(self, key:str, doc:list, signature:np.ndarray) -> None:
+        # Grow the array in blocks so adding an article is amortized O(num_perm)
+        if self.num_signatures == len(self.signatures):
+            grown:np.ndarray = np.zeros((max(1024, 2 * len(self.signatures)), Duplicate_Index.num_perm), dtype=np.uint32)
+            grown[:self.num_signatures] = self.signatures[:self.num_signatures]
+            self.signatures = grown
+
+        row:int = self.num_signatures
+        self.signatures[row] = signature
+        self.num_signatures += 1
+        self.docs.append([key] + list(doc))
+        self.doc_keys[key] = row
+
+        for band, bandKey in enumerate(Duplicate_Index.__bandKeys__(signature)): self.buckets[band].setdefault(bandKey, []).append(row)
+
+    ''' __candidates__(signature) - get the rows that share a bucket with the given signature and are near-duplicates of it
+        :return a list of (row, estimated similarity)
+    '''
+    def __candidates__(self, signature:np.ndarray) -> list[tuple[int, float]]:
+        rows:set[int] = set()
+        for band, bandKey in enumerate(Duplicate_Index.__bandKeys__(signature)): rows.update(self.buckets[band].get(bandKey, ()))
+        if not rows: return []
+
+        # Compare with every candidate at once
+        candidates:np.ndarray = np.fromiter(rows, dtype=np.int64)
+        similarities:np.ndarray = (self.signatures[candidates] == signature).mean(axis=1)
+        return [(int(r), round(float(s), 4)) for r, s in zip(candidates, similarities) if s >= self.threshold]
+
+    ''' __bestMatch__(signature) - get the most similar near-duplicate of the given signature
+        :return (row, estimated similarity), or None if there are no near-duplicates
+    '''
+    def __bestMatch__(self, signature:np.ndarray) -> tuple[int, float]:
+        candidates:list[tuple[int, float]] = self.__candidates__(signature)
+        return max(candidates, key=lambda c: c[1]) if candidates else None
+
+    ''' __bandKeys__(signature) - split the given signature into the keys of its LSH bands
+        :return a list of bytes, one per band
+    '''
+    @staticmethod
+    def __bandKeys__(signature:np.ndarray) -> list[bytes]:
+        return [band.tobytes() for band in np.split(np.ascontiguousarray(signature, dtype=np.uint32), Duplicate_Index.bands)]
+
+    def __len__(self) -> int: return self.num_signatures
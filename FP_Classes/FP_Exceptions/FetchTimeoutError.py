@@ -0,0 +1,18 @@
+
+''' FetchTimeoutError - raised when a request for an article takes longer than one of its deadlines 
+
+    :param link:str the link that timed out
+    :param reason:str which deadline was exceeded ("connect", "read", "total", or "feed-budget")
+    :param elapsed:float time in seconds spent on the request before it was stopped
+'''
+class FetchTimeoutError(TimeoutError): 
+    
+    link:str
+    reason:str
+    elapsed:float
+    
+    def __init__(self, link:str, reason:str, elapsed:float=0.0):
+        self.link = link
+        self.reason = reason
+        self.elapsed = elapsed
+        super().__init__(f"Request for \"{link}\" exceeded the {reason} deadline after {elapsed:.1f}s")
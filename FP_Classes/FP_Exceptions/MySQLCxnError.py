@@ -0,0 +1,9 @@
+
+''' MySQLCxnError - raised when a connection to the remote DB cannot be created or borrowed from the pool 
+
+    :param message:str [optional] details about the error
+'''
+class MySQLCxnError(Exception): 
+    
+    def __init__(self, message:str="There was an error initiating the database connection."):
+        super().__init__(message)
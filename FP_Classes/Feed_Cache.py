@@ -0,0 +1,121 @@
+
+import feedparser as fp
+import requests
+import json
+import os
+from hashlib import sha1
+from threading import Lock
+
+'''
+Feed_Cache - a small persistent store of the ETag/Last-Modified headers and body digests for every feed link, so feeds can be polled
+             with conditional requests
+
+    Every RSS_Feed polls its feed link(s) through RSS_Feed.__pollFeed__(), which uses Feed_Cache.poll() when RSS_Feed.feed_cache is set.
+    A poll returns None (nothing changed, skip the entries) when:
+        1. The server responds "304 Not Modified" to the If-None-Match/If-Modified-Since headers, or
+        2. The server ignores the headers but the body has the same sha1 digest as the last time
+
+    New validators are only staged by poll(). They are written to the cache by commit() + save() once the articles for the feed have
+    been stored, so a run that crashes part way through does not mark a feed as "unchanged" before its new articles were saved.
+
+    File format (json):
+        { feed_link: { "etag": str, "modified": str, "digest": str }, ... }
+'''
+class Feed_Cache:
+
+    path:str                            # Path to the json file for this cache
+    entries:dict[str, dict]             # The committed validators for each feed link
+    staged:dict[str, dict]              # Validators from this run's polls that have not been committed yet
+    timeout:tuple[float, float]         # (connect, read) timeout in seconds for polls
+    lock:Lock
+
+    # STATIC
+    headers:dict = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+    }
+
+    ''' __init__(path, timeout) - Constructor, loads the cache from the given path if it exists
+        :param path:str path to the json file for this cache
+        :param timeout:tuple [optional] (connect, read) timeout in seconds for polls
+    '''
+    def __init__(self, path:str, timeout:tuple[float, float]=(5, 15)):
+        self.path = path
+        self.entries = {}
+        self.staged = {}
+        self.timeout = timeout
+        self.lock = Lock()
+
+        try:
+            with open(self.path) as file: self.entries = json.load(file)
+        except FileNotFoundError: pass
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Feed_Cache.__init__(): there was an error reading \"{self.path}\". Starting with an empty cache.")
+            print(e)
+
+    ''' poll(link) - get the given feed link with a conditional request
+        :param link:str the feed link
+        :return a feedparser.FeedParserDict if the feed changed since the last commit, None if it did not
+    '''
+    def poll(self, link:str) -> fp.FeedParserDict:
+        with self.lock: entry:dict = self.entries.get(link, {})
+
+        # Add the validators from the last time we saw this feed
+        headers:dict = dict(Feed_Cache.headers)
+        if entry.get('etag'): headers['If-None-Match'] = entry['etag']
+        if entry.get('modified'): headers['If-Modified-Since'] = entry['modified']
+
+        try:
+            response = requests.get(link, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                print(f"NOTICE in Feed_Cache.poll(): \"{link}\" has not been modified (304). Skipping.")
+                return None
+            response.raise_for_status()
+        except Exception as e:
+            # Fall back to an unconditional parse so a problem with the cache never stops a feed
+            print(f"NON-CRITICAL ERROR in Feed_Cache.poll(): there was an error polling \"{link}\". Falling back to an unconditional request.")
+            print(e)
+            return fp.parse(link)
+
+        # Some servers ignore the validators, so also compare the digest of the body
+        digest:str = sha1(response.content).hexdigest()
+        newEntry:dict = {
+            'etag': response.headers.get('ETag', ''),
+            'modified': response.headers.get('Last-Modified', ''),
+            'digest': digest
+        }
+
+        with self.lock: self.staged[link] = newEntry
+
+        if digest == entry.get('digest'):
+            print(f"NOTICE in Feed_Cache.poll(): \"{link}\" is unchanged since the last run. Skipping.")
+            return None
+
+        # Content-Location lets feedparser resolve relative links the same as when it requests the link itself
+        return fp.parse(response.content, response_headers={
+            'content-location': link,
+            'content-type': response.headers.get('Content-Type', '')
+        })
+
+    ''' commit(links) - commit the staged validators for the given feed links (i.e. after their articles have been stored)
+        :param links:list[str] [optional] the feed links to commit, commits every staged link if not given
+        :return void
+    '''
+    def commit(self, links:list[str]=None) -> None:
+        with self.lock:
+            for l in (list(self.staged.keys()) if links is None else links):
+                if l in self.staged: self.entries[l] = self.staged.pop(l)
+
+    ''' save() - write the committed validators to self.path
+        :return False if error, True if success
+    '''
+    def save(self) -> bool:
+        try:
+            if os.path.dirname(self.path) and not os.path.exists(os.path.dirname(self.path)): os.makedirs(os.path.dirname(self.path))
+            with self.lock:
+                with open(self.path, 'w') as file: json.dump(self.entries, file, indent=4)
+        except Exception as e:
+            print(f"ERROR in Feed_Cache.save(): there was an error writing to \"{self.path}\".")
+            print(e)
+            return False
+
+        return True
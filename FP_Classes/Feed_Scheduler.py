@@ -0,0 +1,84 @@
+
+from FP_Classes.RSS_Feed import RSS_Feed
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import perf_counter
+
+'''
+Feed_Scheduler - runs the constructors for a list of RSS_Feed child classes concurrently using a bounded pool of worker threads
+
+    Every RSS_Feed child class does all of its work (getting the feed, getting the articles, preprocessing the articles) inside of its
+    constructor, which is almost entirely time spent waiting on the network. Running the constructors in a thread pool means a full cycle
+    takes about as long as the slowest feed rather than the sum of all of the feeds.
+
+    Usage:
+        scheduler = Feed_Scheduler(threadLimit=config['thread-limit'])
+        scheduler.addFeed(BleepingComputerRSS, seen_article_titles=[...])
+        allFeeds = scheduler.run()
+
+'''
+class Feed_Scheduler:
+
+    thread_limit:int                    # Max number of feeds to initialize at the same time
+    scheduled:list[tuple[type, dict]]   # List of (feed class, kwargs for the constructor) in the order they were added
+    feed_times:dict[str, float]         # Time in seconds it took to initialize each feed, key = feed class name
+
+    ''' __init__(threadLimit) - Constructor
+        :param threadLimit:int the max number of worker threads (i.e. the "thread-limit" key in config.json)
+    '''
+    def __init__(self, threadLimit:int=8):
+        self.thread_limit = max(1, int(threadLimit))
+        self.scheduled = []
+        self.feed_times = {}
+
+    ''' addFeed(feedClass, **kwargs) - schedule a feed to be initialized when run() is called
+        :param feedClass a child class of RSS_Feed
+        :param kwargs keyword arguments passed to the constructor of feedClass
+        :return void
+    '''
+    def addFeed(self, feedClass:type, **kwargs) -> None:
+        self.scheduled.append((feedClass, kwargs))
+
+    ''' run() - initialize all of the scheduled feeds concurrently
+        :return a list of the RSS_Feed objects that were initialized successfully, in the same order they were added
+
+        NOTE: a feed that raises an exception in its constructor is skipped (with an error message) so that a single
+              broken feed does not stop the rest of the cycle
+    '''
+    def run(self) -> list[RSS_Feed]:
+        if not self.scheduled:
+            print("NOTICE in Feed_Scheduler.run(): No feeds were scheduled. Returning.")
+            return []
+
+        numWorkers:int = min(self.thread_limit, len(self.scheduled))
+        results:list[RSS_Feed] = [None] * len(self.scheduled)
+
+        print(f"[+] Feed_Scheduler: initializing {len(self.scheduled)} feeds with {numWorkers} worker threads")
+        startTime:float = perf_counter()
+
+        with ThreadPoolExecutor(max_workers=numWorkers, thread_name_prefix="feed") as executor:
+            futures:dict = {}
+            for i, (feedClass, kwargs) in enumerate(self.scheduled):
+                futures[executor.submit(Feed_Scheduler.__initFeed__, feedClass, kwargs)] = (i, feedClass)
+
+            for f in as_completed(futures):
+                i, feedClass = futures[f]
+                try:
+                    feed, elapsed = f.result()
+                    results[i] = feed
+                    self.feed_times[feedClass.__name__] = elapsed
+                    print(f"NOTICE in Feed_Scheduler.run(): {feedClass.__name__} finished in {elapsed:.1f}s with {len(feed.articles)} new articles.")
+                except Exception as e:
+                    print(f"ERROR in Feed_Scheduler.run(): There was an error initializing {feedClass.__name__}. Skipping this feed.")
+                    print(e)
+
+        print(f"[+] Feed_Scheduler: all feeds done in {perf_counter() - startTime:.1f}s")
+        return [r for r in results if r is not None]
+
+    ''' __initFeed__(feedClass, kwargs) - initialize a single feed and time it (runs in a worker thread)
+        :return (the RSS_Feed object, elapsed time in seconds)
+    '''
+    @staticmethod
+    def __initFeed__(feedClass:type, kwargs:dict) -> tuple[RSS_Feed, float]:
+        startTime:float = perf_counter()
+        feed:RSS_Feed = feedClass(**kwargs)
+        return feed, perf_counter() - startTime
@@ -1,6 +1,8 @@
 
 import feedparser as  fp
 from FP_Classes.RSS_Feed import RSS_Feed, RSS_Article
+from FP_Classes.Article_Extractor import Article_Extractor, Div_Extractor
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
 from FP_Classes.Tag import Tag
 import requests 
 from bs4 import BeautifulSoup 
@@ -20,9 +22,10 @@ class BleepingComputerRSS(RSS_Feed):
     class BC_Article(RSS_Article): 
 
         BC_ArticleDiv:str = 'articleBody'
+        extractor:Article_Extractor = Div_Extractor(BC_ArticleDiv)
         
-        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str):
-            super().__init__(self.BC_ArticleDiv, BleepingComputerRSS.BC_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc)
+        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str, process:bool=True):
+            super().__init__(self.BC_ArticleDiv, BleepingComputerRSS.BC_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc, process=process)
             
             
     # Attributes for BleepingComputerRSS
@@ -34,24 +37,25 @@ class BleepingComputerRSS(RSS_Feed):
     ''' BleepingComputerRSS.__init__() - constructor for BleepingComputerRSS
         NOTE: upon initialization, the class will automatically grab updated data from the RSS feed
     '''
-    def __init__(self, seen_article_titles:list[str]=[]):
-        super().__init__(self.BC_FolderPath, self.BC_FeedTitle, self.BC_FeedLink, self.BC_FeedDesc)
-        self.__getFeedInfo__(seen_article_titles)
+    def __init__(self, seen_articles:Seen_Article_Index=None, process:bool=True):
+        super().__init__(self.BC_FolderPath, self.BC_FeedTitle, self.BC_FeedLink, self.BC_FeedDesc, process=process)
+        self.__getFeedInfo__(seen_articles)
     
     ''' __getFeedInfo__() - get the info from this feed, including the attributes and articles
         :return void, save the result to this instance of RSS_Feed (self)
     '''
-    def __getFeedInfo__(self, seen_article_titles): 
-        feed:fp.FeedParserDict = fp.parse(self.feed_link)
+    def __getFeedInfo__(self, seen_articles:Seen_Article_Index): 
+        feed:fp.FeedParserDict = self.__pollFeed__(self.feed_link)
+        if feed is None: return     # Nothing has changed since the last run
     
         if len(feed.entries) == 0: 
                 print(f"NON-CRITICAL ERROR for feed \"{self.feed_title}\": No articles were found for this feed. It is possible this IP address is temporarily blocked. Skipping the rest of this feed.")
                 return
         
         for e in feed.entries: 
-            if e.title in seen_article_titles: 
-                print(f"seen title {e.title}")
+            if RSS_Feed.__isSeen__(seen_articles, e.link): 
+                print(f"seen article {e.title}")
                 continue
-            try: self.articles.append(self.BC_Article(e.title, e.link, e.published, e.summary))
+            try: self.articles.append(self.BC_Article(e.title, e.link, e.published, e.summary, process=self.process_articles))
             except: continue
 
@@ -1,6 +1,8 @@
 
 import feedparser as  fp
 from FP_Classes.RSS_Feed import RSS_Feed, RSS_Article
+from FP_Classes.Article_Extractor import Article_Extractor, Div_Extractor
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
 
 '''
 DefenseDeptRSS(RSS_Feed) - a class designed specifically for the Defense Department's RSS feeds, child class of FP_Classes.RSS_Feed
@@ -15,9 +17,10 @@ class DefenseDeptRSS(RSS_Feed):
     class DoDArticle(RSS_Article): 
 
         DoD_ArticleDiv:str = 'content content-wrap'
+        extractor:Article_Extractor = Div_Extractor(DoD_ArticleDiv)
         
-        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str):
-            super().__init__(self.DoD_ArticleDiv, DefenseDeptRSS.DoD_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc)
+        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str, process:bool=True):
+            super().__init__(self.DoD_ArticleDiv, DefenseDeptRSS.DoD_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc, process=process)
                        
     # Attributes for StateDept_DiplomaticSecurityRSS
     DoD_FolderPath = "dod"
@@ -34,28 +37,29 @@ class DefenseDeptRSS(RSS_Feed):
     ''' DefenseDeptRSS.__init__() - constructor 
         NOTE: upon initialization, the class will automatically grab updated data from the RSS feed
     '''
-    def __init__(self, seen_article_titles:list[str]=[]):
-        super().__init__(self.DoD_FolderPath, self.DoD_FeedTitle, self.DoD_Generic_FeedLink, self.DoD_FeedDesc)
-        self.__getFeedInfo__(seen_article_titles)
+    def __init__(self, seen_articles:Seen_Article_Index=None, process:bool=True):
+        super().__init__(self.DoD_FolderPath, self.DoD_FeedTitle, self.DoD_Generic_FeedLink, self.DoD_FeedDesc, process=process)
+        self.__getFeedInfo__(seen_articles)
     
     ''' __getFeedInfo__() - get the info from this feed, including the attributes and articles
         :return void, save the result to this instance of RSS_Feed (self)
     '''
-    def __getFeedInfo__(self, seen_article_titles): 
+    def __getFeedInfo__(self, seen_articles:Seen_Article_Index): 
         i=1
         for l in self.DoD_FeedLinks:
             print(f"\tGetting articles for link {i}/{len(self.DoD_FeedLinks)} | {l}")
             i+=1
-            feed:fp.FeedParserDict = fp.parse(l)
+            feed:fp.FeedParserDict = self.__pollFeed__(l)
+            if feed is None: continue   # Nothing has changed since the last run
             
             if len(feed.entries) == 0: 
                 print(f"\tNON-CRITICAL ERROR for feed \"{self.feed_title}\": No articles were found for this feed. It is possible this IP address is temporarily blocked. Skipping the rest of this feed.")
                 return
         
             for e in feed.entries: 
-                if e.title in seen_article_titles: 
-                    print(f"seen title {e.title}")
+                if RSS_Feed.__isSeen__(seen_articles, e.link): 
+                    print(f"seen article {e.title}")
                     continue
                 desc = str(e.summary)[3:].split('<')[0]
-                try: self.articles.append(self.DoDArticle(e.title, e.link, e.published, desc))
+                try: self.articles.append(self.DoDArticle(e.title, e.link, e.published, desc, process=self.process_articles))
                 except: continue
\ No newline at end of file
@@ -1,6 +1,8 @@
 
 import feedparser as  fp
 from FP_Classes.RSS_Feed import RSS_Feed, RSS_Article
+from FP_Classes.Article_Extractor import Article_Extractor, Div_Extractor
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
 
 '''
 NIST_RSS(RSS_Feed) - a class designed specifically for the NIST's RSS feeds, child class of FP_Classes.RSS_Feed
@@ -16,9 +18,10 @@ class NIST_RSS(RSS_Feed):
     class NIST_Article(RSS_Article): 
 
         NIST_ArticleDiv:str = 'text-with-summary'
+        extractor:Article_Extractor = Div_Extractor(NIST_ArticleDiv)
         
-        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str):
-            super().__init__(self.NIST_ArticleDiv, NIST_RSS.NIST_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc)
+        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str, process:bool=True):
+            super().__init__(self.NIST_ArticleDiv, NIST_RSS.NIST_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc, process=process)
                        
     # Attributes for NVD_RSS
     NIST_FolderPath = "nist"
@@ -33,20 +36,21 @@ class NIST_RSS(RSS_Feed):
     ''' NVD_RSS.__init__() - constructor for NVD_RSS
         NOTE: upon initialization, the class will automatically grab updated data from the RSS feed
     '''
-    def __init__(self, seen_article_titles:list[str]=[]):
-        super().__init__(self.NIST_FolderPath, self.NIST_FeedTitle, self.NIST_Generic_FeedLink, self.NIST_FeedDesc)
-        self.__getFeedInfo__(seen_article_titles)
+    def __init__(self, seen_articles:Seen_Article_Index=None, process:bool=True):
+        super().__init__(self.NIST_FolderPath, self.NIST_FeedTitle, self.NIST_Generic_FeedLink, self.NIST_FeedDesc, process=process)
+        self.__getFeedInfo__(seen_articles)
     
     ''' __getFeedInfo__() - get the info from this feed, including the attributes and articles
         :return void, save the result to this instance of RSS_Feed (self)
     '''
-    def __getFeedInfo__(self, seen_article_titles:list[str]): 
+    def __getFeedInfo__(self, seen_articles:Seen_Article_Index): 
         for l in self.NIST_FeedLinks: 
-            feed:fp.FeedParserDict = fp.parse(l)
+            feed:fp.FeedParserDict = self.__pollFeed__(l)
+            if feed is None: continue   # Nothing has changed since the last run
 
             for e in feed.entries: 
-                if e.title in seen_article_titles: 
-                    print(f"seen title {e.title}")
+                if RSS_Feed.__isSeen__(seen_articles, e.link): 
+                    print(f"seen article {e.title}")
                     continue
-                try: self.articles.append(self.NIST_Article(e.title, e.link, e.published, e.summary))
+                try: self.articles.append(self.NIST_Article(e.title, e.link, e.published, e.summary, process=self.process_articles))
                 except: continue
\ No newline at end of file
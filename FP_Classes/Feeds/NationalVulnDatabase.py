@@ -1,6 +1,8 @@
 
 import feedparser as  fp
 from FP_Classes.RSS_Feed import RSS_Feed, RSS_Article
+from FP_Classes.Article_Extractor import Article_Extractor, Div_Extractor
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
 
 '''
 NVD_RSS(RSS_Feed) - a class designed specifically for the National Vulnerability Database's RSS feeds, child class of FP_Classes.RSS_Feed
@@ -17,9 +19,10 @@ class NVD_RSS(RSS_Feed):
     class NVD_Article(RSS_Article): 
 
         NVD_ArticleDiv:str = 'col-lg-9 col-md-7 col-sm-12'
+        extractor:Article_Extractor = Div_Extractor(NVD_ArticleDiv)
         
-        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str):
-            super().__init__(self.NVD_ArticleDiv, NVD_RSS.NVD_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc)
+        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str, process:bool=True):
+            super().__init__(self.NVD_ArticleDiv, NVD_RSS.NVD_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc, process=process)
                        
     # Attributes for NVD_RSS
     NVD_FolderPath = "nvd"
@@ -30,19 +33,20 @@ class NVD_RSS(RSS_Feed):
     ''' NVD_RSS.__init__() - constructor for NVD_RSS
         NOTE: upon initialization, the class will automatically grab updated data from the RSS feed
     '''
-    def __init__(self, seen_article_titles:list[str]=[]):
-        super().__init__(self.NVD_FolderPath, self.NVD_FeedTitle, self.NVD_FeedLink, self.NVD_FeedDesc)
-        self.__getFeedInfo__(seen_article_titles)
+    def __init__(self, seen_articles:Seen_Article_Index=None, process:bool=True):
+        super().__init__(self.NVD_FolderPath, self.NVD_FeedTitle, self.NVD_FeedLink, self.NVD_FeedDesc, process=process)
+        self.__getFeedInfo__(seen_articles)
     
     ''' __getFeedInfo__() - get the info from this feed, including the attributes and articles
         :return void, save the result to this instance of RSS_Feed (self)
     '''
-    def __getFeedInfo__(self, seen_article_titles:list[str]): 
-        feed:fp.FeedParserDict = fp.parse(self.feed_link)
+    def __getFeedInfo__(self, seen_articles:Seen_Article_Index): 
+        feed:fp.FeedParserDict = self.__pollFeed__(self.feed_link)
+        if feed is None: return     # Nothing has changed since the last run
 
         for e in feed.entries: 
-            if e.title in seen_article_titles: 
-                print(f"seen title {e.title}")
+            if RSS_Feed.__isSeen__(seen_articles, e.link): 
+                print(f"seen article {e.title}")
                 continue
-            try: self.articles.append(self.NVD_Article(e.title, e.link, e.date, e.summary))
+            try: self.articles.append(self.NVD_Article(e.title, e.link, e.date, e.summary, process=self.process_articles))
             except: continue
\ No newline at end of file
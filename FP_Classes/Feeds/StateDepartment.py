@@ -1,6 +1,8 @@
 
 import feedparser as  fp
 from FP_Classes.RSS_Feed import RSS_Feed, RSS_Article
+from FP_Classes.Article_Extractor import Article_Extractor, Div_Extractor
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
 
 '''
 StateDept_Counterterrorism(RSS_Feed) - a class designed specifically for the State Department's Counterterrorism RSS feed, child class of FP_Classes.RSS_Feed
@@ -17,9 +19,10 @@ class StateDeptRSS(RSS_Feed):
     class SDCT_Article(RSS_Article): 
 
         SDCT_ArticleDiv:str = 'entry-content'
+        extractor:Article_Extractor = Div_Extractor(SDCT_ArticleDiv)
         
-        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str):
-            super().__init__(self.SDCT_ArticleDiv, StateDeptRSS.SD_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc)
+        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str, process:bool=True):
+            super().__init__(self.SDCT_ArticleDiv, StateDeptRSS.SD_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc, process=process)
                        
     # Attributes for StateDept_DiplomaticSecurityRSS
     SD_FolderPath = "statedept"
@@ -40,24 +43,25 @@ class StateDeptRSS(RSS_Feed):
     ''' StateDeptRSS.__init__() - constructor 
         NOTE: upon initialization, the class will automatically grab updated data from the RSS feed
     '''
-    def __init__(self, seen_article_titles:list[str]=[]):
-        super().__init__(self.SD_FolderPath, self.SD_FeedTitle, self.SD_Generic_FeedLink, self.SD_FeedDesc)
-        self.__getFeedInfo__(seen_article_titles)
+    def __init__(self, seen_articles:Seen_Article_Index=None, process:bool=True):
+        super().__init__(self.SD_FolderPath, self.SD_FeedTitle, self.SD_Generic_FeedLink, self.SD_FeedDesc, process=process)
+        self.__getFeedInfo__(seen_articles)
     
     ''' __getFeedInfo__() - get the info from this feed, including the attributes and articles
         :return void, save the result to this instance of RSS_Feed (self)
     '''
-    def __getFeedInfo__(self, seen_article_titles:list[str]): 
+    def __getFeedInfo__(self, seen_articles:Seen_Article_Index): 
         i=1
         for l in self.SD_FeedLinks:
             print(f"\tGetting articles for link {i}/{len(self.SD_FeedLinks)} | {l}")
             i+=1
-            feed:fp.FeedParserDict = fp.parse(l)
+            feed:fp.FeedParserDict = self.__pollFeed__(l)
+            if feed is None: continue   # Nothing has changed since the last run
 
             for e in feed.entries: 
-                if e.title in seen_article_titles: 
-                    print(f"seen title {e.title}")
+                if RSS_Feed.__isSeen__(seen_articles, e.link): 
+                    print(f"seen article {e.title}")
                     continue
                 desc = str(e.summary)[3:].split('<')[0]
-                try: self.articles.append(self.SDCT_Article(e.title, e.link, e.published, desc))
+                try: self.articles.append(self.SDCT_Article(e.title, e.link, e.published, desc, process=self.process_articles))
                 except: continue
\ No newline at end of file
@@ -1,6 +1,8 @@
 
 import feedparser as  fp
 from FP_Classes.RSS_Feed import RSS_Feed, RSS_Article
+from FP_Classes.Article_Extractor import Article_Extractor, Div_Extractor
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
 
 '''
 HackerNewsRSS(RSS_Feed) - a class designed specifically for the Hacker News RSS feed, child class of FP_Classes.RSS_Feed
@@ -17,9 +19,10 @@ class HackerNewsRSS(RSS_Feed):
     class HN_Article(RSS_Article): 
 
         HN_ArticleDiv:str = 'available-content'
+        extractor:Article_Extractor = Div_Extractor(HN_ArticleDiv)
         
-        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str):
-            super().__init__(self.HN_ArticleDiv, HackerNewsRSS.HN_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc)
+        def __init__(self, articleTitle:str, articleLink:str, articlePubDate:str, articleDesc:str, process:bool=True):
+            super().__init__(self.HN_ArticleDiv, HackerNewsRSS.HN_FeedTitle, articleTitle, articleLink, articlePubDate=articlePubDate, articleDesc=articleDesc, process=process)
                        
     # Attributes for HackerNewsRSS
     HN_FolderPath = "hackernews"
@@ -30,20 +33,21 @@ class HackerNewsRSS(RSS_Feed):
     ''' HackerNewsRSS.__init__() - constructor for HackerNewsRSS
         NOTE: upon initialization, the class will automatically grab updated data from the RSS feed
     '''
-    def __init__(self, seen_article_titles:list[str]=[]):
-        super().__init__(self.HN_FolderPath, self.HN_FeedTitle, self.HN_FeedLink, self.HN_FeedDesc)
-        self.__getFeedInfo__(seen_article_titles)
+    def __init__(self, seen_articles:Seen_Article_Index=None, process:bool=True):
+        super().__init__(self.HN_FolderPath, self.HN_FeedTitle, self.HN_FeedLink, self.HN_FeedDesc, process=process)
+        self.__getFeedInfo__(seen_articles)
     
     ''' __getFeedInfo__() - get the info from this feed, including the attributes and articles
         :return void, save the result to this instance of RSS_Feed (self)
     '''
-    def __getFeedInfo__(self, seen_article_titles:list[str]): 
-        feed:fp.FeedParserDict = fp.parse(self.feed_link)
+    def __getFeedInfo__(self, seen_articles:Seen_Article_Index): 
+        feed:fp.FeedParserDict = self.__pollFeed__(self.feed_link)
+        if feed is None: return     # Nothing has changed since the last run
         
         for e in feed.entries: 
-            if e.title in seen_article_titles: 
-                print(f"seen title {e.title}")
+            if RSS_Feed.__isSeen__(seen_articles, e.link): 
+                print(f"seen article {e.title}")
                 continue
             published:str = str(e.published).split("+")[0].rstrip()                         # Unique formatting of Hacker News published attribute
-            try: self.articles.append(self.HN_Article(e.title, e.link, published, e.summary))
+            try: self.articles.append(self.HN_Article(e.title, e.link, published, e.summary, process=self.process_articles))
             except: continue
\ No newline at end of file
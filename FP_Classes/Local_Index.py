@@ -0,0 +1,302 @@
+
+from FP_Classes.RSS_Feed import RSS_Article
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
+from enum import Enum
+from heapq import merge
+from math import log, sqrt
+from threading import Lock
+import json
+import os
+
+class QueryOption(Enum):
+    AND:int  = 0
+    OR:int   = 1
+    XOR:int  = 2
+    NAND:int = 3
+
+'''
+Posting_List - the sorted list of (doc_id, freq) postings for a single term, with skip pointers
+
+    Doc ids are assigned in increasing order as articles are added, so appending keeps the list sorted. Skip pointers are every
+    sqrt(n) postings (the usual choice), and let intersect() jump over runs of postings that cannot match.
+'''
+class Posting_List:
+
+    doc_ids:list[int]       # Sorted doc ids of the articles that contain this term
+    freqs:list[int]         # Frequency of the term in each article (same order as doc_ids)
+    skip:int                # Distance between skip pointers
+
+    def __init__(self, docIds:list[int]=None, freqs:list[int]=None):
+        self.doc_ids = docIds or []
+        self.freqs = freqs or []
+        self.__resetSkip__()
+
+    ''' append(docId, freq) - add a posting for a doc id larger than every doc id in this list
+        :return void
+    '''
+    def append(self, docId:int, freq:int) -> None:
+        self.doc_ids.append(docId)
+        self.freqs.append(freq)
+        self.__resetSkip__()
+
+    ''' intersect(docIds) - intersect this posting list with a sorted list of doc ids, using the skip pointers
+        :param docIds:list[int] sorted list of doc ids
+        :return the sorted list of doc ids in both lists
+    '''
+    def intersect(self, docIds:list[int]) -> list[int]:
+        result:list[int] = []
+        i:int = 0
+        j:int = 0
+        mine:list[int] = self.doc_ids
+
+        while i < len(mine) and j < len(docIds):
+            if mine[i] == docIds[j]:
+                result.append(mine[i])
+                i += 1
+                j += 1
+            elif mine[i] < docIds[j]:
+                # Follow the skip pointers as long as they do not pass the other doc id
+                if i % self.skip == 0:
+                    while i + self.skip < len(mine) and mine[i + self.skip] <= docIds[j]: i += self.skip
+                if mine[i] < docIds[j]: i += 1
+            else: j += 1
+
+        return result
+
+    def __resetSkip__(self) -> None: self.skip = max(1, int(sqrt(len(self.doc_ids))))
+
+    def __len__(self) -> int: return len(self.doc_ids)
+
+'''
+Local_Index - a local on-disk inverted index of the articles' tokens (RSS_Article.article_tokens), with ranked (BM25) search
+
+    Searches are answered from memory without a round trip to the DB. The query options are:
+        AND  - articles that contain every term
+        OR   - articles that contain at least one of the terms
+        XOR  - articles that contain exactly one of the terms
+        NAND - articles that do NOT contain every term (ranked by the terms they do contain)
+
+    Articles are identified by the same key as Seen_Article_Index (sha1 of the link) so adding an article twice does nothing. Every
+    article also keeps its article_id in the DB, which is what search() returns. The index is filled from the DB by
+    RSS_DB_Connection.fillLocalIndex() and kept up to date by RSS_DB_Connection.addArticles() / update_index(). Like Seen_Article_Index,
+    the index keeps a high-water mark (the largest article_id it was filled up to) so the next fill only reads the newer rows.
+
+    File format (json):
+        { "high_water_mark": int,
+          "docs": [[key, feed_title, article_title, article_link, article_desc, length, article_id], ...],
+          "postings": { term: [[doc_id, ...], [freq, ...]], ... } }
+    where a doc_id is the article's position in "docs"
+'''
+class Local_Index:
+
+    docs:list[list]                         # [key, feed_title, article_title, article_link, article_desc, length, article_id] for each doc id
+    doc_keys:dict[str, int]                 # Article key -> doc id
+    postings:dict[str, Posting_List]        # Term -> posting list
+    total_length:int                        # Sum of the lengths (number of tokens) of every article
+    high_water_mark:int                     # Largest article_id the index was filled up to (see RSS_DB_Connection.fillLocalIndex())
+    lock:Lock
+
+    # STATIC - BM25 parameters
+    k1:float = 1.5
+    b:float = 0.75
+
+    def __init__(self):
+        self.docs = []
+        self.doc_keys = {}
+        self.postings = {}
+        self.total_length = 0
+        self.high_water_mark = 0
+        self.lock = Lock()
+
+    ''' addArticles(articles, articleIds) - add the given (processed, stored) articles to the index, skipping the articles that are
+        already in it
+        :param articles a list of RSS_Article with article_tokens
+        :param articleIds:dict[str, int] article_link -> article_id in the DB, the articles that are not in it are skipped
+        :return the number of articles added
+    '''
+    def addArticles(self, articles:list[RSS_Article], articleIds:dict[str, int]) -> int:
+        numAdded:int = 0
+
+        with self.lock:
+            for a in articles:
+                key:str = Seen_Article_Index.articleKey(a.article_link)
+                if key in self.doc_keys or a.article_link not in articleIds: continue
+
+                # Articles without any tokens are still added, so the index covers every stored article (see hasArticle())
+                tokens:dict[str, int] = a.article_tokens or {}
+
+                docId:int = len(self.docs)
+                length:int = sum(tokens.values())
+                self.docs.append([key, a.feed_title, a.article_title, a.article_link, a.article_desc, length, articleIds[a.article_link]])
+                self.doc_keys[key] = docId
+                self.total_length += length
+
+                for t, f in tokens.items():
+                    if t not in self.postings: self.postings[t] = Posting_List()
+                    self.postings[t].append(docId, f)
+
+                numAdded += 1
+
+        return numAdded
+
+    ''' search(terms, op, limit) - search the index for the given terms
+        :param terms:list[str] the search terms (they are preprocessed the same way as the article content)
+        :param op:QueryOption [optional] how to combine the terms
+        :param limit:int [optional] max number of results, 0 for all
+        :return a list of (article_id, article_title, article_link, article_desc, score) tuples, best match first
+    '''
+    def search(self, terms:list[str], op:QueryOption=QueryOption.AND, limit:int=0) -> list[tuple]:
+        if not terms:
+            print("Local_Index.search(): Empty set of terms given.")
+            return []
+
+        # Preprocess the query terms the same way as the article content
+        tokens, _ = RSS_Article.__contentPreprocessing__(" ".join(terms))
+        queryTerms:list[str] = list(tokens.keys())
+        if not queryTerms: return []
+
+        with self.lock:
+            lists:list[Posting_List] = [self.postings.get(t, Posting_List()) for t in queryTerms]
+
+            match(op):
+                case QueryOption.AND: docIds = Local_Index.__intersectAll__(lists)
+                case QueryOption.OR: docIds = Local_Index.__union__(lists)
+                case QueryOption.XOR: docIds = Local_Index.__exactlyOne__(lists)
+                case QueryOption.NAND:
+                    allIds = Local_Index.__intersectAll__(lists)
+                    docIds = Local_Index.__difference__(range(len(self.docs)), allIds)
+
+            scores:dict[int, float] = self.__bm25__(queryTerms, docIds)
+
+            ranked:list[int] = sorted(docIds, key=lambda d: scores.get(d, 0.0), reverse=True)
+            if limit: ranked = ranked[:limit]
+
+            return [(self.docs[d][6], self.docs[d][2], self.docs[d][3], self.docs[d][4], round(scores.get(d, 0.0), 4)) for d in ranked]
+
+    ''' hasArticle(link) - check if the article with the given link is in the index
+        :param link:str
+        :return bool
+    '''
+    def hasArticle(self, link:str) -> bool:
+        with self.lock: return Seen_Article_Index.articleKey(link) in self.doc_keys
+
+    ''' save(path) - save this index to the given json file
+        :param path:str path to the json file
+        :return False if error, True if success
+    '''
+    def save(self, path:str) -> bool:
+        with self.lock:
+            data:dict = {'high_water_mark': self.high_water_mark, 'docs': self.docs,
+                         'postings': {t: [p.doc_ids, p.freqs] for t, p in self.postings.items()}}
+
+        try:
+            if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)): os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as file: json.dump(data, file)
+        except Exception as e:
+            print(f"ERROR in Local_Index.save(): there was an error writing to \"{path}\".")
+            print(e)
+            return False
+
+        return True
+
+    ''' load(path) - load an index saved with save()
+        :param path:str path to the json file
+        :return a Local_Index, or None if the file does not exist or could not be read
+    '''
+    @staticmethod
+    def load(path:str):
+        try:
+            with open(path) as file: data:dict = json.load(file)
+        except FileNotFoundError: return None
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Local_Index.load(): there was an error reading \"{path}\".")
+            print(e)
+            return None
+
+        index = Local_Index()
+        index.docs = data.get('docs', [])
+        index.doc_keys = {d[0]: i for i, d in enumerate(index.docs)}
+        index.total_length = sum(d[5] for d in index.docs)
+        index.high_water_mark = int(data.get('high_water_mark', 0))
+        index.postings = {t: Posting_List(p[0], p[1]) for t, p in data.get('postings', {}).items()}
+        return index
+
+    ''' __bm25__(queryTerms, docIds) - score the given docs for the given query terms with BM25
+        :return a dict of doc_id -> score
+    '''
+    def __bm25__(self, queryTerms:list[str], docIds:list[int]) -> dict[int, float]:
+        n:int = len(self.docs)
+        if not n or not docIds: return {}
+
+        avgLength:float = self.total_length / n
+        wanted:set[int] = set(docIds)
+        scores:dict[int, float] = {}
+
+        for t in queryTerms:
+            plist:Posting_List = self.postings.get(t)
+            if not plist: continue
+
+            idf:float = log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for d, f in zip(plist.doc_ids, plist.freqs):
+                if d not in wanted: continue
+                norm:float = Local_Index.k1 * (1 - Local_Index.b + Local_Index.b * self.docs[d][5] / avgLength)
+                scores[d] = scores.get(d, 0.0) + idf * f * (Local_Index.k1 + 1) / (f + norm)
+
+        return scores
+
+    def __len__(self) -> int: return len(self.docs)
+
+    # -------------------------------------------------------------------------------------------------------------- #
+    # STATIC - operations on posting lists
+
+    ''' __intersectAll__(lists) - the doc ids in every one of the given posting lists (shortest lists first)
+        :return sorted list of doc ids
+    '''
+    @staticmethod
+    def __intersectAll__(lists:list[Posting_List]) -> list[int]:
+        if not lists: return []
+        lists = sorted(lists, key=len)
+        result:list[int] = list(lists[0].doc_ids)
+        for p in lists[1:]:
+            if not result: break
+            result = p.intersect(result)
+        return result
+
+    ''' __union__(lists) - the doc ids in at least one of the given posting lists
+        :return sorted list of doc ids
+    '''
+    @staticmethod
+    def __union__(lists:list[Posting_List]) -> list[int]:
+        result:list[int] = []
+        for d in merge(*[p.doc_ids for p in lists]):
+            if not result or result[-1] != d: result.append(d)
+        return result
+
+    ''' __exactlyOne__(lists) - the doc ids in exactly one of the given posting lists
+        :return sorted list of doc ids
+    '''
+    @staticmethod
+    def __exactlyOne__(lists:list[Posting_List]) -> list[int]:
+        result:list[int] = []
+        last:int = -1
+        count:int = 0
+        for d in merge(*[p.doc_ids for p in lists]):
+            if d == last: count += 1
+            else:
+                if count == 1: result.append(last)
+                last, count = d, 1
+        if count == 1: result.append(last)
+        return result
+
+    ''' __difference__(docIds, remove) - the doc ids in docIds that are not in remove (both sorted)
+        :return sorted list of doc ids
+    '''
+    @staticmethod
+    def __difference__(docIds, remove:list[int]) -> list[int]:
+        result:list[int] = []
+        j:int = 0
+        for d in docIds:
+            while j < len(remove) and remove[j] < d: j += 1
+            if j < len(remove) and remove[j] == d: continue
+            result.append(d)
+        return result
@@ -0,0 +1,299 @@
+
+from hashlib import sha1
+from threading import Lock
+from time import time
+import zlib
+import json
+import os
+
+'''
+Page_Cache - a persistent, size-bounded cache of the article pages (HTML) and the text extracted from them, so reruns, backfills and
+             analysis jobs read the pages from disk instead of requesting them from the sites again
+
+    Every RSS_Article downloads its page through RSS_Article.__download__(), which uses the cache when RSS_Article.page_cache is set:
+        1. A page fetched less than ttl seconds ago is returned from disk without a request
+        2. An older page is requested with its ETag/Last-Modified validators - a "304 Not Modified" response refreshes it and the page
+           is returned from disk, anything else replaces it
+    The text extracted from a page (see RSS_Article.__extractContent__()) is cached by the digest of the page and the extraction rule, so
+    it is only extracted again when the page or the rule changes.
+
+    Bodies are content-addressed: each one is stored (zlib compressed) once under the sha1 digest of its content, no matter how many
+    entries point to it. When the stored bodies are bigger than max_bytes, the least recently used entries are evicted (and the bodies
+    no entry points to anymore are deleted) until they fit in 90% of max_bytes.
+
+    Files (in the given directory):
+        index.json ....... { key: entry, ... } as of the last save()
+        journal.jsonl .... [key, entry] (or [key, null] for an evicted entry) for every change since the last save()
+        objects/ ......... the compressed bodies, objects/<first 2 characters of the digest>/<digest>
+
+    Entries:
+        page link ............... { "digest", "size", "encoding", "etag", "modified", "fetched", "accessed" }
+        "text|" + page digest + "|" + rule ... { "digest", "size", "accessed" }
+
+    NOTE: a body is written before its entry is added to the journal, so a run that dies part way through never leaves an entry for a
+          body that is not on disk. The journal is replayed on load and folded into index.json by save().
+'''
+class Page_Cache:
+
+    directory:str                   # Directory the cache is stored in
+    max_bytes:int                   # Max total size of the stored (compressed) bodies
+    ttl:float                       # Time in seconds a page is returned without asking the site whether it changed
+    entries:dict[str, dict]         # key (page link or text key) -> entry
+    objects:dict[str, list[int]]    # body digest -> [number of entries that point to it, size on disk]
+    total_bytes:int                 # Total size of the stored bodies
+    hits:int                        # Number of pages/texts returned from the cache (including revalidated pages)
+    misses:int                      # Number of pages that were downloaded in full and texts that were extracted again
+    lock:Lock
+
+    ''' __init__(directory, maxBytes, ttl) - Constructor, loads the cache from the given directory (creating it if it does not exist)
+        :param directory:str
+        :param maxBytes:int [optional] max total size of the stored bodies (i.e. the "page-cache-max-mb" key in config.json)
+        :param ttl:float [optional] seconds before a page is revalidated with the site (i.e. the "page-cache-ttl" key in config.json)
+    '''
+    def __init__(self, directory:str, maxBytes:int=512 * 2**20, ttl:float=7 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = maxBytes
+        self.ttl = ttl
+        self.entries = {}
+        self.objects = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+        if not os.path.exists(directory): os.makedirs(directory)
+
+        try:
+            with open(self.__path__("index.json")) as file: self.entries = json.load(file)
+        except FileNotFoundError: pass
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Page_Cache.__init__(): there was an error reading the index in \"{directory}\". Starting with an empty cache.")
+            print(e)
+
+        # Replay the changes made since the last save (a partly written last line is ignored)
+        try:
+            with open(self.__path__("journal.jsonl"), encoding='utf-8') as file:
+                for line in file:
+                    if not line.endswith("\n"): break
+                    key, entry = json.loads(line)
+                    if entry is None: self.entries.pop(key, None)
+                    else: self.entries[key] = entry
+        except FileNotFoundError: pass
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Page_Cache.__init__(): there was an error reading the journal in \"{directory}\".")
+            print(e)
+
+        # Count the entries that point to every body (and drop the entries whose body is missing)
+        for key, entry in list(self.entries.items()):
+            if entry['digest'] in self.objects: self.objects[entry['digest']][0] += 1
+            elif os.path.exists(self.__objectPath__(entry['digest'])): self.objects[entry['digest']] = [1, entry['size']]
+            else: del self.entries[key]
+        self.total_bytes = sum(o[1] for o in self.objects.values())
+
+    ''' getPage(link) - get the stored page for the given link if it is fresh (fetched less than ttl seconds ago)
+        :param link:str
+        :return the page as a string, or None if it is not stored or is stale (see validators())
+    '''
+    def getPage(self, link:str) -> str:
+        with self.lock:
+            entry:dict = self.entries.get(link)
+            if entry is None or time() - entry['fetched'] > self.ttl: return None
+
+        return self.__readPage__(link, entry)
+
+    ''' validators(link) - get the headers to revalidate the stored (stale) page for the given link with a conditional request
+        :param link:str
+        :return dict of headers, empty if the page is not stored or the site did not send any validators
+    '''
+    def validators(self, link:str) -> dict:
+        with self.lock: entry:dict = self.entries.get(link, {})
+
+        headers:dict = {}
+        if entry.get('etag'): headers['If-None-Match'] = entry['etag']
+        if entry.get('modified'): headers['If-Modified-Since'] = entry['modified']
+        return headers
+
+    ''' revalidated(link) - get the stored page for the given link after the site responded "304 Not Modified", so it is fresh again
+        :param link:str
+        :return the page as a string, or None if it is not stored anymore
+    '''
+    def revalidated(self, link:str) -> str:
+        with self.lock:
+            entry:dict = self.entries.get(link)
+            if entry is None: return None
+            entry = dict(entry, fetched=time())
+            self.__journal__(link, entry)
+            self.entries[link] = entry
+
+        return self.__readPage__(link, entry)
+
+    ''' putPage(link, content, encoding, headers) - store the page downloaded from the given link
+        :param link:str
+        :param content:bytes the body of the response
+        :param encoding:str the encoding to decode the body with
+        :param headers [optional] the response headers, for the validators
+        :return void
+    '''
+    def putPage(self, link:str, content:bytes, encoding:str, headers:dict=None) -> None:
+        headers = headers or {}
+
+        # Pages the site asks not to store are not cached
+        if "no-store" in headers.get('Cache-Control', ''): return
+
+        with self.lock: self.misses += 1
+        self.__put__(link, content, {
+            'encoding': encoding,
+            'etag': headers.get('ETag', ''),
+            'modified': headers.get('Last-Modified', ''),
+            'fetched': time()
+        })
+
+    ''' getText(html, rule) - get the stored text extracted from the given page with the given extraction rule
+        :param html:str the page
+        :param rule:str a string that identifies how the text was extracted (i.e. the article div)
+        :return the text, or None if it is not stored
+    '''
+    def getText(self, html:str, rule:str) -> str:
+        key:str = Page_Cache.__textKey__(html, rule)
+        with self.lock:
+            entry:dict = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+        content:bytes = self.__readObject__(key, entry)
+        return content.decode('utf-8') if content is not None else None
+
+    ''' putText(html, rule, text) - store the text extracted from the given page with the given extraction rule
+        :return void
+    '''
+    def putText(self, html:str, rule:str, text:str) -> None: self.__put__(Page_Cache.__textKey__(html, rule), text.encode('utf-8'), {})
+
+    ''' save() - fold the journal into index.json (including the access times, for the LRU order on the next run)
+        :return False if error, True if success
+    '''
+    def save(self) -> bool:
+        try:
+            with self.lock:
+                with open(self.__path__("index.json.tmp"), 'w') as file: json.dump(self.entries, file)
+                os.replace(self.__path__("index.json.tmp"), self.__path__("index.json"))
+                open(self.__path__("journal.jsonl"), 'w').close()
+        except Exception as e:
+            print(f"ERROR in Page_Cache.save(): there was an error writing to \"{self.directory}\".")
+            print(e)
+            return False
+
+        return True
+
+    ''' strStats() - return the hit/miss counts and size of this cache as a string
+        :return str
+    '''
+    def strStats(self) -> str:
+        return f"Page_Cache: {self.hits} hits, {self.misses} misses, {len(self.entries)} entries, {self.total_bytes / 2**20:.1f}/{self.max_bytes / 2**20:.0f} MB"
+
+    def __path__(self, fileName:str) -> str: return os.path.join(self.directory, fileName)
+
+    def __objectPath__(self, digest:str) -> str: return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    @staticmethod
+    def __textKey__(html:str, rule:str) -> str: return f"text|{sha1(html.encode('utf-8', errors='replace')).hexdigest()}|{rule}"
+
+    ''' __readPage__(link, entry) - read and decode the stored page for the given entry
+        :return the page as a string, or None if the body could not be read
+    '''
+    def __readPage__(self, link:str, entry:dict) -> str:
+        content:bytes = self.__readObject__(link, entry)
+        return content.decode(entry['encoding'] or "utf-8", errors="replace") if content is not None else None
+
+    ''' __readObject__(key, entry) - read the body for the given entry, marking the entry as used
+        :return the body as bytes, or None if it could not be read (the entry is dropped)
+    '''
+    def __readObject__(self, key:str, entry:dict) -> bytes:
+        try:
+            with open(self.__objectPath__(entry['digest']), 'rb') as file: content:bytes = zlib.decompress(file.read())
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Page_Cache.__readObject__(): there was an error reading the body for \"{key}\". Dropping it.")
+            print(e)
+            with self.lock:
+                self.__remove__(key)
+                self.__journal__(key, None)
+                self.misses += 1
+            return None
+
+        with self.lock:
+            if key in self.entries: self.entries[key]['accessed'] = time()
+            self.hits += 1
+        return content
+
+    ''' __put__(key, content, entry) - store the given body (if it is not stored already) and point the given entry to it
+        :param entry:dict the entry without its digest, size and access time
+        :return void
+    '''
+    def __put__(self, key:str, content:bytes, entry:dict) -> None:
+        digest:str = sha1(content).hexdigest()
+
+        # Compress before taking the lock, so the download threads only wait on each other for the write
+        with self.lock: compressed:bytes = None if digest in self.objects else zlib.compress(content, 6)
+
+        try:
+            with self.lock:
+                if digest not in self.objects:
+                    # Write the body to a temporary file first so a body on disk is always complete
+                    path:str = self.__objectPath__(digest)
+                    if compressed is None: compressed = zlib.compress(content, 6)
+                    if not os.path.exists(os.path.dirname(path)): os.makedirs(os.path.dirname(path))
+                    with open(path + ".tmp", 'wb') as file: file.write(compressed)
+                    os.replace(path + ".tmp", path)
+                    self.objects[digest] = [0, len(compressed)]
+                    self.total_bytes += len(compressed)
+
+                # Point to the new body before the old entry is removed, in case they are the same body
+                self.objects[digest][0] += 1
+                entry = dict(entry, digest=digest, size=self.objects[digest][1], accessed=time())
+                self.__remove__(key)
+                self.entries[key] = entry
+                self.__journal__(key, entry)
+
+                if self.total_bytes > self.max_bytes: self.__evict__()
+
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Page_Cache.__put__(): there was an error storing \"{key}\". It will not be cached.")
+            print(e)
+
+    ''' __evict__() - evict the least recently used entries until the stored bodies fit in 90% of max_bytes (the lock must be held)
+        :return void
+    '''
+    def __evict__(self) -> None:
+        for key in sorted(self.entries, key=lambda k: self.entries[k]['accessed']):
+            if self.total_bytes <= 0.9 * self.max_bytes: break
+            self.__journal__(key, None)
+            self.__remove__(key)
+
+    ''' __remove__(key) - remove the given entry, deleting its body if no other entry points to it (the lock must be held)
+        :return void
+    '''
+    def __remove__(self, key:str) -> None:
+        entry:dict = self.entries.pop(key, None)
+        if entry is None or entry['digest'] not in self.objects: return
+
+        stored:list[int] = self.objects[entry['digest']]
+        stored[0] -= 1
+        if stored[0] > 0: return
+
+        del self.objects[entry['digest']]
+        self.total_bytes -= stored[1]
+        try: os.remove(self.__objectPath__(entry['digest']))
+        except OSError: pass
+
+    ''' __journal__(key, entry) - append a change to the journal (the lock must be held)
+        :param entry:dict the new entry, or None if the entry was evicted
+        :return void
+    '''
+    def __journal__(self, key:str, entry:dict) -> None:
+        try:
+            with open(self.__path__("journal.jsonl"), 'a', encoding='utf-8') as file: file.write(json.dumps([key, entry]) + "\n")
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Page_Cache.__journal__(): there was an error writing to the journal in \"{self.directory}\".")
+            print(e)
+
+    def __len__(self) -> int: return len(self.entries)
@@ -0,0 +1,82 @@
+
+from FP_Classes.Text_Preprocessor import Text_Preprocessor
+from concurrent.futures import ProcessPoolExecutor, Future, as_completed
+import multiprocessing as mp
+import os
+
+''' __initWorker__() - initializer for every worker process, loads the NLTK resources once per worker '''
+def __initWorker__() -> None: Text_Preprocessor.shared()
+
+''' __preprocess__(itemId, text) - preprocess the given text in a worker process
+    :return (itemId, tokens, tokenized text)
+'''
+def __preprocess__(itemId, text:str) -> tuple:
+    tokens, tokenizedText = Text_Preprocessor.shared().process(text)
+    return itemId, tokens, tokenizedText
+
+'''
+Preprocessing_Pool - a pool of worker processes for preprocessing article content (see Text_Preprocessor), so tokenizing and
+                     lemmatizing use every core instead of only the main thread
+
+    Items are (id, text) pairs, where the id is anything that identifies the text to the caller (i.e. an article_id or an index into a
+    list of articles). Results are (id, tokens, tokenized text), streamed back in the order they finish.
+
+        with Preprocessing_Pool(workers) as pool:
+            for itemId, tokens, text in pool.imap(items): ...
+
+    NOTE: the workers are forked so they do not re-run main.py (which has no __main__ guard). Where fork is not available (Windows)
+          Preprocessing_Pool.available() is False and the caller should preprocess inline instead. The pool is started by start() (or
+          "with"), which should be before any other threads are started since a forked process only gets a copy of the calling thread.
+'''
+class Preprocessing_Pool:
+
+    workers:int                         # Number of worker processes
+    executor:ProcessPoolExecutor
+
+    ''' __init__(workers) - Constructor
+        :param workers:int [optional] number of worker processes, defaults to the number of cores
+    '''
+    def __init__(self, workers:int=0):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.executor = None
+
+    ''' start() - start the worker processes and wait until they are ready
+        :return self
+    '''
+    def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context("fork"), initializer=__initWorker__)
+            self.executor.submit(__preprocess__, None, "").result()     # Forks every worker (see ProcessPoolExecutor with "fork")
+        return self
+
+    ''' submit(itemId, text) - preprocess the given text in one of the workers
+        :return a Future for (itemId, tokens, tokenized text)
+    '''
+    def submit(self, itemId, text:str) -> Future:
+        self.start()
+        return self.executor.submit(__preprocess__, itemId, text)
+
+    ''' imap(items) - preprocess every (id, text) pair in items
+        :param items an iterable of (id, text)
+        :return a generator of (id, tokens, tokenized text), in the order they finish
+    '''
+    def imap(self, items):
+        futures:list[Future] = [self.submit(itemId, text) for itemId, text in items]
+        for f in as_completed(futures): yield f.result()
+
+    ''' shutdown() - stop the worker processes
+        :return void
+    '''
+    def shutdown(self) -> None:
+        if self.executor is not None: self.executor.shutdown()
+        self.executor = None
+
+    def __enter__(self): return self.start()
+
+    def __exit__(self, *args) -> None: self.shutdown()
+
+    ''' available() - check if the pool can be used on this platform
+        :return True if worker processes can be forked, False if not
+    '''
+    @staticmethod
+    def available() -> bool: return "fork" in mp.get_all_start_methods()
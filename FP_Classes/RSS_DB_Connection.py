@@ -1,27 +1,46 @@
 ''' 
 --> QUICK GUIDE TO THE FUNCTIONS RSS_DB_Connection 
 
+    CONNECTIONS:
+        connection() ......... borrow a (cxn, cursor) from the connection pool, i.e. "with self.connection() as (cxn, cursor):"
+                               the connection is returned to the pool at the end of the with block
+
     RETRIEVING INFORMATION FROM THE REMOTE DB: 
         getAllFeeds() ........ get a list of all feed titles from the databse
         getAllTags() ......... get a list of all tags (as objects) from the database
+        getTagTablesChecksum() ... get the checksum of the TAG and TAG_IN_SET tables (to tell if the tags changed)
         getAllArticles() ..... get a list of all articles (as objects) from the database
+        iterArticles() ....... iterate over all articles (as objects) from the database one at a time (constant memory)
+        iterArticlesForTags() ... iterate over the articles with any of the given tags one at a time (constant memory)
+        getSeenArticleIndex() ... get the index of the links of all stored articles (loaded once, updated by addArticles())
+        fillLocalIndex(index) ... add the stored articles that are missing from a Local_Index (so query_articles() can use it)
 
     SENDING NEW INFORMATION TO THE REMOTE DB
         addFeed(feed:RSS_Feed) ................................. add a feed to the database
         updateArticles(rssFeedTitle:str) ....................... update the articles for the given feed. Assumes feed exists in the database with the given title
         addTagsToArticle(article:Article, tagList:list[Tag]) ... add a list of tags to the given article
+        addArticleTopics(assignments:list[tuple]) .............. add (or replace) the topic assigned to each of the given articles (see Online_LDA_Clustering)
+                                                                 in TOPIC_FOR_ARTICLE, which is created the first time if it does not exist
         newTagsFromExcel(pathToFile:str) ....................... add the tags from the given excel file to the DB, ignoring duplicates
         newTagSetsFromExcel(pathToFile:str)..................... add new tag sets from the given excel file to the DB, ignoring duplicates
         
 '''
 
 import mysql.connector as mysql
+from mysql.connector import pooling
 import pandas as pd
 from FP_Classes.RSS_Feed import RSS_Feed
 from FP_Classes.RSS_Feed import RSS_Article
 from FP_Classes.Tag import Tag 
+from FP_Classes.Tag_Matcher import Tag_Matcher
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
+from FP_Classes.Local_Index import Local_Index, QueryOption
+from FP_Classes.Related_Index import Related_Index
+from FP_Classes.Text_Preprocessor import Text_Preprocessor
 from hashlib import sha1
-from enum import Enum
+from contextlib import contextmanager
+from threading import Lock
+from time import sleep, perf_counter
 
 from FP_Classes.Feeds.BleepingComputer import BleepingComputerRSS
 from FP_Classes.Feeds.Censys import CensysRSS
@@ -36,18 +55,21 @@ from FP_Classes.FP_Exceptions.MySQLCxnError import MySQLCxnError
 
 
 
-class QueryOption(Enum):
-    AND:int  = 0
-    OR:int   = 1
-    XOR:int  = 2
-    NAND:int = 3
-    
 class RSS_DB_Connection: 
     
     username:str
     password:str
     host:str
     database:str 
+    seen_index:Seen_Article_Index   # Index of the links of the stored articles, loaded by getSeenArticleIndex()
+    local_index:Local_Index         # [optional] Local inverted index used by query_articles() instead of the DB (see fillLocalIndex())
+    related_index:Related_Index     # [optional] Related articles index, updated with the articles stored by addArticles() and update_index()
+    pool_size:int                   # Max number of open connections to the DB
+    pool:pooling.MySQLConnectionPool
+    pool_lock:Lock
+    batch_size:int                  # Max number of rows written by a single executemany() chunk (see __bulkWrite__)
+    max_retries:int                 # Max number of attempts for each chunk before it is given up on
+    topic_table_ready:bool          # Whether TOPIC_FOR_ARTICLE was created/checked by this connection (see __createTopicTable__)
 
     # STATIC
     
@@ -67,80 +89,285 @@ class RSS_DB_Connection:
         HackerNewsRSS.HN_FeedTitle: HackerNewsRSS.HN_Article.HN_ArticleDiv                # HackerNews
     }
     
-    def __init__(self, username:str, password:str, host:str):
+    borrow_timeout:float = 30       # Max time in seconds to wait for a free connection in the pool
+    max_batch_bytes:int = 4 * 1024 * 1024   # Max (approximate) size of a single chunk, kept under the server's max_allowed_packet
+
+    # Parameterized insert statements for the bulk writer
+    article_insert:str = "INSERT IGNORE INTO ARTICLE(feed_title, article_title, article_link, pub_date, article_desc, article_content) VALUES (%s, %s, %s, %s, %s, %s)"
+    article_no_content_insert:str = "INSERT IGNORE INTO ARTICLE(feed_title, article_title, article_link, pub_date, article_desc) VALUES (%s, %s, %s, %s, %s)"
+    tag_for_article_insert:str = "INSERT IGNORE INTO TAG_FOR_ARTICLE(id, article_title, tag_name) VALUES (%s, %s, %s)"
+    inverted_index_insert:str = "INSERT IGNORE INTO INVERTED_INDEX(term, article_id, freq) VALUES (%s, %s, %s)"
+    # TOPIC_FOR_ARTICLE holds the latest topic (see Online_LDA_Clustering) of each article. It is newer than the rest of the schema, so it
+    # is created by addArticleTopics() if it does not exist. There is no FOREIGN KEY so it does not depend on the exact type of ARTICLE.article_id
+    topic_for_article_ddl:str = """CREATE TABLE IF NOT EXISTS TOPIC_FOR_ARTICLE(
+                                       article_id INT NOT NULL PRIMARY KEY,
+                                       topic_id INT NOT NULL,
+                                       probability FLOAT NOT NULL,
+                                       INDEX topic_index (topic_id)
+                                   )"""
+    topic_for_article_insert:str = "INSERT INTO TOPIC_FOR_ARTICLE(article_id, topic_id, probability) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE topic_id = VALUES(topic_id), probability = VALUES(probability)"
+
+    postings_batch_size:int = 5000      # Max number of (term, article_id, freq) rows per executemany() chunk in update_index()
+    postings_flush_size:int = 50000     # Number of postings to accumulate in memory before they are written in update_index()
+
+    def __init__(self, username:str, password:str, host:str, pool_size:int=4, batch_size:int=500, max_retries:int=3):
         self.username=username          # Given username
         self.password=password          # Given password
         self.host=host                  # Given host
         self.database='RSS_Feeds'       # Static database
+        self.seen_index=None            # Loaded on the first call to getSeenArticleIndex()
+        self.local_index=None           # Set by the caller once the index covers every stored article (see fillLocalIndex())
+        self.related_index=None         # Set by the caller, i.e. "dbConn.related_index = Related_Index.load(path)"
+        self.pool_size=max(1, pool_size)
+        self.pool=None                  # Created on the first call to connection()
+        self.pool_lock=Lock()
+        self.batch_size=max(1, batch_size)
+        self.max_retries=max(1, max_retries)
+        self.topic_table_ready=False    # Checked on the first call to addArticleTopics()
+
+    # -------------------------------------------------------------------------------------------------------------- #
+    # CONNECTION POOL
+
+    ''' connection(autocommit, buffered) - borrow a connection and cursor from the pool, i.e.
+
+            with self.connection() as (cxn, cursor):
+                cursor.execute(...)
 
-    def new_connection(self) -> object: 
-         # Create the connection and cursor
+        :param autocommit:bool [optional] whether to autocommit every statement on this connection
+        :param buffered:bool [optional] whether the cursor fetches the whole result set right away (False to stream large results, see __iterRows__)
+        :return (cxn, cursor) - the cursor is closed and the connection returned to the pool at the end of the with block
+        :raises MySQLCxnError if a healthy connection could not be borrowed from the pool
+
+        NOTE: if the with block raises an exception, the open transaction is rolled back before the connection is returned
+    '''
+    @contextmanager
+    def connection(self, autocommit:bool=False, buffered:bool=True):
+        cxn = self.__borrow__()
+        cursor = None
         try: 
-            cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database)
-            cursor = cxn.cursor()
-            return cxn, cursor
+            cxn.autocommit = autocommit
+            cursor = cxn.cursor(buffered=buffered)
+            yield cxn, cursor
+        except:
+            try: cxn.rollback()
+            except Exception: pass
+            raise
+        finally:
+            try:
+                # An unbuffered cursor that was not read to the end (i.e. a generator that was closed early) leaves rows on the connection
+                if not buffered: cxn.consume_results()
+                if cursor is not None: cursor.close()
+            except Exception: pass
+            cxn.close()     # Returns the connection to the pool
+
+    ''' __iterRows__(query, params, batchSize) - stream the rows for the given query, one at a time
+        :param query:str a (parameterized) SELECT statement
+        :param params:tuple [optional] the query parameters
+        :param batchSize:int [optional] number of rows read from the server at a time, defaults to self.batch_size
+        :return a generator of rows
+        :raises any error from the DB
+
+        NOTE: the rows are read with an unbuffered cursor in fetchmany() batches, so only one batch is in memory at a time no matter how
+              big the result is. The connection is borrowed until the generator is exhausted or closed.
+    '''
+    def __iterRows__(self, query:str, params:tuple=(), batchSize:int=0):
+        with self.connection(buffered=False) as (cxn, cursor):
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batchSize or self.batch_size)
+                if not rows: break
+                yield from rows
+
+    ''' __borrow__() - get a healthy connection from the pool, creating the pool on the first call
+        :return a pooled connection
+        :raises MySQLCxnError if the pool could not be created, no connection was free within borrow_timeout, or the health check failed
+    '''
+    def __borrow__(self):
+        # Create the pool on the first call
+        with self.pool_lock:
+            if self.pool is None:
+                try:
+                    self.pool = pooling.MySQLConnectionPool(pool_name=f"RSS_Feeds_{id(self)}", pool_size=self.pool_size, pool_reset_session=True,
+                                                            user=self.username, password=self.password, host=self.host, database=self.database)
+                except Exception as e:
+                    print(f"ERROR in RSS_DB_Connection.__borrow__(): There was an error creating the connection pool.")
+                    raise MySQLCxnError(str(e))
+
+        # Wait for a free connection (the pool raises PoolError right away when every connection is in use)
+        startTime:float = perf_counter()
+        while True:
+            try:
+                cxn = self.pool.get_connection()
+                break
+            except pooling.errors.PoolError as e:
+                if perf_counter() - startTime > RSS_DB_Connection.borrow_timeout: raise MySQLCxnError(f"No connection was free after {RSS_DB_Connection.borrow_timeout}s: {e}")
+                sleep(0.05)
+            except Exception as e: raise MySQLCxnError(str(e))
+
+        # Health check - reconnect if the server closed the connection while it was idle in the pool
+        try: cxn.ping(reconnect=True, attempts=3, delay=1)
         except Exception as e: 
-            print(f"ERROR in RSS_DB_Connection.update_index(): There was an error initiating the database connection. Quitting.")
-            print(e)
-            raise MySQLCxnError()
+            cxn.close()
+            raise MySQLCxnError(f"Health check failed: {e}")
     
+        return cxn
     
+    ''' __bulkWrite__(query, rows) - write the given rows with a parameterized executemany(), in chunks
+        :param query:str a parameterized INSERT statement (i.e. RSS_DB_Connection.article_insert)
+        :param rows:list[tuple] the values for each row
+        :param batchSize:int [optional] max number of rows per chunk, defaults to self.batch_size
+        :return a list of the indexes(in rows) of the rows that could NOT be written, empty if every row was written
+
+        NOTE: each chunk is at most self.batch_size rows and about max_batch_bytes, and is committed in its own transaction, so one bad
+              chunk does not undo the rest. A chunk that fails with a connection/lock error is retried (with backoff) up to
+              self.max_retries times. A chunk that fails for any other reason (i.e. bad data) is not retried.
+    '''
+    def __bulkWrite__(self, query:str, rows:list[tuple], batchSize:int=0) -> list[int]:
+        failed:list[int] = []
+
+        for start, chunk in RSS_DB_Connection.__chunks__(rows, batchSize or self.batch_size, RSS_DB_Connection.max_batch_bytes):
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    with self.connection() as (cxn, cursor):
+                        cursor.executemany(query, chunk)
+                        cxn.commit()
+                    break
+
+                except Exception as e:
+                    # Connection problems, lock wait timeouts (1205) and deadlocks (1213) are worth another try
+                    retry:bool = isinstance(e, (MySQLCxnError, mysql.errors.OperationalError, mysql.errors.InterfaceError)) or getattr(e, 'errno', None) in (1205, 1213)
+
+                    if retry and attempt < self.max_retries:
+                        print(f"NON-CRITICAL ERROR in RSS_DB_Connection.__bulkWrite__(): attempt {attempt} for rows {start}-{start + len(chunk) - 1} failed. Retrying.")
+                        print(e)
+                        sleep(2 ** (attempt - 1))
+                        continue
+
+                    print(f"ERROR in RSS_DB_Connection.__bulkWrite__(): there was an error writing rows {start}-{start + len(chunk) - 1}. Moving on.")
+                    print(e)
+                    failed.extend(range(start, start + len(chunk)))
+                    break
+
+        return failed
         
     # -------------------------------------------------------------------------------------------------------------- #
     # INVERTED INDEX 
     
+    ''' update_index(articles) - add the given (processed) articles to ARTICLE and their tokens to INVERTED_INDEX
+        :param articles a list of RSS_Article with article_tokens
+        :return False if any of the articles or postings could not be written, True if success
+
+        NOTE: the articles are written in chunks (see __bulkWrite__), then the article_ids for each chunk are looked up with a single
+              SELECT on the links rather than a LAST_INSERT_ID() per article. The (term, article_id, freq) postings are kept in memory
+              and written with multi-row inserts every postings_flush_size postings, so indexing takes a handful of round trips per
+              chunk of articles instead of four or more per article. Articles that already exist are mapped to their existing ids.
+    '''
     def update_index(self, articles:list[RSS_Article]) -> bool:
+        if not articles: return True
         
-         # Create the connection and cursor
-        try: cxn, cursor = self.new_connection()
-        except MySQLCxnError as e:  
+        startTime:float = perf_counter()
+        success:bool = True
+        numIndexed:int = 0
+        numPostings:int = 0
+        postings:list[tuple] = []
+
+        rows:list[tuple] = [(a.feed_title, a.article_title, a.article_link, a.pub_date, a.article_desc, a.raw_content) for a in articles]
+
+        for start, chunk in RSS_DB_Connection.__chunks__(rows, self.batch_size, RSS_DB_Connection.max_batch_bytes):
+            chunkArticles:list[RSS_Article] = articles[start:start + len(chunk)]
+
+            # 1. Write this chunk of articles. If an article could not be written then skip its postings since the FK constraints will fail
+            failed:set[int] = set(self.__bulkWrite__(RSS_DB_Connection.article_insert, chunk))
+            if failed:
+                print(f"ERROR in RSS_DB_Connection.update_index(): {len(failed)} articles could not be added to ARTICLE. Moving on.")
+                success = False
+
+            written:list[RSS_Article] = [a for i, a in enumerate(chunkArticles) if i not in failed]
+            if self.seen_index is not None: self.seen_index.addArticles(written)
+            if self.related_index is not None: self.related_index.addArticles(written)
+
+            # 2. Get the ids for the whole chunk at once
+            articleIds:dict[str, int] = self.__getArticleIds__([a.article_link for a in written])
+            self.__updateLocalIndex__(written, articleIds)
+
+            # 3. Accumulate the postings for this chunk
+            for a in written:
+                if a.article_link not in articleIds:
+                    print(f"ERROR in RSS_DB_Connection.update_index(): Could not find the article_id for \"{a.article_title}\". Moving on.")
+                    success = False
+                    continue
+
+                articleId:int = articleIds[a.article_link]
+                postings.extend((t, articleId, f) for t, f in a.article_tokens.items())
+                numIndexed += 1
+
+            # 4. Flush the postings once enough have accumulated
+            if len(postings) >= RSS_DB_Connection.postings_flush_size:
+                success = self.__flushPostings__(postings) and success
+                numPostings += len(postings)
+                postings = []
+
+        # Flush the rest of the postings
+        if postings:
+            success = self.__flushPostings__(postings) and success
+            numPostings += len(postings)
+
+        print(f"NOTICE in RSS_DB_Connection.update_index(): Indexed {numIndexed}/{len(articles)} articles ({numPostings} postings) in {perf_counter() - startTime:.1f}s.")
+        return success
+
+    ''' __getArticleIds__(links) - get the article_id for each of the given article links
+        :param links:list[str] the article links (at most self.batch_size, i.e. one chunk)
+        :return a dict of article_link -> article_id, missing the links that could not be found
+    '''
+    def __getArticleIds__(self, links:list[str]) -> dict[str, int]:
+        if not links: return {}
+
+        query:str = f"SELECT article_id, article_link FROM ARTICLE WHERE article_link IN ({', '.join(['%s'] * len(links))})"
+
+        try:
+            with self.connection() as (cxn, cursor):
+                cursor.execute(query, tuple(links))
+                return {r[1]: r[0] for r in cursor.fetchall()}
+
+        except Exception as e:
+            print(f"ERROR in RSS_DB_Connection.__getArticleIds__(): There was an error getting the ids for {len(links)} articles.")
             print(e)
+            return {}
+
+    ''' __updateLocalIndex__(articles, articleIds) - add the given stored articles to self.local_index (if it is set)
+        :param articles:list[RSS_Article] the articles that were written
+        :param articleIds:dict[str, int] article_link -> article_id (see __getArticleIds__)
+        :return void
+
+        NOTE: if the id of any of the articles could not be found, the local index does not cover every stored article anymore, so it is
+              detached and query_articles() goes back to the DB. It is filled again on the next run (see fillLocalIndex())
+    '''
+    def __updateLocalIndex__(self, articles:list[RSS_Article], articleIds:dict[str, int]) -> None:
+        if self.local_index is None: return
+
+        self.local_index.addArticles(articles, articleIds)
+        if [a for a in articles if a.article_link not in articleIds]:
+            print("NOTICE in RSS_DB_Connection.__updateLocalIndex__(): Some of the stored articles could not be added to the local index. Searches will use the DB.")
+            self.local_index = None
+
+    ''' __flushPostings__(postings) - write the given (term, article_id, freq) postings to INVERTED_INDEX
+        :return False if any of the postings could not be written, True if success
+    '''
+    def __flushPostings__(self, postings:list[tuple]) -> bool:
+        failed:list[int] = self.__bulkWrite__(RSS_DB_Connection.inverted_index_insert, postings, RSS_DB_Connection.postings_batch_size)
+        if failed:
+            print(f"ERROR in RSS_DB_Connection.__flushPostings__(): {len(failed)}/{len(postings)} postings could not be added to INVERTED_INDEX.")
             return False
-        
-        
-        # Iterate over the articles and insert one by one into ARTICLE, then tokenize and update INVERTED_INDEX
-        for a in articles: 
-            
-            # Format the insert statement into ARTICLE
-            new_article_query:str = "INSERT IGNORE INTO ARTICLE(feed_title, article_title, article_link, pub_date, article_desc, article_content) VALUES"
-            new_article_query += f"(\"{a.feed_title}\", \"{a.article_title}\", \"{a.article_link}\", \"{a.pub_date}\", \"{a.article_desc}\", \"{a.raw_content}\")"
-            
-            # Try to execute the insert into ARTICLE statement
-            try: 
-                cursor.execute(new_article_query)
-                cxn.commit()
-            except Exception as e:  
-                # If the insert into ARTICLE statement fails, then skip the rest of this article since the FK constraints will fail
-                print(f"ERROR in RSS_DB_Connection.update_index(): There was an error executing the insert statement (ARTICLE_TABLE) for \"{a.article_title}\". Moving on.")
-                print(new_article_query)
-                print(e)
-                continue
-            
-            # Format the query to add the article tokens to INVERTED_INDEX table
-            # Get the ID of the last inserted document
-            cursor.execute("SELECT LAST_INSERT_ID()")
-            article_id = cursor.fetchone()[0]
-            
-            # Insert tokens and article_content into the INVERTED_INDEX table
-            insert_query = "INSERT IGNORE INTO INVERTED_INDEX(term, article_id, freq) VALUES (%s, %s, %s)"
-            tokens_data = [(t, article_id, f) for t,f in a.article_tokens.items()]
-            
-            try: 
-                cursor.executemany(insert_query, tokens_data)
-                cxn.commit()
-            except Exception as e: 
-                print(f"ERROR in RSS_DB_Connection.update_index(): There was an error executing the insert statement (INVERTED_INDEX table) for \"{a.article_title}\". Moving on.")
-                print(insert_query)
-                print(e)
-                continue
-        
-        # Done with the loop - close cursor and cxn
-        cursor.close()
-        cxn.commit()
-        cxn.close()
-        
         return True
     
+    ''' query_articles(terms, op) - get the articles that match the given search terms
+        :param terms:list[str] the search terms (they are preprocessed the same way as the article content)
+        :param op:QueryOption [optional] how to combine the terms (AND, OR, XOR = exactly one of the terms, NAND = not all of the terms)
+        :return a list of (article_id, article_title, article_link, article_desc, score) tuples, best match first
+
+        NOTE: if self.local_index is set (it covers every stored article, see fillLocalIndex()) the query is answered locally and ranked
+              with BM25. Otherwise the query runs against INVERTED_INDEX, ranked by the total frequency of the terms
+    '''
     def query_articles(self, terms:list[str], op:QueryOption=QueryOption.AND) -> list[tuple]: 
         
         # Make sure some search terms were given
@@ -148,49 +375,101 @@ class RSS_DB_Connection:
             print("RSS_DB_Connection.query_articles(): Empty set of terms given.")
             return []
         
+        # Answer the query locally if there is a local index
+        if self.local_index is not None: return self.local_index.search(terms, op)
+
         # Stem query terms 
         tokens, strn = RSS_Article.__contentPreprocessing__(" ".join(terms))
+        queryTerms:list[str] = [t.lower() for t in tokens.keys()]
+        if not queryTerms: return []
+
+        # Every term matches a different row of INVERTED_INDEX, so group the rows by article and count how many of the terms matched
+        placeholders:str = ", ".join(["%s"] * len(queryTerms))
+        matched:str = f"SELECT article_id, COUNT(DISTINCT term) AS num_terms, SUM(freq) AS score FROM INVERTED_INDEX WHERE term IN ({placeholders}) GROUP BY article_id"
         
         match(op): 
-            case QueryOption.AND: op_str:str = "&&"
-            case QueryOption.OR: op_str:str = "||"
-            case QueryOption.XOR: op_str:str = ""       # IMPLEMENT !!!
+            case QueryOption.AND: where:str = "WHERE m.num_terms = %s"
+            case QueryOption.OR: where:str = ""
+            case QueryOption.XOR: where:str = "WHERE m.num_terms = 1"
+            case QueryOption.NAND: where:str = "WHERE m.num_terms IS NULL OR m.num_terms < %s"
+
+        # Format the query (NAND also needs the articles that do not contain any of the terms)
+        join:str = "LEFT JOIN" if op == QueryOption.NAND else "JOIN"
+        query:str = f"SELECT ARTICLE.article_id, article_title, article_link, article_desc, COALESCE(m.score, 0) FROM ARTICLE {join} ({matched}) m ON m.article_id = ARTICLE.article_id {where} ORDER BY COALESCE(m.score, 0) DESC"
+
+        params:tuple = tuple(queryTerms)
+        if op in (QueryOption.AND, QueryOption.NAND): params += (len(queryTerms),)
             
         # Init connection to DB
-        try: cxn, cursor = self.new_connection()
+        try:
+            with self.connection() as (cxn, cursor):
+
+                # Execute the query
+                try: cursor.execute(query, params)
+                except Exception as e:
+                    print("There was an error executing the query. Query:\n" + query)
+                    print(e)
+                    return []
+
+                lst:list[tuple] = []
+                for r in cursor.fetchall():
+                    lst.append((r[0],       # article_id
+                                r[1],       # article_title
+                                r[2],       # article_link
+                                r[3],       # article_desc
+                                float(r[4]))   # score
+                            )
+
         except MySQLCxnError as e: 
             print(e) 
             return []
 
-        # Format the query
-        query:str = f"SELECT DISTINCT ARTICLE.article_id, article_title, article_link, article_desc FROM ARTICLE NATURAL JOIN INVERTED_INDEX WHERE term = \"{list(tokens.keys())[0].lower()}\""
-        
-        for t in list(tokens.keys())[1:]: query += f" {op_str} term = \"{t.lower()}\""
-        
-        print(f"QUERY:\n{query}\n")
-        
-        # Execute the query
-        try: cursor.execute(query)
-        except Exception as e: 
-            print("There was an error executing the query. Query:\n" + query)
-            print(e)
-            return []
-        
-        lst:list[tuple] = []
-        for r in cursor.fetchall(): 
-            lst.append((r[0],       # article_id
-                        r[1],       # article_title
-                        r[2],       # article_link
-                        r[3])       # article_desc
-                    )
-        
-        # Commit and close 
-        RSS_DB_Connection.commit_close(cxn, cursor)
-        
         return lst
         
+    ''' fillLocalIndex(index) - add every stored article that is missing from the given local index (i.e. on the first run, or the
+        articles that were stored while the index was detached), so it can answer queries for every stored article
+        :param index:Local_Index
+        :return True if the index now covers every stored article, False if error (the index should not be used for queries)
             
-        
+        NOTE: only the rows with an article_id above the index's high-water mark are compared (the same as getSeenArticleIndex()), and
+              only the content of the missing articles is read (in chunks of self.batch_size) and preprocessed. When the index is
+              already up to date this is a single MAX(article_id).
+    '''
+    def fillLocalIndex(self, index:Local_Index) -> bool:
+        try:
+            with self.connection() as (cxn, cursor):
+                cursor.execute("SELECT MAX(article_id) FROM ARTICLE")
+                maxId:int = cursor.fetchone()[0] or 0
+            if maxId <= index.high_water_mark: return True
+        
+            # Find the articles that are missing, then read and preprocess them a chunk at a time
+            query:str = "SELECT article_id, article_link FROM ARTICLE WHERE article_id > %s AND article_id <= %s"
+            missing:list[int] = [r[0] for r in self.__iterRows__(query, (index.high_water_mark, maxId)) if not index.hasArticle(r[1])]
+            print(f"NOTICE in RSS_DB_Connection.fillLocalIndex(): Adding {len(missing)} stored articles to the local index.")
+
+            for start in range(0, len(missing), self.batch_size):
+                ids:list[int] = missing[start:start + self.batch_size]
+                query:str = f"SELECT article_id, feed_title, article_title, article_link, pub_date, article_desc, article_content FROM ARTICLE WHERE article_id IN ({', '.join(['%s'] * len(ids))})"
+                with self.connection() as (cxn, cursor):
+                    cursor.execute(query, tuple(ids))
+                    rows:list[tuple] = cursor.fetchall()
+
+                # Articles stored without content are indexed by their title and description (they are never fetched here)
+                articles:list[RSS_Article] = [RSS_Article(self.feeds_divs_dict.get(r[1], ""), r[1], r[2], r[3], r[4], r[5], process=False,
+                                                          articleContent=r[6] if r[6] is not None else f"{r[2]} {r[5]}") for r in rows]
+                for a, (tokens, preprocessed) in zip(articles, Text_Preprocessor.shared().processBatch([a.raw_content for a in articles])):
+                    a.__setProcessedContent__(a.raw_content, tokens, preprocessed)
+
+                index.addArticles(articles, {r[3]: r[0] for r in rows})
+
+            index.high_water_mark = maxId
+
+        except Exception as e:
+            print("ERROR in RSS_DB_Connection.fillLocalIndex(): There was an error filling the local index from the DB.")
+            print(e)
+            return False
+
+        return True
         
     # -------------------------------------------------------------------------------------------------------------- #
     # Methods to GET information from the remote DB 
@@ -199,23 +478,18 @@ class RSS_DB_Connection:
         :return a list of feed titles
     '''
     def getAllFeeds(self) -> list[str]: 
-        # Create the connection and cursor 
-        cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database)
-        cursor = cxn.cursor()
+        # Borrow a connection and cursor
+        with self.connection() as (cxn, cursor):
+            query:str = "SELECT feed_title FROM RSS_FEED"   # Format the query
+            cursor.execute(query)                           # Execute the query
+            result = cursor.fetchall()                      # Get the result first
         
-        query:str = "SELECT feed_title FROM RSS_FEED"   # Format the query
-        cursor.execute(query)                           # Execute the query
-        result = cursor.fetchall()                      # Get the result first
         allFeeds:list[str] = []                         # The list we will eventually return
         
         # The result is a list of tuples due to the way mysql works, so reformat the results to what we want
         # i.e., a list of strings [the feed titles]
         for r in result: allFeeds.append(r[0])     
         
-        # Close the cursor and connection
-        cursor.close()
-        cxn.close() 
-        
         # Return the final list     
         return allFeeds
     
@@ -224,155 +498,192 @@ class RSS_DB_Connection:
     '''
     def getAllTags(self) -> list[Tag]: 
         
-        # Create the connection and cursor
-        cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database)
-        cursor = cxn.cursor()
+        # Borrow a connection and cursor
+        with self.connection() as (cxn, cursor):
         
-        # Format and execute query
-        query:str = "SELECT * FROM TAG"
-        cursor.execute(query)
+            # Format and execute query
+            query:str = "SELECT * FROM TAG"
+            cursor.execute(query)
         
-        # Get all the results and create tag objects 
-        lot:list[Tag] = []                                              # List of tag objects to return
-        for t in cursor.fetchall(): lot.append(Tag(t[0], t[1], t[2]))   # t[0] = tagName, t[1] = tagDesc, t[2] = caseSensitive
-        return lot                                                      # Return the complete list
+            # Get all the results and create tag objects
+            lot:list[Tag] = []                                              # List of tag objects to return
+            for t in cursor.fetchall(): lot.append(Tag(t[0], t[1], t[2]))   # t[0] = tagName, t[1] = tagDesc, t[2] = caseSensitive
         
-    ''' getAllArticles(feedTitle) - get a list of all RSS_Articles (as objects) in the database, optionally specifying a specific feed title
+        return lot                                                          # Return the complete list
+
+    ''' getTagTablesChecksum() - get the checksum of the TAG and TAG_IN_SET tables, which changes whenever the tags change (see Tag_Cache)
+        :return the checksums as a string, "" if error
+    '''
+    def getTagTablesChecksum(self) -> str:
+        try:
+            with self.connection() as (cxn, cursor):
+                cursor.execute("CHECKSUM TABLE TAG, TAG_IN_SET")
+                return ",".join(f"{r[0]}:{r[1]}" for r in cursor.fetchall())
+
+        except Exception as e:
+            print("NON-CRITICAL ERROR in RSS_DB_Connection.getTagTablesChecksum(): There was an error getting the checksum of the tag tables.")
+            print(e)
+            return ""
+
+    ''' getAllArticles(feedTitle)- get a list of all RSS_Articles (as objects) in the database, optionally specifying a specific feed title
         :param feedTitle [optional] feed title to filter results
         :return a list of articles
+
+        NOTE: the articles are created with their stored content and are not processed - the tokens are computed the first time they are used
+        NOTE: use iterArticles() to work over every article without holding all of them in memory
     '''
-    def getAllArticles(self, feedTitle="") -> list[RSS_Article]: 
+    def getAllArticles(self, feedTitle="") -> list[RSS_Article]: return list(self.iterArticles(feedTitle))
         
-        # Create the connection and cursor
-        cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database)
-        cursor = cxn.cursor()
-        
-        # Format and execute the query
-        articlesQuery:str = "SELECT * FROM ARTICLE" 
-        if feedTitle: articlesQuery += f" WHERE feed_title = \"{feedTitle}\""
-        
-        try: cursor.execute(articlesQuery)
-        except Exception as e: 
-            print(f"ERROR in RSS_DB_Connection.getAllArticles(): There was an error executing the articlesQuery. Quitting.")
-            print(e)
-            cursor.close()
-            cxn.close()
-            return []
-        
-        # Get the results from the cursor and transform them into Article objects
-        articlesResults = cursor.fetchall()
-        allArticles:list[RSS_Article] = []
-        
-        for r in articlesResults: 
-            thisArticle:RSS_Article = RSS_Article(self.feeds_divs_dict[r[0]], r[0], r[1], r[2], r[3], r[4])                         # This article object WITHOUT TAGS yet
-            #getTagsQuery:str = f"SELECT tag_name FROM TAG_FOR_ARTICLE WHERE article_title = \"{r[1]}\""   # Create the query to get the tags
-
-            try: 
-                #cursor.execute(getTagsQuery)                              # Execute the query to get these tags
-                #tagsResults = cursor.fetchall()                           # Fetch results from the query
-                #for t in tagsResults: thisArticle.tags.append(t[0])          # Add the results of the tags query to the Article as strings (tag names)
-                allArticles.append(thisArticle)                           # Add this article to the list
-                
-            except Exception as e: 
-                print(f"ERROR in RSS_DB_Connection: There was an error executing the query to get tags for the article title {thisArticle.article_title}. Continuing with the rest...")
-                print(e)
-                continue
-
-        # Close connections and return the final list of Articles
-        cursor.close()
-        cxn.close()
-        return allArticles 
-    
-    
-    ''' getArticlesForTags(tag_names) - get a list of all RSS_Articles (as objects) from the database
-        :param tag_names:list[str] list of tag names 
+    ''' iterArticles(feedTitle) - iterate over all of the RSS_Articles in the database one at a time, optionally specifying a specific feed title
+        :param feedTitle [optional] feed title to filter results
+        :return a generator of RSS_Article (WITHOUT TAGS, created with their stored content and not processed)
     '''
-    def getArticlesForTags(self, tag_names:list[str]) -> list[RSS_Article]:
-        # Check if a valid list of tag names was given
-        if not tag_names: 
-            print("ERROR in RSS_DB_Connection.getArticlesForTags(): No tag names were given. Quitting.")
-            return []
+    def iterArticles(self, feedTitle:str=""):
         
-        # Create the connection and cursor
-        try: 
-            cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database)
-            cursor = cxn.cursor()
-        except Exception as e: 
-            print(f"ERROR in RSS_DB_Connection.getArticlesForTags(): There was an error initiating the database connection. Quitting.")
-            print(e)
-            return []
-            
         # Format the query
-        query:str = f"SELECT tag_name, feed_title, article_title, article_link, article_desc, pub_date, article_content FROM TAG_FOR_ARTICLE NATURAL JOIN ARTICLE WHERE tag_name = \"{tag_names[0]}\""
-        
-        for t_name in tag_names[1:]: query += f" || tag_name = \"{t_name}\""
-        
-        # Execute the query
-        try: cursor.execute(query)
+        articlesQuery:str = "SELECT feed_title, article_title, article_link, pub_date, article_desc, article_content FROM ARTICLE"
+        params:tuple = ()
+        if feedTitle:
+            articlesQuery += " WHERE feed_title = %s"
+            params = (feedTitle,)
+        
+        # Stream the rows and transform them into Article objects
+        try:
+            for r in self.__iterRows__(articlesQuery, params):
+                # r[0] = feed_title, r[1] = article_title, r[2] = article_link, r[3] = pub_date, r[4] = article_desc, r[5] = article_content
+                yield RSS_Article(self.feeds_divs_dict[r[0]], r[0], r[1], r[2], r[3], r[4], process=False, articleContent=r[5])
+
         except Exception as e: 
-            print("ERROR in RSS_DB_Connection.getArticlesForTag(): There was an error executing the query. Quitting.")
+            print(f"ERROR in RSS_DB_Connection.iterArticles(): There was an error reading the articles. Quitting.")
             print(e)
-            print("QUERY:\n" + query)
-            cursor.close()
-            cxn.close()
-            return []
         
-        # Get the results 
-        articles:dict[str, RSS_Article] = {}     # Dict of key,value -> article_title,RSS_Article
-        results = cursor.fetchall()              # Fetch results
-        
-        for r in results: 
-            thisTitle = r[2]    # r[2] = article_title
+    ''' getArticlesForTags(tag_names) - get all RSS_Articles (as objects) from the database that have any of the given tags
+        :param tag_names:list[str] list of tag names
+        :return a dict of article_title -> RSS_Article
             
-            # Check if we've seen this title before since every article can have many tags
-            if thisTitle in articles.keys(): articles[thisTitle].tags.append(r[0])   # r[0] = tag_name 
+        NOTE: use iterArticlesForTags() to work over the articles without holding all of them in memory
+    '''
+    def getArticlesForTags(self, tag_names:list[str]) -> dict[str, RSS_Article]:
+        return {a.article_title: a for a in self.iterArticlesForTags(tag_names)}
             
-            # If we have NOT seen this article before then create a new RSS_Article object for it in articles
-            else: 
+    ''' iterArticlesForTags(tag_names) - iterate over the RSS_Articles from the database that have any of the given tags, one at a time
+        :param tag_names:list[str] list of tag names
+        :return a generator of RSS_Article (with the matching tags, created with their stored content and not processed)
+    '''
+    def iterArticlesForTags(self, tag_names:list[str]):
+        # Check if a valid list of tag names was given
+        if not tag_names:
+            print("ERROR in RSS_DB_Connection.iterArticlesForTags(): No tag names were given. Quitting.")
+            return
+
+        # Format the query - ordered by article so all of the rows (one per tag) for an article are next to each other
+        query:str = "SELECT tag_name, feed_title, article_title, article_link, article_desc, pub_date, article_content FROM TAG_FOR_ARTICLE NATURAL JOIN ARTICLE"
+        query += f" WHERE tag_name IN ({', '.join(['%s'] * len(tag_names))}) ORDER BY article_title"
+
+        thisArticle:RSS_Article = None
+
+        try:
+            for r in self.__iterRows__(query, tuple(tag_names)):
+
+                # Every article can have many tags
+                if thisArticle is not None and thisArticle.article_title == r[2]:   # r[2] = article_title
+                    thisArticle.tags.append(r[0])                                   # r[0] = tag_name
+                    continue
+
+                # This is a new article, so the last one has all of its tags
+                if thisArticle is not None: yield thisArticle
+
                 thisDiv = RSS_DB_Connection.feeds_divs_dict[r[1]]   # r[1] = feed_title
                 
-                # r[1] = feed_title, r[2] = article_title, r[3] = article_link, r[4] = pub_date, r[5] = article_desc
-                thisArticle = RSS_Article(thisDiv, r[1], r[2], r[3], articlePubDate=r[4], articleDesc=r[5], process=False)
+                # r[1] = feed_title, r[2] = article_title, r[3] = article_link, r[4] = article_desc, r[5] = pub_date, r[6] = article_content
+                thisArticle = RSS_Article(thisDiv, r[1], r[2], r[3], articlePubDate=r[5], articleDesc=r[4], process=False, articleContent=r[6])
                 thisArticle.tags.append(r[0])   # r[0] = tag_name
                 
-                articles[thisTitle] = thisArticle
+        except Exception as e:
+            print("ERROR in RSS_DB_Connection.iterArticlesForTags(): There was an error reading the articles. Quitting.")
+            print(e)
+            return
                 
-        return articles
+        if thisArticle is not None: yield thisArticle
         
     ''' getAllArticleTitles() - get a list of all the article titles
         :return a list of strings (article_title)
     '''    
     def getAllArticleTitles(self, feedTitle:str="") -> list[str]:
         
-        # Create the connection and cursor
-        try: 
-            cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database)
-            cursor = cxn.cursor()
-        except Exception as e: 
-            print(f"ERROR in RSS_DB_Connection.getArticlesForTags(): There was an error initiating the database connection. Quitting.")
-            print(e)
-            return []
-        
-        # Execute the query
+        # Format the query
         query:str = "SELECT article_title FROM ARTICLE"
         if feedTitle: query += f" WHERE feed_title = \"{feedTitle}\""
-        
-        try: cursor.execute(query)
-        except Exception as e: 
-            print("ERROR in RSS_DB_Connection.getAllArticleTitles(): There was an error executing the query. Quitting.")
-            print(e) 
-            cursor.close()
-            cxn.close()
+
+        # Borrow a connection and cursor, then execute the query
+        try: 
+            with self.connection() as (cxn, cursor):
+                try: cursor.execute(query)
+                except Exception as e:
+                    print("ERROR in RSS_DB_Connection.getAllArticleTitles(): There was an error executing the query. Quitting.")
+                    print(e)
+                    return []
+
+                results = cursor.fetchall()
+
+        except MySQLCxnError as e:
+            print(f"ERROR in RSS_DB_Connection.getAllArticleTitles(): There was an error initiating the database connection. Quitting.")
+            print(e)
             return []
         
         # Return the results
-        results = cursor.fetchall()
         results = [r[0] for r in results]
         return results
     
+    ''' getSeenArticleIndex(cachePath) - get the index of the links of all the articles in the DB (to skip articles we've already processed)
+        :param cachePath:str [optional] path to the local copy of the index from the last run (see Seen_Article_Index.save())
+        :return a Seen_Article_Index
+        
+        NOTE: the index is only loaded once per RSS_DB_Connection. After that it is kept up to date by addArticles(). If a local copy 
+              of the index is given, only the articles added since the last run (article_id > the high-water mark) are read from the DB
+    '''
+    def getSeenArticleIndex(self, cachePath:str="") -> Seen_Article_Index: 
+        if self.seen_index is not None: return self.seen_index
+        
+        # Start from the local copy of the index if there is one
+        index:Seen_Article_Index = Seen_Article_Index.load(cachePath) if cachePath else None
+        if index is None: index = Seen_Article_Index()
+        
+        # Borrow a connection and cursor, then execute the queries
+        try: 
+            with self.connection() as (cxn, cursor):
+                try:
+                    # If the table has been reset since the local copy was saved then the high-water mark is meaningless, so start over
+                    cursor.execute("SELECT MAX(article_id) FROM ARTICLE")
+                    maxId:int = cursor.fetchone()[0] or 0
+                    if maxId < index.high_water_mark:
+                        print("NOTICE in RSS_DB_Connection.getSeenArticleIndex(): The local index is ahead of the DB. Rebuilding the index.")
+                        index = Seen_Article_Index()
+
+                    # Only get the rows added since the last run
+                    cursor.execute("SELECT article_id, feed_title, article_link FROM ARTICLE WHERE article_id > %s", (index.high_water_mark,))
+                    results = cursor.fetchall()
+                except Exception as e:
+                    print("ERROR in RSS_DB_Connection.getSeenArticleIndex(): There was an error executing the query. Returning the local index.")
+                    print(e)
+                    return index
+
+        except MySQLCxnError as e:
+            print(f"ERROR in RSS_DB_Connection.getSeenArticleIndex(): There was an error initiating the database connection. Returning the local index.")
+            print(e)
+            return index
+        
+        # Add the new rows to the index and move the high-water mark
+        for r in results: index.add(r[2], r[1])     # r[1] = feed_title, r[2] = article_link
+        index.high_water_mark = max(index.high_water_mark, maxId)
+        print(f"NOTICE in RSS_DB_Connection.getSeenArticleIndex(): {len(results)} new articles since the last run, {len(index)} articles in the index.")
+        
+        self.seen_index = index
+        return self.seen_index
+    
     # -------------------------------------------------------------------------------------------------------------- # 
     # Methods to UPDATE information in the remote DB
-    
+
     ''' addArticles(articles) - add a list of articles to the DB
         :param articles a list of RSS_Article 
         :return False if error, True if success
@@ -384,38 +695,29 @@ class RSS_DB_Connection:
             print("NOTICE in RSS_DB_Connection.addArticles(): There are no provided articles. Returning.")
             return True
         
-        # Try to create the cxn and cursor
-        try: 
-            cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database)
-            cxn.autocommit = True
-            cursor = cxn.cursor()
-        except: 
-            print("ERROR in RSS_DB_Connection.addArticles(): There was an error creating the connection or cursor. Exiting.")
-            return False
+        # The values are passed as parameters, so the article text is stored exactly as it is
+        rows:list[tuple] = [(a.feed_title, a.article_title, a.article_link, a.pub_date, a.article_desc, a.raw_content) for a in articles]
+        failed:list[int] = self.__bulkWrite__(RSS_DB_Connection.article_insert, rows)
         
-        query:str = "INSERT IGNORE INTO ARTICLE(feed_title, article_title, article_link, pub_date, article_desc, article_content) VALUES"
+        # Keep the index of stored articles up to date (only with the articles that were actually written)
+        failedSet:set[int] = set(failed)
+        written:list[RSS_Article] = [a for i, a in enumerate(articles) if i not in failedSet]
+        if self.seen_index is not None: self.seen_index.addArticles(written)
+        if self.related_index is not None: self.related_index.addArticles(written)
         
-        for a in articles: 
-            a.sanitize()
-            query += f"(\"{a.feed_title}\", \"{a.article_title}\", \"{a.article_link}\", \"{a.pub_date}\", \"{a.article_desc}\", \"{a.raw_content}\"),"
+        # The local index needs the ids of the new rows (one SELECT per chunk)
+        if self.local_index is not None:
+            for start in range(0, len(written), self.batch_size):
+                chunk:list[RSS_Article] = written[start:start + self.batch_size]
+                self.__updateLocalIndex__(chunk, self.__getArticleIds__([a.article_link for a in chunk]))
         
-        query = query[:-1]
-        
-        try: cursor.execute(query)
-        except Exception as e: 
-            print(f"ERROR in RSS_DB_Connection.addArticles(): there was an error executing the insert query. Exiting.")
-            print(e)
-            print(f"Insert statement: {query}")
-            cursor.close()
-            cxn.close()
+        if failed:
+            print(f"ERROR in RSS_DB_Connection.addArticles(): {len(failed)}/{len(articles)} articles could not be added.")
             return False
         
         print("NOTICE: Articles added successfully.")
-        cursor.close()
-        cxn.commit()
-        cxn.close()
         return True
-            
+
 
     ''' addFeed(rss_feed) - add a new feed to the database
         :param rss_feed an instance of RSS_Feed
@@ -424,33 +726,30 @@ class RSS_DB_Connection:
     '''
     def addFeed(self, rss_feed:RSS_Feed, threadLimit=99999, updateArticleTags=[]) -> bool:
         
-        # Try to create the cxn and cursor
+        # Try to borrow the cxn and cursor
         try: 
-            cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database)
-            cursor = cxn.cursor()
-        except: 
+            with self.connection() as (cxn, cursor):
+
+                # Run an INSERT IGNORE statement for the feed
+                try:
+                    query:str = f"INSERT IGNORE INTO RSS_FEED(feed_title, feed_link, feed_desc) VALUES(\"{rss_feed.feed_title}\", \"{rss_feed.feed_link}\", \"{rss_feed.feed_desc}\")"
+                    cursor.execute(query)
+                except Exception as e:
+                    print("ERROR in RSS_DB_Connection.addFeed(): There was an error executing the query. Exiting.")
+                    print(e)
+                    return False
+
+                # Print success notices
+                print(f"NOTICE in RSS_DB_Connection.addFeed(): Add feed query executed successfully for \"{rss_feed.feed_title}\" - Either the feed was added or already exists in the database. Closing cursor.")
+
+                # Commit the results
+                cxn.commit()
+
+        except MySQLCxnError as e:
             print("ERROR in RSS_DB_Connection.addFeed(): There was an error creating the connection or cursor. Exiting.")
-            return False
-        
-        # Run an INSERT IGNORE statement for the feed
-        try: 
-            query:str = f"INSERT IGNORE INTO RSS_FEED(feed_title, feed_link, feed_desc) VALUES(\"{rss_feed.feed_title}\", \"{rss_feed.feed_link}\", \"{rss_feed.feed_desc}\")"
-            cursor.execute(query)
-        except Exception as e:
-            print("ERROR in RSS_DB_Connection.addFeed(): There was an error executing the query. Exiting.")
             print(e)
-            cursor.close()
-            cxn.close()
             return False
         
-        # Print success notices and close the cursor
-        print(f"NOTICE in RSS_DB_Connection.addFeed(): Add feed query executed successfully for \"{rss_feed.feed_title}\" - Either the feed was added or already exists in the database. Closing cursor.")
-        
-        # Commit the results and close the cursor
-        cxn.commit()
-        cursor.close()
-        cxn.close()
-        
         if updateArticleTags: 
             print(f"\nNOTICE in RSS_DB_Connection.addFeed(): updateArticles is turned on - calling updateArticles() for the feed \"{rss_feed.feed_title}\".")
             self.updateArticles(rss_feed, updateArticleTags, threadLimit)
@@ -465,93 +764,58 @@ class RSS_DB_Connection:
     '''
     def updateArticles(self, rssFeed:RSS_Feed, tags:list[Tag]) -> bool:
         
-        try: cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database, autocommit=True)
-        except: 
+        # - - - - - - - - - - - - - - - - - - - - - - #
+        # First make sure this feed exists so the foreign key restraints do not cause issues
+        try:
+            with self.connection() as (cxn, cursor):
+                if not RSS_DB_Connection.__testFeedExists__(cxn, cursor, rssFeed.feed_title): return False
+
+        except MySQLCxnError as e:
             print("ERROR in RSS_DB_Connection.updateArticles(): there was an error creating the connection. Exiting.")
-            return False
-        
-        try: cursor = cxn.cursor()
-        except: 
-            print("ERROR in RSS_DB_Connection.updateArticles(): there was an error creating the cursor. Exiting.")
-            cxn.close()
+            print(e)
             return False
         
         # - - - - - - - - - - - - - - - - - - - - - - #
-        # First make sure this feed exists so the foreign key restraints do not cause issues
-        if not RSS_DB_Connection.__testFeedExists__(cxn, cursor, rssFeed.feed_title): return False
+        # For every article, add the rows for the ARTICLE and TAG_FOR_ARTICLE tables
+        print(f"[+] Classifying and formatting rows for articles from feed: {rssFeed.feed_title}")
  
-        # - - - - - - - - - - - - - - - - - - - - - - #
-        # Format the base queries for this feed's articles
-        
-        # Query for adding the articles to the ARTICLES table
-        articlesQuery = "INSERT IGNORE INTO ARTICLE(feed_title, article_title, article_link, pub_date, article_desc) VALUES"
-        articlesValues = ""
-        
-        # Query for adding the tags for all of these articles to the ARTICLES_TAGS table
-        articlesTagsQuery = "INSERT IGNORE INTO TAG_FOR_ARTICLE(id, article_title, tag_name) VALUES"
-        articlesTagsValues = ""
-        
-        # - - - - - - - - - - - - - - - - - - - - - - #
-        # For every article, add the appropriate strings to the values queries
-        print(f"[+] Classifying and formatting queries for articles from feed: {rssFeed.feed_title}")
+        taggedArticles:list[RSS_Article] = []
+        articleRows:list[tuple] = []
+        matcher:Tag_Matcher = Tag_Matcher.forTags(tags)     # Compile the tags once for every article
 
         # Loop through the articles and classify all of them
         for a in rssFeed.articles: 
             
             # 0. Classify the article
-            a.classify(tags)     
+            a.classify(matcher)
 
             # 1. If the article does not have any tags, move on 
             if not a.tags: continue     
             
-            # 2. Sanitize the article and add it to the articles query
-            a = RSS_DB_Connection.sanitizeArticle(a)
-            articlesValues += f"(\"{rssFeed.feed_title}\", \"{a.article_title}\", \"{a.article_link}\", \"{a.pub_date}\", \"{a.article_desc}\"),"
+            # 2. Add the article to the articles rows
+            taggedArticles.append(a)
+            articleRows.append((rssFeed.feed_title, a.article_title, a.article_link, a.pub_date, a.article_desc))
             
-            # 3. Add the articles tags to the articlesTagsValues
-            for t in a.tags: articlesTagsValues += f"(\"{sha1(f'{a.article_title}{t}'.encode()).hexdigest()}\", \"{a.article_title}\", \"{t}\"),"
+        # Check if there are values to add
+        if not articleRows:
+            print(f"NOTICE: Feed \"{rssFeed.feed_title} does not have any articles of interest. Exiting.")
+            return True
 
         # - - - - - - - - - - - - - - - - - - - - - - #
-        # Add the values strings to the base queries
+        # Write the articles first for the foreign key restraint
+        print(f"\n[+] Updating database with articles for feed {rssFeed.feed_title}")
+        failed:set[int] = set(self.__bulkWrite__(RSS_DB_Connection.article_no_content_insert, articleRows))
     
-        articlesQuery += articlesValues[:-1]       # Trim the trailing ',' 
-        articlesTagsQuery += articlesTagsValues[:-1]    # Trim the trailing "," 
+        # Write the tags after, only for the articles that were written
+        print(f"[+] Updating database with tags for articles from feed: {rssFeed.feed_title}")
+        tagRows:list[tuple] = RSS_DB_Connection.__tagRows__([a for i, a in enumerate(taggedArticles) if i not in failed])
+        failedTags:list[int] = self.__bulkWrite__(RSS_DB_Connection.tag_for_article_insert, tagRows)
         
-        # - - - - - - - - - - - - - - - - - - - - - - #
-        # Try to execute the queries 
-        try: 
-            
-            # Check if there are values to add 
-            if not articlesValues: 
-                print(f"NOTICE: Feed \"{rssFeed.feed_title} does not have any articles of interest. Exiting.")
-                cursor.close()
-                cxn.close()
-                return True
-                
-            # Execute the articlesQuery first for the foreign key restraint
-            print(f"\n[+] Updating database with articles for feed {rssFeed.feed_title}")
-            cursor.execute(articlesQuery)       
-            
-            # Execute the articlesTagsQuery after 
-            print(f"[+] Updating database with tags for articles from feed: {rssFeed.feed_title}")
-            cursor.execute(articlesTagsQuery)   
-            
-        except Exception as e:
-            print(f"ERROR in RSS_DB_Connection.updateArticles(): there was an error adding the articles and/or tags for {rssFeed.feed_title} to the DB. Exiting.\n")
-            print("\t Articles query: \n\t" + articlesQuery)
-            print("\tArticles Tags Query: \n\t" + articlesTagsQuery)
-            print(e)
-            cursor.close()
-            cxn.close()
+        if failed or failedTags:
+            print(f"ERROR in RSS_DB_Connection.updateArticles(): {len(failed)} articles and {len(failedTags)} tags for {rssFeed.feed_title} could not be added to the DB.\n")
             return False
         
-        print(f"NOTICE in RSS_DB_Connection.updateArticles(): new articles and tags for {rssFeed.feed_title} added to the DB successfully. Closing cursor.\n")
-        
-        # Commit the results and close the cursor 
-        cursor.close()
-        cxn.commit()
-        cxn.close()
-        
+        print(f"NOTICE in RSS_DB_Connection.updateArticles(): new articles and tags for {rssFeed.feed_title} added to the DB successfully.\n")
         return True    
     
     ''' addTagsToArticle(article, tagList) - add a list of tags to the given article
@@ -560,47 +824,61 @@ class RSS_DB_Connection:
         :return the updated Article object
     '''
     def addTagsToArticles(self, articles:list[RSS_Article]) -> list[RSS_Article]: 
-        cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database, autocommit=True)
-        cursor = cxn.cursor()
 
-        # Perform the following for each article in articles list
         for article in articles:
+            if not article.tags: print(f"NOTICE: Article \"{article.article_title}\" does not have any tags. Skipping.")
            
-            # Add the tags to the Article object and format the VALUES tuples for the query
-            # NOTE: the ARTICLE_TAGS table uses a sha1 hash of the article_title + tag.tagName as the ID to make sure the same article
-            #       isn't duplicate tagged, since mysql does not allow more than 1 primary key 
-            tagList:list[str] = article.tags
-            
-            # Sanitize the article title so it does not contain any ' " '
-            article = RSS_DB_Connection.sanitizeArticle(article)
-            
-            if not tagList: 
-                print(f"NOTICE: Article \"{article.article_title}\" does not have any tags. Skipping.")
-                continue
+        # Write the tags for every article in chunks
+        rows:list[tuple] = RSS_DB_Connection.__tagRows__(articles)
+        failed:list[int] = self.__bulkWrite__(RSS_DB_Connection.tag_for_article_insert, rows)
             
-            valuesStr:str = ""
-            for t in tagList: 
-                valuesStr += f"(\"{sha1(f'{article.article_title}{t}'.encode()).hexdigest()}\", \"{article.article_title}\", \"{t}\"),"
+        if failed: print(f"ERROR in RSS_DB_Connection.addTagsToArticle(): {len(failed)}/{len(rows)} tags could not be added. The given Articles' lists of tags were locally updated but not the remote database.")
             
-            valuesStr = valuesStr[:-1] # Trim the trailing ","
-            
-            # Update the database 
-            query = "INSERT IGNORE INTO TAG_FOR_ARTICLE(id, article_title, tag_name) VALUES" + valuesStr
-
-            try: cursor.execute(query)
-            except Exception as e: 
-                print(f"ERROR in RSS_DB_Connection.addTagsToArticle(): There was an error with the insert statement for \"{article.article_title}\". The given Article's list of tags was locally updated but not the remote database. Moving on.")
-                print(e)
-                continue
-            
-        # Print success message and terminate connections
+        # Print success message
         print("NOTICE: Done with DB connection. Check output for errors. Quitting.\n")
-        cursor.close()
-        cxn.commit()
-        cxn.close()
         return articles
     
-    ''' newTagsFromExcel(path) - add new tags to the DB from an excel sheet 
+    ''' addArticleTopics(assignments) - add the topic assigned to each of the given (stored) articles, replacing the article's last topic
+        :param assignments:list[tuple] a list of (RSS_Article, topic_id, probability), i.e. from Online_LDA_Clustering.update()
+        :return False if any of the topics could not be written, True if success
+
+        NOTE: TOPIC_FOR_ARTICLE is created on the first call if it does not exist (see topic_for_article_ddl)
+    '''
+    def addArticleTopics(self, assignments:list[tuple]) -> bool:
+        if not assignments: return True
+        if not self.__createTopicTable__(): return False
+
+        # Get the ids for one chunk of articles at a time
+        links:list[str] = [a.article_link for a, _, _ in assignments]
+        articleIds:dict[str, int] = {}
+        for start in range(0, len(links), self.batch_size): articleIds.update(self.__getArticleIds__(links[start:start + self.batch_size]))
+
+        rows:list[tuple] = [(articleIds[a.article_link], int(topicId), float(prob)) for a, topicId, prob in assignments if a.article_link in articleIds]
+        if len(rows) < len(assignments):
+            print(f"ERROR in RSS_DB_Connection.addArticleTopics(): Could not find the article_id for {len(assignments) - len(rows)} articles. Moving on.")
+
+        failed:list[int] = self.__bulkWrite__(RSS_DB_Connection.topic_for_article_insert, rows)
+        if failed: print(f"ERROR in RSS_DB_Connection.addArticleTopics(): {len(failed)}/{len(rows)} topics could not be added to TOPIC_FOR_ARTICLE.")
+
+        return not failed and len(rows) == len(assignments)
+
+    ''' __createTopicTable__() - create TOPIC_FOR_ARTICLE if it does not exist yet (only checked once per connection object)
+        :return False if error, True if success
+    '''
+    def __createTopicTable__(self) -> bool:
+        if self.topic_table_ready: return True
+
+        try:
+            with self.connection(autocommit=True) as (cxn, cursor): cursor.execute(RSS_DB_Connection.topic_for_article_ddl)
+        except Exception as e:
+            print("ERROR in RSS_DB_Connection.__createTopicTable__(): There was an error creating TOPIC_FOR_ARTICLE.")
+            print(e)
+            return False
+
+        self.topic_table_ready = True
+        return True
+
+    ''' newTagsFromExcel(path) - add new tagsto the DB from an excel sheet
         :param path path to the sheet
         :return False if error, True if success
     '''
@@ -614,17 +892,6 @@ class RSS_DB_Connection:
             print(e)
             return False
         
-        # Initiate connection and create cursor
-        try: 
-            cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database, autocommit=True)
-            cursor = cxn.cursor()
-        except Exception as e: 
-            print("ERROR in RSS_DB_Connection.newTagsFromExcel(): there was an error initiating the DB connection. Quitting.")
-            print(e)
-            return False
-        
-        print("NOTICE in RSS_DB_Connection.newTagsFromExcel(): excel sheet read and DB connection established successfully. Formatting query...")
-        
         # Format the queries
         tagQuery = "INSERT IGNORE INTO TAG(tag_name, tag_desc, case_sensitive) VALUES"
         tagInSetQuery = "INSERT IGNORE INTO TAG_IN_SET(id, tag_name, set_name) VALUES"
@@ -639,21 +906,28 @@ class RSS_DB_Connection:
         tagQuery = tagQuery[:-1]
         tagInSetQuery = tagInSetQuery[:-1]
 
-        # Execute the query
+        # Borrow a connection and cursor
         try: 
-            cursor.execute(tagQuery)
-            cursor.execute(tagInSetQuery)
-        except Exception as e: 
-            print(f"ERROR in RSS_DB_Connection.newTagsFromExcel(): there was an error adding the new tags or sets to the database. Terminating connections.")
+            with self.connection(autocommit=True) as (cxn, cursor):
+                print("NOTICE in RSS_DB_Connection.newTagsFromExcel(): excel sheet read and DB connection established successfully. Executing query...")
+
+                # Execute the query
+                try:
+                    cursor.execute(tagQuery)
+                    cursor.execute(tagInSetQuery)
+                except Exception as e:
+                    print(f"ERROR in RSS_DB_Connection.newTagsFromExcel(): there was an error adding the new tags or sets to the database. Terminating connections.")
+                    print(e)
+                    return False
+
+                print("NOTICE in RSS_DB_Connection.newTagsFromExcel(): new tag queries formatted and executed successfully. Terminating connections and quitting.")
+                cxn.commit()
+
+        except MySQLCxnError as e:
+            print("ERROR in RSS_DB_Connection.newTagsFromExcel(): there was an error initiating the DB connection. Quitting.")
             print(e)
-            cursor.close()
-            cxn.close()
             return False
         
-        print("NOTICE in RSS_DB_Connection.newTagsFromExcel(): new tag queries formatted and executed successfully. Terminating connections and quitting.")
-        cursor.close()
-        cxn.commit()
-        cxn.close()
         print("SUCCESS.")
         return True
     
@@ -668,17 +942,6 @@ class RSS_DB_Connection:
             print(e)
             return False
         
-        # Initiate connection and create cursor
-        try: 
-            cxn = mysql.connect(username=self.username, password=self.password, host=self.host, database=self.database, autocommit=True)
-            cursor = cxn.cursor()
-        except Exception as e: 
-            print("ERROR in RSS_DB_Connection.newTagSetsFromExcel(): there was an error initiating the DB connection. Quitting.")
-            print(e)
-            return False
-        
-        print("NOTICE in RSS_DB_Connection.newTagSetsFromExcel(): excel sheet read and DB connection established successfully. Formatting query...")
-        
         # Format the query
         query = "INSERT IGNORE INTO TAG_SET(set_name, set_desc) VALUES"
         
@@ -687,20 +950,27 @@ class RSS_DB_Connection:
             
         query = query[:-1]
         
-        # Execute the query
+        # Borrow a connection and cursor
         try: 
-            cursor.execute(query)
-        except Exception as e: 
-            print(f"ERROR in RSS_DB_Connection.newTagSetsFromExcel(): there was an error adding the new tag sets to the database. Terminating connections.")
+            with self.connection(autocommit=True) as (cxn, cursor):
+                print("NOTICE in RSS_DB_Connection.newTagSetsFromExcel(): excel sheet read and DB connection established successfully. Executing query...")
+
+                # Execute the query
+                try:
+                    cursor.execute(query)
+                except Exception as e:
+                    print(f"ERROR in RSS_DB_Connection.newTagSetsFromExcel(): there was an error adding the new tag sets to the database. Terminating connections.")
+                    print(e)
+                    return False
+
+                print("NOTICE in RSS_DB_Connection.newTagSetsFromExcel(): new tag set query formatted and executed successfully. Terminating connections and quitting.")
+                cxn.commit()
+
+        except MySQLCxnError as e:
+            print("ERROR in RSS_DB_Connection.newTagSetsFromExcel(): there was an error initiating the DB connection. Quitting.")
             print(e)
-            cursor.close()
-            cxn.close()
             return False
         
-        print("NOTICE in RSS_DB_Connection.newTagSetsFromExcel(): new tag set query formatted and executed successfully. Terminating connections and quitting.")
-        cursor.close()
-        cxn.commit()
-        cxn.close()
         print("SUCCESS.")
         return True
     
@@ -717,7 +987,42 @@ class RSS_DB_Connection:
         article.article_desc = article.article_desc.replace("\"", "")
         return article
     
-    ''' __testFeedExists__(cxn, cursor, feedTitle) - check if the given feed title exists in the DB
+    ''' __tagRows__(articles) - get the TAG_FOR_ARTICLE rows for the tags of the given articles
+        :param articles a list of RSS_Article
+        :return a list of (id, article_title, tag_name) tuples
+
+        NOTE: the TAG_FOR_ARTICLE table uses a sha1 hash of the article_title + tag_name as the ID to make sure the same article
+              isn't duplicate tagged, since mysql does not allow more than 1 primary key
+    '''
+    @staticmethod
+    def __tagRows__(articles:list[RSS_Article]) -> list[tuple]:
+        rows:list[tuple] = []
+        for a in articles:
+            for t in a.tags: rows.append((sha1(f'{a.article_title}{t}'.encode()).hexdigest(), a.article_title, t))
+        return rows
+
+    ''' __chunks__(rows, batchSize, maxBytes) - split the given rows into chunks of at most batchSize rows and about maxBytes
+        :return a generator of (index of the first row in the chunk, chunk)
+    '''
+    @staticmethod
+    def __chunks__(rows:list[tuple], batchSize:int, maxBytes:int):
+        start:int = 0
+        chunk:list[tuple] = []
+        chunkBytes:int = 0
+
+        for r in rows:
+            rowBytes:int = sum(len(str(v)) for v in r)
+            if chunk and (len(chunk) >= batchSize or chunkBytes + rowBytes > maxBytes):
+                yield start, chunk
+                start += len(chunk)
+                chunk, chunkBytes = [], 0
+
+            chunk.append(r)
+            chunkBytes += rowBytes
+
+        if chunk: yield start, chunk
+
+    ''' __testFeedExists__(cxn, cursor, feedTitle)- check if the given feed title exists in the DB
         :param cxn a mysql.MySQLConnection instance 
         :param cursor a mysql.cursor instance 
         :param feedTitle the feed title to look for 
@@ -732,23 +1037,8 @@ class RSS_DB_Connection:
         row = cursor.fetchone()
         if row is None:
             print(f"ERROR in RSS_DB_Connection.__testFeedExists__(): test query did not find any existing RSS feeds for {feedTitle}. Exiting.")
-            cursor.close()
-            cxn.close()
             return False
         else: 
             # We got results
             print(f"NOTICE in RSS_DB_Connection.__testFeedExists__(): test query found at least one result for \"{feedTitle}\". Proceeding.")
             return True
-
-
-    @staticmethod
-    def commit_close(cxn, cursor) -> bool: 
-        try: 
-            cursor.close()
-            cxn.commit()
-            cxn.close()
-            return True
-        except Exception as e:
-            print(f"ERROR in RSS_DB_Connection.update_index(): There was an error closing the database connection. Quitting.")
-            print(e)
-            return False
\ No newline at end of file
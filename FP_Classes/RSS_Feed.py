@@ -2,19 +2,21 @@
 import feedparser as  fp
 import pandas as pd
 from FP_Classes.Tag import Tag
+from FP_Classes.Tag_Matcher import Tag_Matcher
 import requests 
 from hashlib import sha1
 import os
-from bs4 import BeautifulSoup
-from threading import Timer
-from time import sleep
+from time import sleep, perf_counter
+from threading import Event, Timer
+import socket
+from FP_Classes.FP_Exceptions.FetchTimeoutError import FetchTimeoutError
 from FP_Classes.Set import Set
+from FP_Classes.Feed_Cache import Feed_Cache
+from FP_Classes.Page_Cache import Page_Cache
+from FP_Classes.Article_Extractor import Article_Extractor
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
 import datetime as dt 
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-import re
+from FP_Classes.Text_Preprocessor import Text_Preprocessor
 
 # ------------------------------------------------------------------------------------------------- #
 ''' RSS_Article - generic class for RSS articles. Each RSS Feed has its own class and nested 
@@ -31,19 +33,35 @@ class RSS_Article:
     article_desc:str        # Description/summary of this article
     tags:list[str]          # A list of tag names associated with this article
     
+    # NOTE: the content is computed lazily and cached - raw_content is fetched from the site the first time it is needed (see fetch())
+    #       and the tokens the first time they are needed (see preprocess()), unless they were already set (i.e. from the DB)
     raw_content:str               # Content of this article before any preprocessing - exactly as pulled from site
     preprocessed_content:str      # Content of this article after preprocessing - stripped down to key words for analysis
     article_tokens:dict[str,int]  # Dict of tokens and freqs
-    
-    ''' __init__(articleDiv, feedTitle, articleTitle, articleLink, articlePubDate, articleDesc) - Constructor
+    _fetched:bool                 # Whether raw_content is known (fetched, even if the fetch failed, or set)
+
+    # STATIC - deadlines (in seconds) for requests for article content. total_timeout is set from "max_req_time" in config.json
+    connect_timeout:float = 5     # Max time to establish the connection
+    read_timeout:float = 15       # Max time to wait between bytes from the server
+    total_timeout:float = 30      # Max time for the whole request, including reading the body
+    headers:dict = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+    }
+    content_not_found:str = "Content not found."    # The content of an article whose body could not be fetched or extracted
+    page_cache:Page_Cache = None         # If set, article pages and the text extracted from them are cached on disk (see Page_Cache)
+    extractor:Article_Extractor = None  # How the body is extracted from the page, set by each feed's article class (None = the articleDiv div, see Article_Extractor)
+
+    ''' __init__(articleDiv, feedTitle, articleTitle, articleLink, articlePubDate, articleDesc, process, articleContent) - Constructor
         :param articleDiv:str
         :param feedTitle:str
-        :param articleTitle:str 
-        :param articleLink:str 
+        :param articleTitle:str
+        :param articleLink:str
         :param articlePubDate:str
         :param articleDesc:str
+        :param process:bool [optional] whether to fetch and preprocess the content right away
+        :param articleContent:str [optional] the content of this article if it is already known (i.e. stored in the DB), so it is never fetched
     '''
-    def __init__(self, articleDiv:str, feedTitle:str, articleTitle:str, articleLink:str, articlePubDate:str="", articleDesc:str="", process:bool=True):
+    def __init__(self, articleDiv:str, feedTitle:str, articleTitle:str, articleLink:str, articlePubDate:str="", articleDesc:str="", process:bool=True, articleContent:str=None):
         
         articleTitle = articleTitle.replace("\"", "")
         
@@ -55,81 +73,245 @@ class RSS_Article:
         self.pub_date = RSS_Article.__standardizeDate__(articlePubDate)
         self.article_desc = articleDesc
         self.tags = []
-        
+
+        self._raw_content = articleContent
+        self._fetched = articleContent is not None
+        self._article_tokens = None
+        self._preprocessed_content = None
+
         # If we are processing this article (getting and preprocessing the content)
-        if process:
-            # If a div is specified, then get the content. Otherwise the content is not relevant (see Microsoft's implementation for an example)
-            print(f"\t[+] Getting article content...")
-            if self.articleDiv: self.raw_content = self.__getArticleContent__()
-            else: self.raw_content = self.article_title + " " + self.article_desc
-            
-            # Preprocess the content
-            print(f"\t[+] Preprocessing content...\n")
-            self.article_tokens, self.preprocessed_content = RSS_Article.__contentPreprocessing__(self.raw_content)
-            
-            # Sanitize the article's text fields to avoid any future issues with special characters 
-            self.sanitize()
-        
-    ''' classify(tags) - assign tags to this article based on the title
-        :param tags a list of tag objects that we are interested in 
+        # NOTE: when process=False the content can be processed later, i.e. by Article_Fetcher for a whole batch of articles at once,
+        #       or the first time it is needed
+        if process: self.preprocess()
+
+    @property
+    def raw_content(self) -> str:
+        if not self._fetched: self.fetch()
+        return self._raw_content
+
+    @raw_content.setter
+    def raw_content(self, rawContent:str) -> None:
+        # The tokens are for the old content. Setting None forgets the content, so it is fetched again the next time it is used
+        self._raw_content = rawContent
+        self._fetched = rawContent is not None
+        self._article_tokens = None
+        self._preprocessed_content = None
+
+    @property
+    def article_tokens(self) -> dict[str, int]:
+        if self._article_tokens is None: self.preprocess()
+        return self._article_tokens
+
+    @article_tokens.setter
+    def article_tokens(self, articleTokens:dict[str, int]) -> None: self._article_tokens = articleTokens
+
+    @property
+    def preprocessed_content(self) -> str:
+        if self._preprocessed_content is None: self.preprocess()
+        return self._preprocessed_content
+
+    @preprocessed_content.setter
+    def preprocessed_content(self, preprocessedContent:str) -> None: self._preprocessed_content = preprocessedContent
+
+    ''' hasContent() - check if the content for this article is already known (i.e. it will not be fetched when raw_content is used)
+        :return bool
+    '''
+    def hasContent(self) -> bool: return self._fetched
+
+    ''' isProcessed() - check if the content for this article is already preprocessed (i.e. the tokens will not be computed when article_tokens is used)
+        :return bool
+    '''
+    def isProcessed(self) -> bool: return self._article_tokens is not None and self._preprocessed_content is not None
+
+    ''' contentFound() - check if the content for this article is known and was actually found (i.e. it is not the placeholder for a page
+        whose body could not be fetched or extracted)
+        :return bool
+    '''
+    def contentFound(self) -> bool: return self._fetched and self._raw_content != RSS_Article.content_not_found
+
+    ''' fetch() - get the content for this article from the site (pipeline stage 1), replacing the content if it was already known
+        :return the raw content, or RSS_Article.content_not_found if it could not be fetched
+
+        NOTE: a failed fetch is stored as well (as content_not_found), so using raw_content does not request the page again
+    '''
+    def fetch(self) -> str:
+        # If a div is specified, then get the content. Otherwise the content is not relevant (see Microsoft's implementation for an example)
+        print(f"\t[+] Getting article content...")
+        content:str = self.__getArticleContent__() if self.articleDiv else self.article_title + " " + self.article_desc
+        self.raw_content = content if content is not None else RSS_Article.content_not_found
+        return self._raw_content
+
+    ''' preprocess() - preprocess the content for this article (pipeline stage 2), fetching it first if it is not known yet
+        :return void
+    '''
+    def preprocess(self) -> None: self.__processContent__(self.raw_content)
+
+    ''' __processContent__(rawContent) - set the raw content for this article, then preprocess it
+        :param rawContent:str the content of this article exactly as pulled from the site
+        :return void
+    '''
+    def __processContent__(self, rawContent:str) -> None:
+        self.raw_content = rawContent
+
+        # Preprocess the content
+        print(f"\t[+] Preprocessing content...\n")
+        self.article_tokens, self.preprocessed_content = RSS_Article.__contentPreprocessing__(self.raw_content)
+
+    ''' __setProcessedContent__(rawContent, articleTokens, preprocessedContent) - set the content for this article when it was
+        preprocessed somewhere else (i.e. in a Preprocessing_Pool worker)
+        :return void
+    '''
+    def __setProcessedContent__(self, rawContent:str, articleTokens:dict[str, int], preprocessedContent:str) -> None:
+        self.raw_content = rawContent
+        self.article_tokens = articleTokens
+        self.preprocessed_content = preprocessedContent
+
+    ''' classify(tags) - assign tags to this article based on its content
+        :param tags a list of tag objects that we are interested in, or a Tag_Matcher already compiled for them
         : return void but add the relevant tags to this instance of article
-        
+
         NOTE: Tags can be case sensitive. This is because tags can also be more than one word, thus splitting the article title/desc by " " is not
-              going to work. Allowing tags to be case sensitive mitigates false positives by finding, for example "AI" in the word "against" and 
-              similar issues. 
+              going to work. Allowing tags to be case sensitive mitigates false positives by finding, for example "AI" in the word "against" and
+              similar issues.
+        NOTE: the tags are matched with a Tag_Matcher, which is only compiled once for the same list of tags (see Tag_Matcher.forTags)
     '''
-    def classify(self, tags:list[Tag]) -> None: 
-        
-        # RULE BASED TAGGING 
-        tagstr:str = "|".join([t.tagName for t in tags])                    # For the regex expression
-        tagPattern:re.Pattern = re.compile(r'\b(' + fr'{tagstr}' + r')\b')  # Create the regex pattern
+    def classify(self, tags) -> None:
 
-        # Search this article's raw content and assign tags found 
-        if tagPattern.search(self.raw_content): self.tags = list(set(tagPattern.findall(self.raw_content)))
+        # RULE BASED TAGGING
+        matcher:Tag_Matcher = tags if isinstance(tags, Tag_Matcher) else Tag_Matcher.forTags(tags)
+
+        # Search this article's raw content (in a single pass) and assign tags found
+        found:set[str] = matcher.match(self.raw_content)
+        if found: self.tags = sorted(found)
 
     
     ''' __getArticleContent__() - get the content for this article from the site (requires self.articleDiv be valid)
-        :return this articles content as a string
-    '''        
+        :return this articles content as a string, or RSS_Article.content_not_found if there was an error
+    '''
     def __getArticleContent__(self) -> str:
         try:
-            headers = { 
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'              
-            }
-            
-            # Fetch the HTML content
-            # Start a timer to time out after a certain amount of time 
-            def timeout(): raise TimeoutError
-            try: 
-                time_lim:int = 10                   # Timeout time in seconds
-                timer = Timer(time_lim, timeout)    # Init timer 
-                print("Starting timer...")
-                timer.start()                     
-                response = requests.get(self.article_link, headers=headers)
-                timer.cancel()  
-            except TimeoutError: 
-                print("NON-CRITICAL ERROR: Request for article content timed out. Exiting.")
-                return "Content not found."
-            
-            # Check if the request was successful
-            response.raise_for_status()
-            
-            # Parse the HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Find and extract the article content
-            # We will inspect the HTML structure of the specific article to find the relevant tags
-            article_content = soup.find('div', class_=self.articleDiv)
-            
-            return article_content.get_text() if article_content else "Content not found."
-            
+            # Fetch the HTML content, bounded by the connect/read/total deadlines
+            try: html:str = RSS_Article.__download__(requests, self.article_link)
+            except FetchTimeoutError as e:
+                print(f"NON-CRITICAL ERROR: Request for article content timed out. Exiting.")
+                print(e)
+                return RSS_Article.content_not_found
+
+            return self.__extractContent__(html)
+
         except requests.exceptions.RequestException as e:
             print(f"ERROR fetching article content: {e}")
-            return 
+            return RSS_Article.content_not_found
         except Exception as e:
             print(f"ERROR: {e}")
-            return 
+            return RSS_Article.content_not_found
     
+    ''' __download__(session, link, connectTimeout, readTimeout, totalTimeout) - download the given link with enforced deadlines
+        :param session a requests.Session (or the requests module itself) to make the request with
+        :param link:str the link to download
+        :param connectTimeout, readTimeout, totalTimeout [optional] deadlines in seconds, default to the static attributes of RSS_Article
+        :return the body of the response as a string
+        :raises FetchTimeoutError if any of the deadlines are exceeded, requests.exceptions.RequestException for any other request errors
+
+        NOTE: requests only supports connect and read timeouts, and the read timeout is the max time *between* bytes, so a slow server
+              can still take forever to send a page (i.e. one byte just under the read timeout at a time). Once the response starts, a
+              watchdog timer shuts down its socket when the total deadline passes, which interrupts a read that is blocked on the server.
+        NOTE: if RSS_Article.page_cache is set, a fresh cached page is returned without a request, and a stale one is revalidated with a
+              conditional request (see Page_Cache)
+    '''
+    @staticmethod
+    def __download__(session, link:str, connectTimeout:float=None, readTimeout:float=None, totalTimeout:float=None) -> str:
+        connectTimeout = connectTimeout or RSS_Article.connect_timeout
+        readTimeout = readTimeout or RSS_Article.read_timeout
+        totalTimeout = totalTimeout or RSS_Article.total_timeout
+        startTime:float = perf_counter()
+
+        cache:Page_Cache = RSS_Article.page_cache
+        headers:dict = RSS_Article.headers
+        if cache is not None:
+            html:str = cache.getPage(link)
+            if html is not None: return html
+            headers = dict(RSS_Article.headers, **cache.validators(link))
+
+        try:
+            with session.get(link, headers=headers, timeout=(connectTimeout, readTimeout), stream=True) as response:
+                # The cached page has not changed (if it was evicted in the meantime, then request it again without the validators)
+                if response.status_code == 304 and cache is not None:
+                    html = cache.revalidated(link)
+                    if html is not None: return html
+                    return RSS_Article.__download__(session, link, connectTimeout, readTimeout, max(0.001, totalTimeout - (perf_counter() - startTime)))
+
+                # Check if the request was successful
+                response.raise_for_status()
+
+                expired:Event = Event()
+                watchdog:Timer = Timer(max(0.0, totalTimeout - (perf_counter() - startTime)), RSS_Article.__expire__, (response, expired))
+                watchdog.daemon = True
+                watchdog.start()
+
+                try:
+                    chunks:list[bytes] = []
+                    for chunk in response.iter_content(chunk_size=16 * 1024):
+                        chunks.append(chunk)
+                        if expired.is_set(): break
+                except Exception:
+                    # The read was interrupted by the watchdog
+                    if expired.is_set(): raise FetchTimeoutError(link, "total", perf_counter() - startTime)
+                    raise
+                finally: watchdog.cancel()
+
+                # A shut down socket can also look like the end of the body, so the body is incomplete
+                if expired.is_set(): raise FetchTimeoutError(link, "total", perf_counter() - startTime)
+
+                content:bytes = b"".join(chunks)
+                encoding:str = response.encoding or "utf-8"
+                if cache is not None: cache.putPage(link, content, encoding, response.headers)
+                return content.decode(encoding, errors="replace")
+
+        except requests.exceptions.ConnectTimeout: raise FetchTimeoutError(link, "connect", perf_counter() - startTime)
+        except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as e:
+            # A read timeout in the middle of the body is raised by urllib3 as a ConnectionError
+            if isinstance(e, requests.exceptions.ReadTimeout) or "Read timed out" in str(e): raise FetchTimeoutError(link, "read", perf_counter() - startTime)
+            raise
+
+    ''' __expire__(response, expired) - stop the download of the given response when its total deadline passes (runs in the watchdog thread)
+        :param response a streaming requests.Response
+        :param expired:Event set before the socket is shut down, so the downloading thread knows why its read failed
+        :return void
+    '''
+    @staticmethod
+    def __expire__(response, expired:Event) -> None:
+        expired.set()
+
+        # The socket is not exposed by requests, so look for it where urllib3 (1.x/2.x) and http.client keep it
+        for path in (("connection", "sock"), ("_connection", "sock"), ("_fp", "fp", "raw", "_sock")):
+            sock = response.raw
+            for attr in path: sock = getattr(sock, attr, None)
+            if sock is None: continue
+
+            try: sock.shutdown(socket.SHUT_RDWR)
+            except OSError: pass
+            return
+
+    ''' __extractContent__(html) - extract the article body from the HTML of this article's page (requires self.articleDiv be valid)
+        :param html:str the HTML for this article's page
+        :return this articles content as a string
+    '''
+    def __extractContent__(self, html:str) -> str:
+        extractor:Article_Extractor = self.extractor or Article_Extractor.forDiv(self.articleDiv)
+
+        # The text is only extracted again if the page (or the extraction rule) changed since it was cached
+        if RSS_Article.page_cache is not None:
+            text:str = RSS_Article.page_cache.getText(html, extractor.rule)
+            if text is not None: return text
+
+        # Find and extract the article content (see the feed's extractor for the element that contains it)
+        text = extractor.extract(html)
+        if text is None: text = RSS_Article.content_not_found
+
+        if RSS_Article.page_cache is not None: RSS_Article.page_cache.putText(html, extractor.rule, text)
+        return text
+
     ''' toList() - return this article in a meaningful list format
         :return list
     '''        
@@ -147,13 +329,17 @@ class RSS_Article:
     
     ''' sanitize() - replace the invalid characters in this article's title, description, and content
         :return void
+
+        NOTE: this is only needed when formatting the article into a query string by hand. RSS_DB_Connection passes the article's
+              fields as query parameters, so the article text is stored unchanged
     '''
     def sanitize(self) -> None:
         self.article_title = self.article_title.replace("\"", "")
         self.article_desc = self.article_desc.replace("\"", "")
-        self.raw_content = self.raw_content.replace('"', "")
-        self.raw_content = self.raw_content.replace("'", "")
-        self.raw_content = self.raw_content.replace("\\", "")
+        if not self.hasContent(): return
+        self._raw_content = self._raw_content.replace('"', "")
+        self._raw_content = self._raw_content.replace("'", "")
+        self._raw_content = self._raw_content.replace("\\", "")
         
     ''' __standardizeDate(dateStr) - convert the given date string into a standard format (YYYY-MM-DD)
         :param dateStr:str string representation of a date in arbitrary format 
@@ -170,6 +356,9 @@ class RSS_Article:
                          ]
         output_format = "%Y-%m-%d"
 
+        # Dates read from the DB are already date objects
+        if isinstance(dateStr, dt.date): return dateStr.strftime(output_format)
+
         for input_format in input_formats:
             try:
                 # Try to parse the date string using each input format
@@ -192,42 +381,11 @@ class RSS_Article:
             2. Remove stop words - remove words that have little or no meaning in the english language ("the", "a", "and", "in", etc)
             3. Lemmatization - Standardize the verb/noun tenses to their base meanings (running -> run, bicycles -> bicycle, etc)
         
-        # NOTE: run "nltk.download('wordnet') if this is the first ever time running
+        NOTE: the steps are run by the shared Text_Preprocessor, which only loads the NLTK resources once per process
         
     '''
     @staticmethod
-    def __contentPreprocessing__(text:str) -> object:
-        text = re.sub(r'\\', '', text)
-        
-        # Install the required packages from NLTK if needed 
-        try: nltk.corpus.wordnet
-        except LookupError: nltk.download('wordnet')
-        
-        try: nltk.data.find('tokenizers/punkt') 
-        except LookupError: nltk.download('punkt')
-        
-        try: nltk.corpus.stopwords.words('english')
-        except LookupError: nltk.download('stopwords') 
-        
-        # Tokenization 
-        stop_words = set(stopwords.words('english'))     # Get a set of stop words to remove (the, a, an, and, in, ...)
-        lemmatizer = WordNetLemmatizer()                 # Init lemmatizer 
-        tokens = word_tokenize(text)                     # Split the text into tokens
-        
-        new_tokens:dict[str, int] = {}
-        
-        # Perform tokenization on the list of tokens
-        #         (stemmed lowercase token)                               if (token is alpha)  and (token is not a stop word) 
-        for t in tokens:
-            t = t.lower()
-            if((not t.isalpha()) or (t in stop_words)): continue
-                        
-            t = lemmatizer.lemmatize(t)         # Stemming
-            if(not t in new_tokens): new_tokens[t] = 1  # Avoid duplicates   
-            else: new_tokens[t] += 1  
-                
-        # Join the list of tokens back as a single string and return 
-        return new_tokens, " ".join(tokens)
+    def __contentPreprocessing__(text:str) -> object: return Text_Preprocessor.shared().process(text)
 
 # ------------------------------------------------------------------------------------------------- #
 ''' RSS_Feed - generic class for RSS_feeds '''
@@ -237,18 +395,44 @@ class RSS_Feed:
     folderPath:str
     feed_title:str
     feed_link:str
-    feed_desc:str 
+    feed_desc:str
     articles:list[RSS_Article]
+    process_articles:bool       # Whether articles get their content when they are created (False -> content is fetched later in a batch, see Article_Fetcher)
+    polled_links:list[str]      # Every feed link this feed polled (to commit their validators in feed_cache once the articles are stored)
     
-    def __init__(self, folderPath:str, feedTitle:str, feedLink:str, feedDesc:str): 
+    # STATIC
+    feed_cache:Feed_Cache = None    # If set, feed links are polled with conditional requests (see Feed_Cache)
+
+    def __init__(self, folderPath:str, feedTitle:str, feedLink:str, feedDesc:str, process:bool=True):
         print(f"[+] Initializing feed: {feedTitle} | {feedLink}")
-        
+
         self.folderPath = folderPath
         self.feed_title = feedTitle
         self.feed_link = feedLink
         self.feed_desc = feedDesc
         self.articles = []
-            
+        self.process_articles = process
+        self.polled_links = []
+    
+    ''' __pollFeed__(link) - get and parse the given feed link, using a conditional request if RSS_Feed.feed_cache is set
+        :param link:str the feed link
+        :return a feedparser.FeedParserDict, or None if the feed has not changed since the last run
+    '''
+    def __pollFeed__(self, link:str) -> fp.FeedParserDict:
+        self.polled_links.append(link)
+        if RSS_Feed.feed_cache is None: return fp.parse(link)
+        return RSS_Feed.feed_cache.poll(link)
+    
+    ''' __isSeen__(seen_articles, link) - check if the article with the given link was already processed, claiming it if it was not
+        :param seen_articles:Seen_Article_Index the index of stored articles (or None to process every article)
+        :param link:str the link to the article
+        :return True if the article should be skipped, False if it is new
+    '''
+    @staticmethod
+    def __isSeen__(seen_articles:Seen_Article_Index, link:str) -> bool:
+        if seen_articles is None: return False
+        return not seen_articles.claim(link)
+
     ''' to_excel(pathToFile) - save this RSS_Feed instance to an excel file at the given path
         :param pathToFile - path to the excel file to save the RSS_Feed
         :return void, save the excel file at the given path
@@ -294,11 +478,14 @@ class RSS_Feed:
     def classifyArticles(self, tags:list[Tag], limit=0):
         print(f"[+] Classifying all articles for {self.feed_title} | number of articles: {len(self.articles)}")
         
+        # Compile the tags once for every article
+        matcher:Tag_Matcher = Tag_Matcher.forTags(tags)
+
         c=1
-        for a in self.articles: 
+        for a in self.articles:
             if limit and c >= limit: break
-            print(f"\tClassifying article {c}/{len(self.articles)}") 
-            a.classify(tags)
+            print(f"\tClassifying article {c}/{len(self.articles)}")
+            a.classify(matcher)
             c+=1
         print(f"\nNOTICE: Done classifying articles for {self.feed_title}. Exiting.")
         
@@ -0,0 +1,259 @@
+
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
+from threading import Lock
+from zlib import crc32
+import numpy as np
+import json
+import os
+
+'''
+Related_Index - an approximate nearest neighbour index of the stored articles for finding the articles most related to a given one
+                without comparing it to every stored article
+
+    Every article is reduced to a dense vector of dims floats: its TF-IDF weights (tokens hashed into num_features columns) projected
+    through a fixed random Gaussian matrix, then L2 normalized. Random projection approximately preserves the cosine similarity of the
+    TF-IDF vectors, and the vectors are small enough (512 bytes) to keep every stored article in memory.
+
+    The vectors are indexed by signed random projection LSH: num_tables tables, each keyed by the signs of the vector's dot products with
+    num_bits random hyperplanes. Similar vectors usually share a key in at least one table. A query looks up its own key and the keys one
+    bit away (multi-probe) in every table, then ranks only those candidates by their exact cosine similarity - a fraction of the corpus.
+
+    Each table is a pair of arrays (the rows sorted by key, and the sorted keys), so looking up a key is a binary search and its rows are
+    a slice - no Python objects per row. Rows added since the tables were last sorted are compared directly, and the tables are sorted
+    again once there are enough of them (see __reindex__).
+
+    Articles are identified by the same key as Seen_Article_Index. The index is updated as articles are stored (see
+    RSS_DB_Connection.addArticles()). The IDF weights are the ones at the time each article is added.
+
+    Files (in the given directory):
+        vectors.npy ...... float32 vectors, one row per article
+        codes.npy ........ uint32 LSH key of every article in every table
+        doc_freqs.npy .... number of articles with each hashed feature
+        docs.json ........ [key, feed_title, article_title, article_link] for each row
+'''
+class Related_Index:
+
+    vectors:np.ndarray                      # float32 vector of every article (one row per article, the array grows in blocks)
+    codes:np.ndarray                        # uint32 LSH key of every article in every table (rows x num_tables)
+    num_vectors:int                         # Number of rows of vectors/codes that are used
+    doc_freqs:np.ndarray                    # Number of articles with each hashed feature, for the IDF weights
+    docs:list[list]                         # [key, feed_title, article_title, article_link] for each row
+    doc_keys:dict[str, int]                 # Article key -> row
+    table_rows:np.ndarray                   # For each table (row), the indexed rows sorted by their key in that table
+    table_codes:np.ndarray                  # For each table (row), the keys of table_rows (sorted)
+    num_indexed:int                         # Number of rows in the tables, the rows after it are compared directly (see __reindex__)
+    lock:Lock
+
+    # STATIC
+    dims:int = 128                  # Length of the vectors
+    num_features:int = 2**14        # Number of hashed token features
+    num_tables:int = 16             # Number of LSH tables
+    num_bits:int = 10               # Number of hyperplanes (bits in a key) per table
+    seed:int = 7                    # The projections must be the same every run, since the vectors are saved
+    projection:np.ndarray = None    # num_features x dims random Gaussian matrix (8MB), built the first time it is needed (see __projections__())
+    hyperplanes:np.ndarray = None   # dims x (num_tables * num_bits) random hyperplanes, built with the projection
+    projection_lock:Lock = Lock()
+
+    def __init__(self):
+        self.vectors = np.zeros((0, Related_Index.dims), dtype=np.float32)
+        self.codes = np.zeros((0, Related_Index.num_tables), dtype=np.uint32)
+        self.num_vectors = 0
+        self.doc_freqs = np.zeros(Related_Index.num_features, dtype=np.int64)
+        self.docs = []
+        self.doc_keys = {}
+        self.table_rows = np.zeros((Related_Index.num_tables, 0), dtype=np.int64)
+        self.table_codes = np.zeros((Related_Index.num_tables, 0), dtype=np.uint32)
+        self.num_indexed = 0
+        self.lock = Lock()
+
+    ''' addArticles(articles) - add the given (processed) articles to the index, skipping the articles that are already in it
+        :param articles a list of RSS_Article with article_tokens
+        :return the number of articles added
+    '''
+    def addArticles(self, articles:list) -> int:
+        numAdded:int = 0
+
+        with self.lock:
+            for a in articles:
+                key:str = Seen_Article_Index.articleKey(a.article_link)
+                if key in self.doc_keys or not getattr(a, 'article_tokens', None): continue
+
+                features, counts = Related_Index.__features__(a.article_tokens)
+                self.doc_freqs[features] += 1
+                self.__add__(key, [a.feed_title, a.article_title, a.article_link], self.__vector__(features, counts))
+                numAdded += 1
+
+        return numAdded
+
+    ''' related(article, k) - get the stored articles most related to the given (processed) article
+        :param article an RSS_Article with article_tokens (it does not have to be in the index)
+        :param k:int [optional] max number of results
+        :return a list of ([feed_title, article_title, article_link], cosine similarity), most related first
+    '''
+    def related(self, article, k:int=10) -> list[tuple]:
+        if k <= 0: return []
+        key:str = Seen_Article_Index.articleKey(article.article_link)
+
+        with self.lock:
+            # Use the stored vector if the article is in the index, otherwise compute it
+            if key in self.doc_keys: vector:np.ndarray = self.vectors[self.doc_keys[key]]
+            elif getattr(article, 'article_tokens', None): vector = self.__vector__(*Related_Index.__features__(article.article_tokens))
+            else: return []
+
+            return [(self.docs[row][1:], similarity) for row, similarity in self.__search__(vector, k, exclude=self.doc_keys.get(key, -1))]
+
+    ''' save(directory) - save this index to the given directory
+        :param directory:str
+        :return False if error, True if success
+    '''
+    def save(self, directory:str) -> bool:
+        with self.lock: vectors, codes, docFreqs, docs = self.vectors[:self.num_vectors], self.codes[:self.num_vectors], self.doc_freqs.copy(), list(self.docs)
+
+        try:
+            if not os.path.exists(directory): os.makedirs(directory)
+            np.save(os.path.join(directory, "vectors.npy"), vectors)
+            np.save(os.path.join(directory, "codes.npy"), codes)
+            np.save(os.path.join(directory, "doc_freqs.npy"), docFreqs)
+            with open(os.path.join(directory, "docs.json"), 'w') as file: json.dump(docs, file)
+        except Exception as e:
+            print(f"ERROR in Related_Index.save(): there was an error writing to \"{directory}\".")
+            print(e)
+            return False
+
+        return True
+
+    ''' load(directory) - load an index saved with save()
+        :param directory:str
+        :return a Related_Index, or None if the index does not exist or could not be read
+    '''
+    @staticmethod
+    def load(directory:str):
+        try:
+            vectors:np.ndarray = np.load(os.path.join(directory, "vectors.npy"))
+            codes:np.ndarray = np.load(os.path.join(directory, "codes.npy"))
+            docFreqs:np.ndarray = np.load(os.path.join(directory, "doc_freqs.npy"))
+            with open(os.path.join(directory, "docs.json")) as file: docs:list[list] = json.load(file)
+        except FileNotFoundError: return None
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Related_Index.load(): there was an error reading \"{directory}\".")
+            print(e)
+            return None
+
+        numVectors:int = min(len(vectors), len(codes), len(docs))
+
+        index = Related_Index()
+        index.vectors, index.codes, index.num_vectors = vectors[:numVectors].copy(), codes[:numVectors].copy(), numVectors
+        index.doc_freqs = docFreqs
+        index.docs = docs[:numVectors]
+        index.doc_keys = {d[0]: i for i, d in enumerate(index.docs)}
+        index.__reindex__()
+
+        return index
+
+    ''' __features__(tokens) - hash the given token frequencies into features
+        :param tokens:dict[str, int]
+        :return (array of the feature of every token, array of the counts of every token)
+    '''
+    @staticmethod
+    def __features__(tokens:dict[str, int]) -> tuple[np.ndarray, np.ndarray]:
+        features:np.ndarray = np.fromiter((crc32(t.encode()) % Related_Index.num_features for t in tokens), dtype=np.int64, count=len(tokens))
+        counts:np.ndarray = np.fromiter(tokens.values(), dtype=np.float32, count=len(tokens))
+
+        # Tokens that hash to the same feature
+        features, inverse = np.unique(features, return_inverse=True)
+        return features, np.bincount(inverse, weights=counts).astype(np.float32)
+
+    ''' __vector__(features, counts) - get the normalized, projected TF-IDF vector for the given features
+        :return a float32 array of length dims
+    '''
+    def __vector__(self, features:np.ndarray, counts:np.ndarray) -> np.ndarray:
+        idf:np.ndarray = np.log((1 + self.num_vectors) / (1 + self.doc_freqs[features])) + 1
+        weights:np.ndarray = ((1 + np.log(counts)) * idf).astype(np.float32)     # Sublinear tf, so long articles do not dominate
+
+        vector:np.ndarray = weights @ Related_Index.__projections__()[0][features]
+        norm:float = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    ''' __codes__(vector) - get the LSH key of the given vector in every table
+        :return a uint32 array (one per table)
+    '''
+    @staticmethod
+    def __codes__(vector:np.ndarray) -> np.ndarray:
+        bits:np.ndarray = (vector @ Related_Index.__projections__()[1] > 0).reshape(Related_Index.num_tables, Related_Index.num_bits)
+        return (bits.astype(np.uint32) << np.arange(Related_Index.num_bits, dtype=np.uint32)).sum(axis=1, dtype=np.uint32)
+
+    ''' __projections__() - get the random projection and the LSH hyperplanes, building them on the first call (so importing this module,
+        or a run that never adds or looks up an article, does not build an 8MB matrix)
+        :return (projection, hyperplanes)
+    '''
+    @staticmethod
+    def __projections__() -> tuple[np.ndarray, np.ndarray]:
+        if Related_Index.projection is None:
+            with Related_Index.projection_lock:
+                # Another thread may have built them in the meantime
+                if Related_Index.projection is None:
+                    rng:np.random.RandomState = np.random.RandomState(Related_Index.seed + 1)
+                    Related_Index.hyperplanes = rng.standard_normal((Related_Index.dims, Related_Index.num_tables * Related_Index.num_bits)).astype(np.float32)
+                    rng = np.random.RandomState(Related_Index.seed)
+                    Related_Index.projection = (rng.standard_normal((Related_Index.num_features, Related_Index.dims)) / np.sqrt(Related_Index.dims)).astype(np.float32)
+
+        return Related_Index.projection, Related_Index.hyperplanes
+
+    ''' __reindex__() - sort the tables again so they include every row
+        :return void
+    '''
+    def __reindex__(self) -> None:
+        codes:np.ndarray = np.ascontiguousarray(self.codes[:self.num_vectors].T)     # One row per table, so every lookup is contiguous
+        self.table_rows = np.argsort(codes, axis=1, kind='stable')
+        self.table_codes = np.take_along_axis(codes, self.table_rows, axis=1)
+        self.num_indexed = self.num_vectors
+
+    ''' __add__(key, doc, vector) - add an article's vector to the index and its tables
+        :return void
+    '''
+    def __add__(self, key:str, doc:list, vector:np.ndarray) -> None:
+        # Grow the arrays in blocks so adding an article is amortized O(dims)
+        if self.num_vectors == len(self.vectors):
+            size:int = max(1024, 2 * len(self.vectors))
+            self.vectors = np.resize(self.vectors, (size, Related_Index.dims))
+            self.codes = np.resize(self.codes, (size, Related_Index.num_tables))
+
+        row:int = self.num_vectors
+        self.vectors[row] = vector
+        self.codes[row] = Related_Index.__codes__(vector)
+        self.num_vectors += 1
+        self.docs.append([key] + list(doc))
+        self.doc_keys[key] = row
+
+        # Sorting the tables is O(n log n), so only do it once the unsorted rows are a sizable fraction of the index
+        if self.num_vectors - self.num_indexed > max(1024, self.num_indexed // 8): self.__reindex__()
+
+    ''' __search__(vector, k, exclude) - get the k rows most similar to the given vector
+        :param exclude:int [optional] a row to leave out of the results (i.e. the article itself)
+        :return a list of (row, cosine similarity), most similar first
+    '''
+    def __search__(self, vector:np.ndarray, k:int, exclude:int=-1) -> list[tuple[int, float]]:
+        # Probe every table's bucket for the vector, and the buckets one bit away from it
+        masks:np.ndarray = np.concatenate(([0], 1 << np.arange(Related_Index.num_bits))).astype(np.uint32)
+        buckets:list[np.ndarray] = [np.arange(self.num_indexed, self.num_vectors)]     # The rows that are not in the tables yet
+
+        for t, code in enumerate(Related_Index.__codes__(vector)):
+            probes:np.ndarray = code ^ masks
+            starts:np.ndarray = np.searchsorted(self.table_codes[t], probes, side='left')
+            ends:np.ndarray = np.searchsorted(self.table_codes[t], probes, side='right')
+            buckets.extend(self.table_rows[t, start:end] for start, end in zip(starts.tolist(), ends.tolist()) if end > start)
+
+        # Remove the rows found in more than one table
+        found:np.ndarray = np.zeros(self.num_vectors, dtype=bool)
+        found[np.concatenate(buckets)] = True
+        if exclude >= 0: found[exclude] = False
+        rows:np.ndarray = np.flatnonzero(found)
+        if not len(rows): return []
+
+        # Rank the candidates by their exact cosine similarity (the vectors are normalized)
+        similarities:np.ndarray = self.vectors[rows] @ vector
+        top:np.ndarray = np.argpartition(-similarities, k - 1)[:k] if len(rows) > k else np.arange(len(rows))
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        return [(int(rows[i]), round(float(similarities[i]), 4)) for i in top]
+
+    def __len__(self) -> int: return self.num_vectors
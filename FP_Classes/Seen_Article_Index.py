@@ -0,0 +1,152 @@
+
+from hashlib import sha1
+from threading import Lock
+import json
+import os
+
+'''
+Seen_Article_Index - a hashed index of the articles that are already stored in the DB, used by the feeds to skip articles we have
+                     already processed
+
+    Articles are identified by a sha1 hash of their (normalized) link rather than their title, since titles are not unique across
+    feeds and can change after an article is published. Lookups are O(1) set lookups no matter how many articles are in the DB.
+
+    The index is loaded once per process (see RSS_DB_Connection.getSeenArticleIndex()) and updated incrementally as new articles are
+    inserted (see RSS_DB_Connection.addArticles()).
+
+    The index is also saved locally between runs along with a high-water mark (the largest article_id in the DB when it was loaded).
+    On the next run only the rows with an article_id above the high-water mark are read from the DB, so startup time and DB traffic
+    stay flat as the ARTICLE table grows.
+
+    The links of the articles that were dropped as near-duplicates of stored articles (see Duplicate_Index) are kept separately: they are
+    never stored, so they are not counted as a feed's articles, but they are not fetched again either.
+
+    File format (json):
+        { "high_water_mark": int, "feeds": { feed_title: [key, ...], ... }, "duplicates": [key, ...] }
+
+    Since the feeds are initialized concurrently, a feed "claims" a link before it creates an article for it. A link can only be claimed
+    once per run, so the same article showing up in more than one feed link (i.e. the State Dept. feeds) is only fetched once.
+'''
+class Seen_Article_Index:
+
+    keys:dict[str, str]             # Hashes of the links of the articles in the DB -> feed title
+    claimed:set[str]                # Hashes of the links claimed by a feed during this run (not yet stored)
+    duplicates:set[str]             # Hashes of the links of the near-duplicates of stored articles (never stored)
+    feed_counts:dict[str, int]      # Number of stored articles for each feed title
+    high_water_mark:int             # Largest article_id that has been reconciled with the DB
+    lock:Lock
+
+    def __init__(self):
+        self.keys = {}
+        self.claimed = set()
+        self.duplicates = set()
+        self.feed_counts = {}
+        self.high_water_mark = 0
+        self.lock = Lock()
+
+    ''' articleKey(link) - get the key for the article with the given link
+        :param link:str the link to an article
+        :return the sha1 hash of the normalized link as a hex string
+    '''
+    @staticmethod
+    def articleKey(link:str) -> str:
+        link = str(link).strip().split('#')[0].rstrip('/')
+        return sha1(link.encode()).hexdigest()
+
+    ''' add(link, feedTitle) - add a stored article to the index
+        :param link:str the link to the article
+        :param feedTitle:str [optional] the title of the feed the article belongs to
+        :return void
+    '''
+    def add(self, link:str, feedTitle:str="") -> None: self.__addKey__(Seen_Article_Index.articleKey(link), feedTitle)
+
+    ''' __addKey__(key, feedTitle) - add the given key (see articleKey()) to the index
+        :return void
+    '''
+    def __addKey__(self, key:str, feedTitle:str="") -> None:
+        with self.lock:
+            if key in self.keys: return
+            self.keys[key] = feedTitle
+            self.claimed.discard(key)
+            self.duplicates.discard(key)
+            if feedTitle: self.feed_counts[feedTitle] = self.feed_counts.get(feedTitle, 0) + 1
+
+    ''' addArticles(articles) - add a list of stored articles to the index
+        :param articles a list of RSS_Article
+        :return void
+    '''
+    def addArticles(self, articles:list) -> None:
+        for a in articles: self.add(a.article_link, a.feed_title)
+
+    ''' addDuplicates(articles) - add a list of articles that were dropped as near-duplicates of stored articles (so they are not fetched again)
+        :param articles a list of RSS_Article
+        :return void
+    '''
+    def addDuplicates(self, articles:list) -> None:
+        with self.lock:
+            for a in articles:
+                key:str = Seen_Article_Index.articleKey(a.article_link)
+                if key in self.keys: continue
+                self.duplicates.add(key)
+                self.claimed.discard(key)
+
+    ''' claim(link) - claim the given link for processing during this run
+        :param link:str the link to an article
+        :return True if the article has not been seen or claimed before, False if it has
+    '''
+    def claim(self, link:str) -> bool:
+        key:str = Seen_Article_Index.articleKey(link)
+        with self.lock:
+            if key in self.keys or key in self.claimed or key in self.duplicates: return False
+            self.claimed.add(key)
+            return True
+
+    ''' countForFeed(feedTitle) - get the number of stored articles for the given feed title
+        :return int
+    '''
+    def countForFeed(self, feedTitle:str) -> int: return self.feed_counts.get(feedTitle, 0)
+
+    ''' save(path) - save this index and its high-water mark to the given json file
+        :param path:str path to the json file
+        :return False if error, True if success
+    '''
+    def save(self, path:str) -> bool:
+        with self.lock:
+            feeds:dict[str, list[str]] = {}
+            for key, feedTitle in self.keys.items(): feeds.setdefault(feedTitle, []).append(key)
+            data:dict = {'high_water_mark': self.high_water_mark, 'feeds': feeds, 'duplicates': sorted(self.duplicates)}
+
+        try:
+            if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)): os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as file: json.dump(data, file)
+        except Exception as e:
+            print(f"ERROR in Seen_Article_Index.save(): there was an error writing to \"{path}\".")
+            print(e)
+            return False
+
+        return True
+
+    ''' load(path) - load an index saved with save()
+        :param path:str path to the json file
+        :return a Seen_Article_Index, or None if the file does not exist or could not be read
+    '''
+    @staticmethod
+    def load(path:str):
+        try:
+            with open(path) as file: data:dict = json.load(file)
+        except FileNotFoundError: return None
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Seen_Article_Index.load(): there was an error reading \"{path}\".")
+            print(e)
+            return None
+
+        index = Seen_Article_Index()
+        index.high_water_mark = int(data.get('high_water_mark', 0))
+        for feedTitle, keys in data.get('feeds', {}).items():
+            for key in keys: index.__addKey__(key, feedTitle)
+        index.duplicates = set(data.get('duplicates', [])) - index.keys.keys()
+        return index
+
+    def __contains__(self, link:str) -> bool: return Seen_Article_Index.articleKey(link) in self.keys
+
+    def __len__(self) -> int: return len(self.keys)
@@ -0,0 +1,137 @@
+
+from FP_Classes.Tag import Tag
+from FP_Classes.Tag_Matcher import Tag_Matcher
+from hashlib import sha1
+import pickle
+import json
+import os
+
+'''
+Tag_Cache - a small persistent cache so the tags are only re-read and re-compiled when they actually change
+
+    The cache keeps track of three things between runs:
+        1. The sha1 digest of every tag file that has been loaded into the DB (i.e. all_tags.xlsx), so newTagsFromExcel() can be skipped
+           when the file has not changed (see fileChanged() and markFile())
+        2. The checksum of the TAG and TAG_IN_SET tables (see RSS_DB_Connection.getTagTablesChecksum()) and the tags that were in them,
+           so the tags are only queried again when the tables change (see getTags())
+        3. The compiled Tag_Matcher for each list of tags, pickled in "<cache dir>/tag_matchers/" and keyed by a digest of the tag
+           definitions, so the tags are only compiled again when they change (see getMatcher())
+
+    The pickled matchers are versioned (format_version), so a change to Tag_Matcher only needs a bump of format_version to invalidate them.
+
+    File format (json):
+        { "files": { path: digest, ... }, "db_checksum": str, "tags": [{"tag_name", "tag_desc", "case_sensitive"}, ...] }
+'''
+class Tag_Cache:
+
+    path:str                # Path to the json file for this cache
+    matcher_dir:str         # Directory of the pickled matchers
+    data:dict               # The contents of the json file
+
+    # STATIC
+    format_version:int = 1  # Version of the pickled Tag_Matcher format
+
+    ''' __init__(path) - Constructor, loads the cache from the given path if it exists
+        :param path:str path to the json file for this cache
+    '''
+    def __init__(self, path:str):
+        self.path = path
+        self.matcher_dir = os.path.join(os.path.dirname(path), "tag_matchers")
+        self.data = {'files': {}, 'db_checksum': "", 'tags': []}
+
+        try:
+            with open(self.path) as file: self.data.update(json.load(file))
+        except FileNotFoundError: pass
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Tag_Cache.__init__(): there was an error reading \"{self.path}\". Starting with an empty cache.")
+            print(e)
+
+    ''' fileChanged(pathToFile) - check if the given tag file has changed since it was last marked (see markFile())
+        :param pathToFile:str
+        :return True if the file changed or has never been marked, False if not
+    '''
+    def fileChanged(self, pathToFile:str) -> bool:
+        digest:str = Tag_Cache.__fileDigest__(pathToFile)
+        return not digest or self.data['files'].get(pathToFile) != digest
+
+    ''' markFile(pathToFile) - record the current digest of the given tag file (i.e. after it was loaded into the DB successfully)
+        :return void
+    '''
+    def markFile(self, pathToFile:str) -> None:
+        digest:str = Tag_Cache.__fileDigest__(pathToFile)
+        if digest: self.data['files'][pathToFile] = digest
+
+    ''' getTags(dbConn) - get all of the tags in the DB, only querying them if TAG or TAG_IN_SET changed since the last time
+        :param dbConn an RSS_DB_Connection
+        :return a list of Tag
+    '''
+    def getTags(self, dbConn) -> list[Tag]:
+        checksum:str = dbConn.getTagTablesChecksum()
+
+        if checksum and checksum == self.data['db_checksum'] and self.data['tags']:
+            print("NOTICE in Tag_Cache.getTags(): The tag tables have not changed. Using the cached tags.")
+            return [Tag.tagFromDict(d) for d in self.data['tags']]
+
+        tags:list[Tag] = dbConn.getAllTags()
+        self.data['db_checksum'] = checksum
+        self.data['tags'] = [{'tag_name': t.tagName, 'tag_desc': t.tagDesc, 'case_sensitive': t.caseSensitive} for t in tags]
+        return tags
+
+    ''' getMatcher(tags) - get the compiled Tag_Matcher for the given tags, loading it from the cache or compiling (and caching) it
+        :param tags:list[Tag]
+        :return Tag_Matcher
+
+        NOTE: the matcher is also registered with Tag_Matcher.forTags() (in the same bounded set of compiled matchers) so
+              RSS_Article.classify() uses it for the same list of tags
+    '''
+    def getMatcher(self, tags:list[Tag]) -> Tag_Matcher:
+        key:tuple = tuple((t.tagName, Tag_Matcher.__isCaseSensitive__(t)) for t in tags)
+        with Tag_Matcher.compiled_lock:
+            if key in Tag_Matcher.compiled: return Tag_Matcher.compiled[key]
+
+        pathToMatcher:str = os.path.join(self.matcher_dir, sha1(json.dumps(sorted(key)).encode()).hexdigest() + ".pickle")
+
+        matcher:Tag_Matcher = None
+        try:
+            with open(pathToMatcher, 'rb') as file: version, matcher = pickle.load(file)
+            if version != Tag_Cache.format_version: matcher = None
+        except FileNotFoundError: pass
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Tag_Cache.getMatcher(): there was an error reading \"{pathToMatcher}\". Compiling the tags.")
+            print(e)
+            matcher = None
+
+        if matcher is None:
+            print(f"NOTICE in Tag_Cache.getMatcher(): Compiling {len(tags)} tags.")
+            matcher = Tag_Matcher(tags)
+            try:
+                if not os.path.exists(self.matcher_dir): os.makedirs(self.matcher_dir)
+                with open(pathToMatcher, 'wb') as file: pickle.dump((Tag_Cache.format_version, matcher), file)
+            except Exception as e:
+                print(f"NON-CRITICAL ERROR in Tag_Cache.getMatcher(): there was an error writing \"{pathToMatcher}\".")
+                print(e)
+
+        return Tag_Matcher.__remember__(key, matcher)
+
+    ''' save() - write this cache to self.path
+        :return False if error, True if success
+    '''
+    def save(self) -> bool:
+        try:
+            if os.path.dirname(self.path) and not os.path.exists(os.path.dirname(self.path)): os.makedirs(os.path.dirname(self.path))
+            with open(self.path, 'w') as file: json.dump(self.data, file, indent=4)
+        except Exception as e:
+            print(f"ERROR in Tag_Cache.save(): there was an error writing to \"{self.path}\".")
+            print(e)
+            return False
+
+        return True
+
+    ''' __fileDigest__(pathToFile) - get the sha1 digest of the given file
+        :return the digest as a hex string, "" if the file could not be read
+    '''
+    @staticmethod
+    def __fileDigest__(pathToFile:str) -> str:
+        try:
+            with open(pathToFile, 'rb') as file: return sha1(file.read()).hexdigest()
+        except Exception: return ""
@@ -0,0 +1,192 @@
+
+from FP_Classes.Tag import Tag
+from collections import deque
+from threading import Lock
+
+'''
+Aho_Corasick - an Aho-Corasick automaton over a fixed list of patterns, to find every occurrence of every pattern in a single pass
+               over the text no matter how many patterns there are
+
+    Nodes are numbered from 0 (the root). goto[n] maps a character to the next node, fail[n] is the node for the longest proper suffix of
+    node n that is also a prefix of some pattern, and out[n] is the ids of every pattern that ends at node n (including through fail links).
+'''
+class Aho_Corasick:
+
+    patterns:list[str]
+    goto:list[dict[str, int]]
+    fail:list[int]
+    out:list[list[int]]
+
+    def __init__(self, patterns:list[str]):
+        self.patterns = patterns
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+        # Build the trie
+        for pid, p in enumerate(patterns):
+            if not p: continue
+            node:int = 0
+            for c in p:
+                if c not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[node][c] = len(self.goto) - 1
+                node = self.goto[node][c]
+            self.out[node].append(pid)
+
+        # Set the fail links breadth first, so a node's fail link is always set before its children's
+        queue:deque = deque(self.goto[0].values())
+        while queue:
+            node:int = queue.popleft()
+            for c, child in self.goto[node].items():
+                queue.append(child)
+                f:int = self.fail[node]
+                while f and c not in self.goto[f]: f = self.fail[f]
+                self.fail[child] = self.goto[f].get(c, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    ''' iter(text) - find every occurrence of every pattern in the given text
+        :param text:str
+        :return a generator of (pattern id, start index, end index (exclusive))
+    '''
+    def iter(self, text:str):
+        goto, fail, out, patterns = self.goto, self.fail, self.out, self.patterns
+        node:int = 0
+
+        for i, c in enumerate(text):
+            while node and c not in goto[node]: node = fail[node]
+            node = goto[node].get(c, 0)
+            for pid in out[node]: yield pid, i + 1 - len(patterns[pid]), i + 1
+
+'''
+Tag_Matcher - finds the tags (by name) that occur in a text, compiled once for a list of tags
+
+    There are two tiers: one automaton for the case sensitive tags, and one for the rest, which is run over a lowercase copy of the text.
+    A match only counts if it is a whole word - if the tag starts (ends) with a letter, digit or "_" then the character before (after) the
+    match cannot be one. This is the same as "\\b" in a regex for tags like "AI", but also works for tags that start or end with
+    punctuation (i.e. "C++").
+
+    Tag names are matched without leading/trailing whitespace. Use Tag_Matcher.forTags(tags) to reuse the matcher for a list of tags
+    that has already been compiled.
+'''
+class Tag_Matcher:
+
+    tag_names:list[str]                 # The tag names in the same order as the patterns of both automata
+    case_sensitive:Aho_Corasick         # Automaton for the case sensitive tags
+    case_insensitive:Aho_Corasick       # Automaton for the case insensitive tags (lowercase patterns)
+    cs_names:list[str]                  # Tag name for each pattern of case_sensitive
+    ci_names:list[str]                  # Tag name for each pattern of case_insensitive
+
+    # STATIC - matchers that have already been compiled, keyed by the tags they were compiled for
+    compiled:dict[tuple, object] = {}
+    max_compiled:int = 8
+    compiled_lock:Lock = Lock()
+
+    ''' __init__(tags) - Constructor, compiles the matcher for the given tags
+        :param tags:list[Tag] the tags to match
+    '''
+    def __init__(self, tags:list[Tag]):
+        csPatterns:list[str] = []
+        ciPatterns:list[str] = []
+        self.cs_names = []
+        self.ci_names = []
+        self.tag_names = []
+
+        for t in tags:
+            pattern:str = str(t.tagName).strip()
+            if not pattern: continue
+            self.tag_names.append(t.tagName)
+
+            if Tag_Matcher.__isCaseSensitive__(t):
+                csPatterns.append(pattern)
+                self.cs_names.append(t.tagName)
+            else:
+                ciPatterns.append(pattern.lower())
+                self.ci_names.append(t.tagName)
+
+        self.case_sensitive = Aho_Corasick(csPatterns)
+        self.case_insensitive = Aho_Corasick(ciPatterns)
+
+    ''' match(text) - find the tags that occur in the given text
+        :param text:str
+        :return a set of the names of the tags that occur in the text
+    '''
+    def match(self, text:str) -> set[str]:
+        if not text: return set()
+        found:set[str] = set()
+
+        if self.cs_names: found |= Tag_Matcher.__matchTier__(self.case_sensitive, self.cs_names, text, text)
+
+        if self.ci_names:
+            # lower() can change the length of some (rare) characters, which would throw off the offsets for the boundary checks
+            lowered:str = text.lower()
+            if len(lowered) != len(text): lowered = "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+            found |= Tag_Matcher.__matchTier__(self.case_insensitive, self.ci_names, lowered, text)
+
+        return found
+
+    ''' matchArticles(articles) - find the tags for a batch of articles, setting each article's tags (see RSS_Article.classify())
+        :param articles a list of RSS_Article
+        :return void
+    '''
+    def matchArticles(self, articles:list) -> None:
+        for a in articles: a.classify(self)
+
+    ''' forTags(tags) - get the compiled matcher for the given tags, compiling it if it has not been compiled yet
+        :param tags:list[Tag]
+        :return Tag_Matcher
+    '''
+    @staticmethod
+    def forTags(tags:list[Tag]):
+        key:tuple = tuple((t.tagName, Tag_Matcher.__isCaseSensitive__(t)) for t in tags)
+
+        with Tag_Matcher.compiled_lock:
+            if key in Tag_Matcher.compiled: return Tag_Matcher.compiled[key]
+
+        return Tag_Matcher.__remember__(key, Tag_Matcher(tags))
+
+    ''' __remember__(key, matcher) - add a compiled matcher to Tag_Matcher.compiled, dropping the oldest one if there are max_compiled
+        :param key:tuple the (tag name, case sensitive) of every tag the matcher was compiled for
+        :param matcher:Tag_Matcher
+        :return the matcher for the key (the one already there if another thread added it first)
+    '''
+    @staticmethod
+    def __remember__(key:tuple, matcher):
+        with Tag_Matcher.compiled_lock:
+            if key in Tag_Matcher.compiled: return Tag_Matcher.compiled[key]
+            if len(Tag_Matcher.compiled) >= Tag_Matcher.max_compiled: Tag_Matcher.compiled.pop(next(iter(Tag_Matcher.compiled)))
+            Tag_Matcher.compiled[key] = matcher
+            return matcher
+
+    ''' __matchTier__(automaton, names, searchText, text) - run one of the automata over the text, keeping only whole word matches
+        :param searchText:str the text to run the automaton over (the lowercase copy for the case insensitive tier)
+        :param text:str the original text (same length as searchText)
+        :return a set of tag names
+    '''
+    @staticmethod
+    def __matchTier__(automaton:Aho_Corasick, names:list[str], searchText:str, text:str) -> set[str]:
+        found:set[str] = set()
+        patterns:list[str] = automaton.patterns
+
+        for pid, start, end in automaton.iter(searchText):
+            if names[pid] in found: continue
+            p:str = patterns[pid]
+
+            # Whole word checks
+            if Tag_Matcher.__isWord__(p[0]) and start > 0 and Tag_Matcher.__isWord__(text[start - 1]): continue
+            if Tag_Matcher.__isWord__(p[-1]) and end < len(text) and Tag_Matcher.__isWord__(text[end]): continue
+
+            found.add(names[pid])
+
+        return found
+
+    @staticmethod
+    def __isWord__(c:str) -> bool: return c.isalnum() or c == "_"
+
+    @staticmethod
+    def __isCaseSensitive__(tag:Tag) -> bool:
+        # case_sensitive can come from json (bool), the DB (int) or an excel sheet (bool or str)
+        if isinstance(tag.caseSensitive, str): return tag.caseSensitive.strip().lower() in ("true", "1", "yes")
+        return bool(tag.caseSensitive)
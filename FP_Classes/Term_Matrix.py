@@ -0,0 +1,197 @@
+
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
+from FP_Classes.Vocabulary import Vocabulary
+from scipy.sparse import csr_matrix
+from array import array
+from threading import Lock
+import numpy as np
+import json
+import os
+
+'''
+Term_Matrix - a persistent, append-only document-term matrix (token counts) of the stored articles in CSR format, with its Vocabulary
+
+    The matrix is updated as articles are stored (see main.py), so the clustering techniques can load the counts straight from disk
+    instead of fetching and tokenizing every article again. The arrays are memory-mapped read only, so loading the matrix does not read
+    (or copy) it into memory - the pages are read by the OS as they are used.
+
+    Rows are only ever appended: a row is the token counts of one article (identified by the same key as Seen_Article_Index, so adding an
+    article twice does nothing) and a column is a term id from the vocabulary. Since term ids never change, old rows stay valid as the
+    vocabulary grows - the matrix just gets wider.
+
+    Files (in the given directory):
+        vocabulary.txt ... the terms, one per line (see Vocabulary.save())
+        indptr.bin ....... int32 row offsets into indices/data, starting with 0 (one more than the number of rows)
+        indices.bin ...... int32 term ids of every row, sorted within each row
+        data.bin ......... int32 counts of the terms in indices.bin
+        rows.jsonl ....... [key, feed_title, article_title, article_link] for each row
+
+    NOTE: the files are written in dependency order (vocabulary, indices/data, indptr, rows) so a run that dies part way through an append
+          only leaves trailing data that is not referenced by any row. It is ignored on load and overwritten by the next append.
+    NOTE: int32 indices (what scipy expects, so the arrays are not copied) limit the matrix to ~2 billion non-zero counts.
+'''
+class Term_Matrix:
+
+    directory:str                   # Directory the matrix is stored in
+    vocabulary:Vocabulary           # Term id (column) <-> term
+    rows:list[list]                 # [key, feed_title, article_title, article_link] for each row
+    row_keys:dict[str, int]         # Article key -> row
+    nnz:int                         # Number of non-zero counts in the matrix (the end of the last row)
+    lock:Lock
+
+    # STATIC
+    dtype:str = 'i'                 # array typecode of every file (int32, the same as np.int32)
+
+    ''' __init__(directory) - Constructor, opens the matrix in the given directory (creating it if it does not exist)
+        :param directory:str
+    '''
+    def __init__(self, directory:str):
+        self.directory = directory
+        self.rows = []
+        self.row_keys = {}
+        self.nnz = 0
+        self.lock = Lock()
+
+        if not os.path.exists(directory): os.makedirs(directory)
+        self.vocabulary = Vocabulary.load(self.__path__("vocabulary.txt")) or Vocabulary()
+
+        numRows:int = 0     # Number of lines in rows.jsonl (including a line that was only partly written)
+
+        try:
+            with open(self.__path__("rows.jsonl"), encoding='utf-8') as file:
+                for line in file:
+                    numRows += 1
+                    if not line.endswith("\n"): break     # A partly written row, it is dropped below
+                    self.rows.append(json.loads(line))
+        except FileNotFoundError: pass
+        except ValueError: pass     # A partly written row, it is dropped below
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Term_Matrix.__init__(): there was an error reading the rows in \"{directory}\".")
+            print(e)
+
+        # Only keep the rows that were completely written (see the NOTE above)
+        indptr:array = self.__readIndptr__()
+        del self.rows[len(indptr) - 1:]
+        self.nnz = indptr[len(self.rows)]
+        self.row_keys = {r[0]: i for i, r in enumerate(self.rows)}
+
+        self.__truncate__(rewriteRows=numRows != len(self.rows))
+
+    ''' addArticles(articles) - append a row for each of the given (processed) articles, skipping the articles that are already in the matrix
+        :param articles a list of RSS_Article with article_tokens
+        :return the number of articles added
+    '''
+    def addArticles(self, articles:list) -> int:
+        numAdded:int = 0
+
+        with self.lock:
+            newRows:list[list] = []
+            indptr:array = array(Term_Matrix.dtype)
+            indices:array = array(Term_Matrix.dtype)
+            data:array = array(Term_Matrix.dtype)
+
+            for a in articles:
+                key:str = Seen_Article_Index.articleKey(a.article_link)
+                if key in self.row_keys or not getattr(a, 'article_tokens', None): continue
+
+                counts:list[tuple[int, int]] = sorted((self.vocabulary.id(t), f) for t, f in a.article_tokens.items())
+                indices.extend(c[0] for c in counts)
+                data.extend(c[1] for c in counts)
+                indptr.append(self.nnz + len(indices))
+
+                self.row_keys[key] = len(self.rows) + len(newRows)
+                newRows.append([key, a.feed_title, a.article_title, a.article_link])
+
+            if not newRows: return 0
+
+            try:
+                if not self.vocabulary.save(self.__path__("vocabulary.txt")): raise IOError("the vocabulary could not be saved")
+                with open(self.__path__("indices.bin"), 'ab') as file: indices.tofile(file)
+                with open(self.__path__("data.bin"), 'ab') as file: data.tofile(file)
+                with open(self.__path__("indptr.bin"), 'ab') as file: indptr.tofile(file)
+                with open(self.__path__("rows.jsonl"), 'a', encoding='utf-8') as file:
+                    for r in newRows: file.write(json.dumps(r) + "\n")
+
+            except Exception as e:
+                print(f"ERROR in Term_Matrix.addArticles(): there was an error writing to \"{self.directory}\".")
+                print(e)
+                for r in newRows: del self.row_keys[r[0]]
+                self.__truncate__(rewriteRows=True)     # Drop the partial append so the next append starts from the last complete row
+                return 0
+
+            self.rows.extend(newRows)
+            self.nnz += len(indices)
+            numAdded = len(newRows)
+
+        return numAdded
+
+    ''' matrix() - get the (memory-mapped, read only) document-term matrix
+        :return a scipy.sparse.csr_matrix of shape (number of rows, size of the vocabulary) with the counts
+    '''
+    def matrix(self) -> csr_matrix:
+        with self.lock: numRows, nnz, numTerms = len(self.rows), self.nnz, len(self.vocabulary)
+
+        indptr = self.__memmap__("indptr.bin", numRows + 1)
+        indices = self.__memmap__("indices.bin", nnz)
+        data = self.__memmap__("data.bin", nnz)
+
+        return csr_matrix((data, indices, indptr), shape=(numRows, numTerms), copy=False)
+
+    ''' rowsFor(articles) - get the row of each of the given articles
+        :param articles a list of RSS_Article (or anything with an article_link)
+        :return a list of rows, with -1 for the articles that are not in the matrix
+    '''
+    def rowsFor(self, articles:list) -> list[int]:
+        return [self.row_keys.get(Seen_Article_Index.articleKey(a.article_link), -1) for a in articles]
+
+    ''' id2word() - get the column -> term mapping of the matrix (i.e. the id2word of a gensim model)
+        :return dict[int, str]
+    '''
+    def id2word(self) -> dict[int, str]: return dict(enumerate(self.vocabulary.terms))
+
+    def __path__(self, fileName:str) -> str: return os.path.join(self.directory, fileName)
+
+    ''' __memmap__(fileName, length) - memory-map the first length values of the given file read only
+        :return a numpy array (empty if length is 0)
+    '''
+    def __memmap__(self, fileName:str, length:int) -> np.ndarray:
+        if not length: return np.zeros(0, dtype=np.int32)
+        return np.memmap(self.__path__(fileName), dtype=np.int32, mode='r', shape=(length,))
+
+    ''' __readIndptr__() - read the row offsets
+        :return an array starting with 0
+    '''
+    def __readIndptr__(self) -> array:
+        indptr:array = array(Term_Matrix.dtype)
+        path:str = self.__path__("indptr.bin")
+
+        if os.path.exists(path):
+            with open(path, 'rb') as file: indptr.frombytes(file.read(os.path.getsize(path) // indptr.itemsize * indptr.itemsize))
+        if not indptr: indptr.append(0)
+        return indptr
+
+    ''' __truncate__(rewriteRows) - cut every file back to the rows in self.rows (i.e. after an append that did not finish)
+        :param rewriteRows:bool whether rows.jsonl has rows that are not in self.rows
+        :return void
+    '''
+    def __truncate__(self, rewriteRows:bool) -> None:
+        itemSize:int = array(Term_Matrix.dtype).itemsize
+        sizes:dict[str, int] = {"indptr.bin": (len(self.rows) + 1) * itemSize, "indices.bin": self.nnz * itemSize, "data.bin": self.nnz * itemSize}
+
+        try:
+            if not os.path.exists(self.__path__("indptr.bin")):
+                with open(self.__path__("indptr.bin"), 'wb') as file: array(Term_Matrix.dtype, [0]).tofile(file)
+
+            for fileName, size in sizes.items():
+                path:str = self.__path__(fileName)
+                if os.path.exists(path) and os.path.getsize(path) > size: os.truncate(path, size)
+
+            if rewriteRows:
+                with open(self.__path__("rows.jsonl"), 'w', encoding='utf-8') as file:
+                    for r in self.rows: file.write(json.dumps(r) + "\n")
+
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Term_Matrix.__truncate__(): there was an error cleaning up the files in \"{self.directory}\".")
+            print(e)
+
+    def __len__(self) -> int: return len(self.rows)
@@ -0,0 +1,110 @@
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+from nltk.stem import WordNetLemmatizer
+from functools import lru_cache
+from threading import Lock
+import re
+
+'''
+Text_Preprocessor - the preprocessing pipeline for article content and search queries (see RSS_Article.__contentPreprocessing__)
+
+    The NLTK resources are checked (and downloaded if needed), the stop words loaded and the lemmatizer created once, when the
+    preprocessor is created, rather than for every article. Use Text_Preprocessor.shared() to get the one instance for this process.
+
+    Preprocessing steps:
+        1. Tokenization - Separating the text into meaningful chunks
+        2. Remove stop words - remove words that have little or no meaning in the english language ("the", "a", "and", "in", etc)
+        3. Lemmatization - Standardize the verb/noun tenses to their base meanings (running -> run, bicycles -> bicycle, etc)
+
+    Steps 2 and 3 are memoized per (lowercase) token in a bounded LRU cache, so after the first few articles most tokens only cost a
+    dictionary lookup.
+'''
+class Text_Preprocessor:
+
+    stop_words:set[str]                 # Set of stop words to remove (the, a, an, and, in, ...)
+    lemmatizer:WordNetLemmatizer
+    lemma_cache_size:int                # Max number of tokens in the LRU cache
+
+    # STATIC
+    instance:object = None              # The shared instance (see shared())
+    instance_lock:Lock = Lock()
+
+    ''' __init__(lemmaCacheSize) - Constructor, loads the NLTK resources
+        :param lemmaCacheSize:int [optional] max number of tokens to memoize
+    '''
+    def __init__(self, lemmaCacheSize:int=100000):
+        Text_Preprocessor.__loadResources__()
+
+        self.stop_words = set(stopwords.words('english'))
+        self.lemmatizer = WordNetLemmatizer()
+        self.lemma_cache_size = lemmaCacheSize
+        self.__normalize__ = lru_cache(maxsize=lemmaCacheSize)(self.__normalizeToken__)
+
+        # WordNet is loaded lazily (and not thread safe) so load it now, before the preprocessor is shared between threads
+        self.lemmatizer.lemmatize("loading")
+
+    ''' process(text) - preprocess the given text
+        :param text:str
+        :return a dict of the tokens and their frequencies, and the tokenized text as a string
+    '''
+    def process(self, text:str) -> tuple[dict[str, int], str]:
+        text = re.sub(r'\\', '', text)
+        tokens:list[str] = word_tokenize(text)     # Split the text into tokens
+
+        newTokens:dict[str, int] = {}
+        normalize = self.__normalize__
+
+        for t in tokens:
+            t = normalize(t.lower())
+            if t is None: continue
+            newTokens[t] = newTokens.get(t, 0) + 1
+
+        # Join the list of tokens back as a single string and return
+        return newTokens, " ".join(tokens)
+
+    ''' processBatch(texts) - preprocess many texts at once
+        :param texts:list[str]
+        :return a list of (tokens, tokenized text) in the same order as texts (see process())
+    '''
+    def processBatch(self, texts:list[str]) -> list[tuple[dict[str, int], str]]:
+        return [self.process(t) for t in texts]
+
+    ''' cacheInfo() - get the hit/miss statistics for the token cache
+        :return functools._CacheInfo
+    '''
+    def cacheInfo(self): return self.__normalize__.cache_info()
+
+    ''' __normalizeToken__(token) - remove the token if it is not a word or is a stop word, otherwise lemmatize it (memoized by __normalize__)
+        :param token:str a lowercase token
+        :return the lemma, or None if the token should be removed
+    '''
+    def __normalizeToken__(self, token:str) -> str:
+        if (not token.isalpha()) or (token in self.stop_words): return None
+        return self.lemmatizer.lemmatize(token)
+
+    ''' shared() - get the shared preprocessor for this process, creating it on the first call
+        :return Text_Preprocessor
+    '''
+    @staticmethod
+    def shared():
+        with Text_Preprocessor.instance_lock:
+            if Text_Preprocessor.instance is None: Text_Preprocessor.instance = Text_Preprocessor()
+            return Text_Preprocessor.instance
+
+    ''' __loadResources__() - install the required packages from NLTK if needed
+        :return void
+
+        NOTE: the packages are only downloaded the first time this is ever run on a machine
+    '''
+    @staticmethod
+    def __loadResources__() -> None:
+        try: nltk.data.find('corpora/wordnet')
+        except LookupError: nltk.download('wordnet')
+
+        try: nltk.data.find('tokenizers/punkt')
+        except LookupError: nltk.download('punkt')
+
+        try: nltk.data.find('corpora/stopwords')
+        except LookupError: nltk.download('stopwords')
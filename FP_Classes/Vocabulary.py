@@ -0,0 +1,103 @@
+
+from threading import Lock
+import os
+
+'''
+Vocabulary - a shared mapping between terms and integer term ids, so token counts can be stored as arrays of ids instead of dicts
+             of strings (see Term_Matrix)
+
+    Ids are assigned in the order terms are first seen and never change, so arrays of ids stay valid as the vocabulary grows.
+
+    File format (text): one term per line, the line number is the term id. Since ids never change, save() only appends the terms added
+    since the last save()/load() (see Term_Matrix).
+'''
+class Vocabulary:
+
+    term_ids:dict[str, int]     # Term -> term id
+    terms:list[str]             # Term id -> term
+    saved:int                   # Number of terms that are already in the file (see save())
+    lock:Lock
+
+    # STATIC
+    instance:object = None      # The shared vocabulary (see shared())
+    instance_lock:Lock = Lock()
+
+    def __init__(self):
+        self.term_ids = {}
+        self.terms = []
+        self.saved = 0
+        self.lock = Lock()
+
+    ''' id(term, add) - get the id for the given term
+        :param term:str
+        :param add:bool [optional] whether to add the term if it is not in the vocabulary yet
+        :return the term id, or -1 if the term is not in the vocabulary and add is False
+    '''
+    def id(self, term:str, add:bool=True) -> int:
+        termId:int = self.term_ids.get(term, -1)
+        if termId != -1 or not add: return termId
+
+        with self.lock:
+            # Another thread may have added it in the meantime
+            if term in self.term_ids: return self.term_ids[term]
+            self.term_ids[term] = len(self.terms)
+            self.terms.append(term)
+            return self.term_ids[term]
+
+    ''' term(termId) - get the term for the given id
+        :return str
+    '''
+    def term(self, termId:int) -> str: return self.terms[termId]
+
+    ''' shared() - get the shared vocabulary for this process, creating it on the first call
+        :return Vocabulary
+    '''
+    @staticmethod
+    def shared():
+        with Vocabulary.instance_lock:
+            if Vocabulary.instance is None: Vocabulary.instance = Vocabulary()
+            return Vocabulary.instance
+
+    ''' save(path) - append the terms added since the last save()/load() to the given file
+        :param path:str path to the text file
+        :return False if error, True if success
+    '''
+    def save(self, path:str) -> bool:
+        with self.lock: newTerms:list[str] = self.terms[self.saved:]
+        if not newTerms and os.path.exists(path): return True
+
+        try:
+            if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)): os.makedirs(os.path.dirname(path))
+            with open(path, 'a', encoding='utf-8', newline='\n') as file:
+                for t in newTerms: file.write(t + "\n")
+        except Exception as e:
+            print(f"ERROR in Vocabulary.save(): there was an error writing to \"{path}\".")
+            print(e)
+            return False
+
+        self.saved += len(newTerms)
+        return True
+
+    ''' load(path) - load a vocabulary saved with save()
+        :param path:str path to the text file
+        :return a Vocabulary (empty if the file does not exist), or None if the file could not be read
+    '''
+    @staticmethod
+    def load(path:str):
+        vocabulary = Vocabulary()
+
+        try:
+            with open(path, encoding='utf-8', newline='\n') as file:
+                for line in file: vocabulary.id(line[:-1] if line.endswith("\n") else line)
+        except FileNotFoundError: return vocabulary
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Vocabulary.load(): there was an error reading \"{path}\".")
+            print(e)
+            return None
+
+        vocabulary.saved = len(vocabulary)
+        return vocabulary
+
+    def __contains__(self, term:str) -> bool: return term in self.term_ids
+
+    def __len__(self) -> int: return len(self.terms)
@@ -1,18 +1,54 @@
 
 from FP_Classes.RSS_Feed import RSS_Article
-from sklearn.feature_extraction.text import TfidfVectorizer 
+from FP_Classes.Term_Matrix import Term_Matrix
+from FP_Classes.Text_Preprocessor import Text_Preprocessor
+from FP_Classes.Preprocessing_Pool import Preprocessing_Pool
+from FP_Classes.Seen_Article_Index import Seen_Article_Index
+from FP_Classes.Vocabulary import Vocabulary
+from scipy.sparse import csr_matrix
 from nltk.tokenize import word_tokenize
-from random import randint
+from bisect import bisect_right
 import numpy as np 
+import shutil
+import json
+import os
 
 
-''' ArticleCluster
-
-
+''' ArticleCluster - the result of a clustering technique for a single cluster: its centroid, its top terms and the articles in it,
+    closest to the centroid first
 '''
 class ArticleCluster: 
     
-    pass
+    cluster_id:int
+    centroid:np.ndarray             # Center of the cluster (i.e. in the TF-IDF space of KMeans_Article_Clustering)
+    top_terms:list[str]             # Terms with the largest weights in the centroid
+    articles:list[RSS_Article]      # Articles in this cluster, sorted by distance
+    distances:list[float]           # Distance of each article to the centroid (same order as articles)
+
+    def __init__(self, clusterId:int, centroid:np.ndarray, topTerms:list[str]=None):
+        self.cluster_id = clusterId
+        self.centroid = centroid
+        self.top_terms = topTerms or []
+        self.articles = []
+        self.distances = []
+
+    ''' add(article, distance) - add an article to this cluster, keeping the articles sorted by distance
+        :return void
+    '''
+    def add(self, article:RSS_Article, distance:float) -> None:
+        i:int = bisect_right(self.distances, distance)
+        self.articles.insert(i, article)
+        self.distances.insert(i, distance)
+
+    ''' toString() - return this cluster in meaningful str format
+        :return str
+    '''
+    def toString(self) -> str:
+        s:str = f"[*] Cluster ID: {self.cluster_id} ({len(self)} articles)\n[+] Top terms: {', '.join(self.top_terms)}\n"
+        for a, d in zip(self.articles, self.distances): s += f"\t{d:.4f}\t{a.feed_title} - {a.article_title}\n"
+        return s
+
+    def __len__(self) -> int: return len(self.articles)
 
 
 ''' ArticleClusteringTechnique 
@@ -24,30 +60,96 @@ class ArticleClusteringTechnique:
     all_tokenized_contents:list[list[str]]
     all_contents:list[str]
     all_articles:list[RSS_Article]
+    doc_term_matrix:csr_matrix      # Token counts of all_articles (same row order) from a Term_Matrix, None if the articles were preprocessed
+    id2word:dict[int, str]          # Column -> term of doc_term_matrix
+
+    # STATIC
+    batch_size:int = 500            # Number of articles preprocessed at a time
+    preprocess_workers:int = 1      # Number of processes for preprocessing (0 = one per core, 1 = preprocess in this process)
     
-    def __init__(self, articles:list[RSS_Article]):
+    ''' __init__(articles, termMatrix) - Constructor
+        :param articles:list[RSS_Article] (i.e. from RSS_DB_Connection.getAllArticles(), so their stored content is used)
+        :param termMatrix:Term_Matrix [optional] stored token counts - the articles that are not in it are preprocessed and added to it
+    '''
+    def __init__(self, articles:list[RSS_Article], termMatrix:Term_Matrix=None):
         self.all_articles = articles 
         self.all_tokenized_contents = []
         self.all_contents = []
-        self.__preprocessArticles__()
+        self.doc_term_matrix = None
+        self.id2word = {}
+
+        if termMatrix is not None:
+            # Only the articles that are not in the term matrix need to be preprocessed
+            missing:list[RSS_Article] = [a for a, r in zip(articles, termMatrix.rowsFor(articles)) if r == -1]
+            if missing:
+                self.__preprocessArticles__(missing)
+                termMatrix.addArticles(missing)
+            if self.__loadTermMatrix__(termMatrix): return
+
+        self.__preprocessArticles__(self.all_articles)
+        self.all_contents = [a.preprocessed_content for a in self.all_articles]
+        self.all_tokenized_contents = [a.article_tokens for a in self.all_articles]
 
     # ------------------------------------------------------------------------------------------- # 
-    ''' __preprocessArticles__() - preprocess all the given articles and save the respective contents
-        and tokens in self.all_contents and self.all_tokenized_contents
+    ''' __loadTermMatrix__(termMatrix) - get the token counts of all the given articles from the term matrix
+        :param termMatrix:Term_Matrix
+        :return True if every article is in the term matrix (self.doc_term_matrix is set), False otherwise
+    '''
+    def __loadTermMatrix__(self, termMatrix:Term_Matrix) -> bool:
+        rows:list[int] = termMatrix.rowsFor(self.all_articles)
+        missing:int = rows.count(-1)
+        if missing:
+            print(f"NOTICE: {missing}/{len(rows)} articles could not be added to the term matrix. Preprocessing articles instead.")
+            return False
+
+        matrix:csr_matrix = termMatrix.matrix()
+
+        # Only copy the rows if they are not the whole matrix in order
+        self.doc_term_matrix = matrix if rows == list(range(matrix.shape[0])) else matrix[rows]
+        self.id2word = termMatrix.id2word()
+        print(f"NOTICE: Loaded the token counts for {len(rows)} articles from the term matrix.")
+        return True
+
+    # ------------------------------------------------------------------------------------------- # 
+    ''' __preprocessArticles__(articles) - make sure the content of the given articles is preprocessed (see RSS_Article.article_tokens),
+        using the stored content and tokens where they are known
+        :param articles:list[RSS_Article]
         :return void
+
+        NOTE: only the articles without stored content are fetched, and only the articles without tokens are preprocessed - in batches
+              of batch_size (or in a Preprocessing_Pool if preprocess_workers is not 1)
     '''
-    def __preprocessArticles__(self):
+    def __preprocessArticles__(self, articles:list[RSS_Article]) -> None:
         print("NOTICE: Preprocessing articles.")
-        c=1
-        num_articles = len(self.all_articles)
-        for a in self.all_articles: 
-            # Skip this article if it has not been classified/content not preprocessed
-            
-            print(f"\tProcessing article {c}/{num_articles}")
-            theseTokens, thisContent = RSS_Article.__contentPreprocessing__(a.article_desc + " " + a.__getArticleContent__())
-            self.all_contents.append(thisContent)
-            self.all_tokenized_contents.append(theseTokens)
-            c+=1
+
+        # Fetch the content that is not stored (i.e. articles that were never added to the DB)
+        missing:list[RSS_Article] = [a for a in articles if not a.hasContent()]
+        if missing: print(f"NOTICE: Fetching the content for {len(missing)}/{len(articles)} articles without stored content.")
+        for a in missing:
+            try: a.fetch()
+            except Exception as e:
+                print(f"NON-CRITICAL ERROR in ArticleClusteringTechnique.__preprocessArticles__(): There was an error fetching \"{a.article_link}\".")
+                print(e)
+                a.raw_content = ""
+
+        unprocessed:list[RSS_Article] = [a for a in articles if not a.isProcessed()]
+        if not unprocessed: return
+
+        # Preprocess in worker processes
+        if ArticleClusteringTechnique.preprocess_workers != 1 and Preprocessing_Pool.available() and len(unprocessed) > ArticleClusteringTechnique.batch_size:
+            with Preprocessing_Pool(ArticleClusteringTechnique.preprocess_workers) as pool:
+                for i, tokens, text in pool.imap((i, a.raw_content) for i, a in enumerate(unprocessed)):
+                    unprocessed[i].__setProcessedContent__(unprocessed[i].raw_content, tokens, text)
+            return
+
+        # Otherwise preprocess one batch at a time in this process
+        preprocessor:Text_Preprocessor = Text_Preprocessor.shared()
+        for start in range(0, len(unprocessed), ArticleClusteringTechnique.batch_size):
+            batch:list[RSS_Article] = unprocessed[start:start + ArticleClusteringTechnique.batch_size]
+            print(f"\tProcessing articles {start + 1}-{start + len(batch)}/{len(unprocessed)}")
+
+            for a, (tokens, text) in zip(batch, preprocessor.processBatch([a.raw_content for a in batch])):
+                a.__setProcessedContent__(a.raw_content, tokens, text)
     
 
 ''' Gensim_Article_Clustering - perform gensim clustering analysis on a given list of articles
@@ -64,7 +166,8 @@ class ArticleClusteringTechnique:
 '''
 import gensim
 from gensim.models import LdaModel
-from gensim.corpora import Dictionary 
+from gensim.corpora import Dictionary, HashDictionary
+from gensim.matutils import Sparse2Corpus
 
 class LDA_Article_Clustering(ArticleClusteringTechnique): 
     
@@ -74,9 +177,9 @@ class LDA_Article_Clustering(ArticleClusteringTechnique):
     limit:int                          # Limit on the number of articles out of the total given to consider
     
     # ------------------------------------------------------------------------------------------- # 
-    def __init__(self, list_of_articles:list[RSS_Article], num_topics=10, limit=0):
+    def __init__(self, list_of_articles:list[RSS_Article], num_topics=10, limit=0, termMatrix:Term_Matrix=None):
         if limit: list_of_articles = list_of_articles[:limit]   # If given a limit, cut the number of articles
-        super().__init__(list_of_articles)                      # Call super() for initialization
+        super().__init__(list_of_articles, termMatrix)          # Call super() for initialization
         self.num_topics = num_topics                            # Set the number of topics
         self.topics_dict = {}
         self.limit = limit
@@ -94,8 +197,13 @@ class LDA_Article_Clustering(ArticleClusteringTechnique):
     '''
     def __lda__(self) -> list: 
         print(f"[+] Performing LDA with num_topics = {self.num_topics} and limit = {self.limit}")
-        dictionary = Dictionary(self.all_tokenized_contents)
-        corpus = [dictionary.doc2bow(content) for content in self.all_tokenized_contents]
+        # Use the stored counts (streamed from the memory-mapped matrix) if there are any
+        if self.doc_term_matrix is not None:
+            dictionary = self.id2word
+            corpus = Sparse2Corpus(self.doc_term_matrix, documents_columns=False)
+        else:
+            dictionary = Dictionary(self.all_tokenized_contents)
+            corpus = [dictionary.doc2bow(content) for content in self.all_tokenized_contents]
 
         lda_model = LdaModel(corpus=corpus, id2word=dictionary, num_topics=self.num_topics, passes=50)
 
@@ -151,29 +259,483 @@ class LDA_Article_Clustering(ArticleClusteringTechnique):
         
         return s
     
-''' KMeans_Article_Clustering 
+''' Online_LDA_Clustering - a persisted LDA topic model that is updated (online LDA) with the new articles of every run, instead of
+    being trained from scratch over the whole corpus (see LDA_Article_Clustering)
+
+    :param directory the directory the model checkpoints are stored in
+    :param num_topics hyperparameter for the number of topics - defaults to 20, only used when there is no checkpoint yet
+    :param numTerms the size of the hashed vocabulary - defaults to 2^16, only used when there is no checkpoint yet
+
+    Methods:
+
+    update() ............. update the model with the given new articles and get their topic assignments
+    assign() ............. get the topic assignments for the given articles without updating the model
+    strTopics() .......... return the top words of every topic in meaningful format
+    save() ............... save a checkpoint of the model
+
+    The model uses a HashDictionary (a fixed number of term ids, terms are hashed into them) since the size of an LdaModel's vocabulary
+    cannot change after it is created. Each update() is a single online pass over the new articles, so a run costs time proportional to
+    the number of new articles, not to the whole corpus. The HashDictionary does not keep the terms behind each id, so the terms the
+    model has seen are kept in a Vocabulary and hashed again to show the words of the topics (see strTopics()).
+
+    Files:
+        checkpoint-<n>/ ... the model, and the size of trained.txt when it was saved (checkpoint.json)
+        state.json ........ points to the latest checkpoint
+        trained.txt ....... the keys of the articles the model was updated with, one per line (append-only)
+        vocabulary.txt .... the terms the model has seen (see Vocabulary.save())
+
+    The last max_checkpoints checkpoints are kept, so a checkpoint that cannot be loaded falls back to the one before it. Each checkpoint
+    only appends the keys of its new articles to trained.txt, and only the keys up to the size recorded in the checkpoint are loaded.
+'''
+class Online_LDA_Clustering:
+
+    directory:str                   # Directory the checkpoints are stored in
+    model:LdaModel                  # The topic model
+    dictionary:HashDictionary       # Term -> hashed term id (fixed size)
+    vocabulary:Vocabulary           # The terms the model has seen (to show the words of the topics)
+    trained:set[str]                # Keys (see Seen_Article_Index) of the articles the model was updated with
+    unsaved:list[str]               # Keys in trained that are not in trained.txt yet (see save())
+    trained_bytes:int               # Size of trained.txt for the loaded checkpoint
+    checkpoint:int                  # Number of the last checkpoint (0 if none)
+
+    # STATIC
+    max_checkpoints:int = 3         # Number of checkpoints to keep
+    chunk_size:int = 2000           # Number of articles per online update (mini-batch)
+    seed:int = 42                   # Random state of new models, so the same articles give the same topics
+
+    # ------------------------------------------------------------------------------------------- #
+    def __init__(self, directory:str, num_topics:int=20, numTerms:int=2**16):
+        self.directory = directory
+        self.trained = set()
+        self.unsaved = []
+        self.trained_bytes = 0
+        self.checkpoint = 0
+        self.model = None
+
+        if not os.path.exists(directory): os.makedirs(directory)
+        self.vocabulary = Vocabulary.load(os.path.join(directory, "vocabulary.txt")) or Vocabulary()
+
+        # Load the latest checkpoint that can be loaded, otherwise create a new model
+        if not self.__load__():
+            print(f"NOTICE: Creating a new topic model with num_topics = {num_topics} in \"{directory}\".")
+            self.dictionary = HashDictionary(id_range=numTerms, debug=False)
+            self.model = LdaModel(id2word=self.dictionary, num_topics=num_topics, chunksize=Online_LDA_Clustering.chunk_size,
+                                  update_every=1, passes=1, random_state=Online_LDA_Clustering.seed)
+
+    # ------------------------------------------------------------------------------------------- #
+    ''' update(articles) - update the model with the given (processed) articles, skipping the articles it was already updated with
+        :param articles:list[RSS_Article] the new articles (i.e. the articles stored during this run)
+        :return a list of (RSS_Article, topic_id, probability) for the new articles (see RSS_DB_Connection.addArticleTopics())
+    '''
+    def update(self, articles:list[RSS_Article]) -> list[tuple]:
+        newArticles:list[RSS_Article] = [a for a in articles if Seen_Article_Index.articleKey(a.article_link) not in self.trained and a.article_tokens]
+        if not newArticles: return []
+
+        print(f"[+] Updating the topic model with {len(newArticles)} new articles")
+        corpus:list[list[tuple[int, int]]] = [self.__bow__(a) for a in newArticles]
+        self.model.update(corpus)
+
+        for a in newArticles:
+            for t in a.article_tokens: self.vocabulary.id(t)
+
+        newKeys:list[str] = [Seen_Article_Index.articleKey(a.article_link) for a in newArticles]
+        self.trained.update(newKeys)
+        self.unsaved.extend(newKeys)
+        return self.__assign__(newArticles, corpus)
+
+    ''' assign(articles) - get the most likely topic for each of the given (processed) articles without updating the model
+        :param articles:list[RSS_Article]
+        :return a list of (RSS_Article, topic_id, probability)
+    '''
+    def assign(self, articles:list[RSS_Article]) -> list[tuple]:
+        return self.__assign__(articles, [self.__bow__(a) for a in articles])
+
+    ''' strTopics(numWords) - return the top words of every topic in meaningful str format
+        :param numWords:int [optional] number of words per topic
+        :return str
+    '''
+    def strTopics(self, numWords:int=10) -> str:
+        # Hashed term id -> the first term seen with that id
+        terms:dict[int, str] = {}
+        for t in self.vocabulary.terms: terms.setdefault(self.dictionary.restricted_hash(t), t)
+
+        s:str = ""
+        for t_id in range(self.model.num_topics):
+            topic:str = " + ".join(f'{prob:.3f}*"{terms.get(termId, termId)}"' for termId, prob in self.model.get_topic_terms(t_id, topn=numWords))
+            s += f"\nTopic: {topic} (id = {t_id})"
+        return s
+
+    ''' save() - save a checkpoint of the model and remove the checkpoints older than the last max_checkpoints
+        :return False if error, True if success
+
+        NOTE: only the keys of the articles added since the last save()/load() are written (appended to trained.txt)
+    '''
+    def save(self) -> bool:
+        checkpoint:int = self.checkpoint + 1
+        checkpointDir:str = os.path.join(self.directory, f"checkpoint-{checkpoint}")
+
+        try:
+            if not self.vocabulary.save(os.path.join(self.directory, "vocabulary.txt")): raise IOError("the vocabulary could not be saved")
+
+            # Drop the keys written after the loaded checkpoint (i.e. by a checkpoint that could not be loaded), then append the new ones
+            newKeys:bytes = "".join(k + "\n" for k in self.unsaved).encode()
+            with open(os.path.join(self.directory, "trained.txt"), 'ab') as file:
+                file.truncate(self.trained_bytes)
+                file.write(newKeys)
+            trainedBytes:int = self.trained_bytes + len(newKeys)
+
+            if not os.path.exists(checkpointDir): os.makedirs(checkpointDir)
+            self.model.save(os.path.join(checkpointDir, "lda.model"))
+            with open(os.path.join(checkpointDir, "checkpoint.json"), 'w') as file: json.dump({'trained_bytes': trainedBytes}, file)
+
+            # Point to the new checkpoint only once it is completely written
+            statePath:str = os.path.join(self.directory, "state.json")
+            with open(statePath + ".tmp", 'w') as file: json.dump({'checkpoint': checkpoint}, file)
+            os.replace(statePath + ".tmp", statePath)
+
+        except Exception as e:
+            print(f"ERROR in Online_LDA_Clustering.save(): there was an error writing the checkpoint to \"{checkpointDir}\".")
+            print(e)
+            return False
+
+        self.checkpoint = checkpoint
+        self.unsaved = []
+        self.trained_bytes = trainedBytes
+
+        # Remove the old checkpoints
+        for c in self.__checkpoints__()[Online_LDA_Clustering.max_checkpoints:]:
+            shutil.rmtree(os.path.join(self.directory, f"checkpoint-{c}"), ignore_errors=True)
+
+        return True
+
+    # ------------------------------------------------------------------------------------------- #
+    ''' __load__() - load the latest checkpoint, falling back to older checkpoints if it cannot be loaded
+        :return True if a checkpoint was loaded, False if not
+    '''
+    def __load__(self) -> bool:
+        try:
+            with open(os.path.join(self.directory, "state.json")) as file: latest:int = int(json.load(file).get('checkpoint', 0))
+        except FileNotFoundError: latest = 0
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in Online_LDA_Clustering.__load__(): there was an error reading the state in \"{self.directory}\".")
+            print(e)
+            latest = 0
+
+        # Never load a checkpoint newer than the state (i.e. one that was not completely written)
+        for c in [c for c in self.__checkpoints__() if not latest or c <= latest]:
+            checkpointDir:str = os.path.join(self.directory, f"checkpoint-{c}")
+            try:
+                model:LdaModel = LdaModel.load(os.path.join(checkpointDir, "lda.model"))
+                trained, trainedBytes = self.__loadTrained__(checkpointDir)
+            except Exception as e:
+                print(f"NON-CRITICAL ERROR in Online_LDA_Clustering.__load__(): there was an error loading \"{checkpointDir}\". Trying the one before it.")
+                print(e)
+                continue
+
+            self.model, self.dictionary, self.checkpoint = model, model.id2word, c
+            self.trained, self.trained_bytes = trained, trainedBytes
+            print(f"NOTICE: Loaded topic model checkpoint {c} ({len(self.trained)} articles, num_topics = {self.model.num_topics}).")
+            return True
+
+        return False
+
+    ''' __loadTrained__(checkpointDir) - load the keys of the articles the model in the given checkpoint was updated with
+        :return (set of keys, size of trained.txt for the checkpoint)
+    '''
+    def __loadTrained__(self, checkpointDir:str) -> tuple[set[str], int]:
+        with open(os.path.join(checkpointDir, "checkpoint.json")) as file: trainedBytes:int = int(json.load(file)['trained_bytes'])
+        with open(os.path.join(self.directory, "trained.txt"), 'rb') as file: data:bytes = file.read(trainedBytes)
+        if len(data) < trainedBytes: raise IOError(f"trained.txt has {len(data)}/{trainedBytes} bytes")
 
+        return set(data.decode().split()), trainedBytes
 
+    ''' __checkpoints__() - get the numbers of the checkpoints in the directory
+        :return list[int], newest first
+    '''
+    def __checkpoints__(self) -> list[int]:
+        checkpoints:list[int] = []
+        for name in os.listdir(self.directory):
+            if name.startswith("checkpoint-") and name[len("checkpoint-"):].isdigit(): checkpoints.append(int(name[len("checkpoint-"):]))
+        return sorted(checkpoints, reverse=True)
+
+    ''' __bow__(article) - get the hashed bag of words for the given article
+        :return list[(term_id, count)]
+    '''
+    def __bow__(self, article:RSS_Article) -> list[tuple[int, int]]:
+        return self.dictionary.doc2bow([t for t, f in article.article_tokens.items() for _ in range(f)])
+
+    ''' __assign__(articles, corpus) - get the most likely topic for each article from its bag of words
+        :return a list of (RSS_Article, topic_id, probability)
+    '''
+    def __assign__(self, articles:list[RSS_Article], corpus:list) -> list[tuple]:
+        assignments:list[tuple] = []
+        for a, bow in zip(articles, corpus):
+            document_topics = self.model.get_document_topics(bow)
+            if not document_topics: continue
+            top_topic_id, top_topic_prob = max(document_topics, key=lambda x: x[1])
+            assignments.append((a, top_topic_id, top_topic_prob))
+        return assignments
+
+''' KMeans_Article_Clustering - cluster articles by their TF-IDF vectors with a persisted mini-batch k-means model
+
+    :param list_of_articles a list of RSS_Article to cluster (can be empty to only load the model, i.e. to assign new articles at ingest)
+    :param k hyperparameter for the number of clusters - only used when there is no saved model yet
+    :param num_features the number of hashed features - defaults to 2^16, only used when there is no saved model yet
+    :param directory [optional] the directory the model is saved in, so it is updated across runs instead of refit from scratch
+
+    Methods:
+
+    __kMeans__() ......... update the model with the articles it has not seen yet and assign every article to a cluster
+    update() ............. assign new articles to the existing clusters, then update the model with them (see main.py)
+    assign() ............. assign articles to the existing clusters without updating the model
+    strClusters() ........ return self.clusters in meaningful format
+    save() ............... save the model
+
+    The tokens are hashed into num_features columns (FeatureHasher), so the feature space does not depend on the vocabulary and never
+    has to be refit. The document frequencies for the IDF weights are kept with the model and updated with every new article.
+
+    The model is updated with MiniBatchKMeans.partial_fit() one batch of fit_batch_size new articles at a time, from a fixed seed, so
+    the same articles always give the same clusters. Assigning an article is a sparse dot product with the centroids, O(k * nnz).
+    Until the model is fit, new articles are kept (and saved with the model) until there are at least k of them to initialize the
+    centroids, so a few articles per run still add up to a fit model.
 '''
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.preprocessing import normalize
+from sklearn.utils import murmurhash3_32
+from scipy.sparse import diags, vstack
+import pickle
 
 class KMeans_Article_Clustering(ArticleClusteringTechnique): 
     
-    k:int               # Number of clusters (topics)
-    num_features:int
-    cluster_labels:np.ndarray
+    k:int                               # Number of clusters (topics)
+    num_features:int                    # Number of hashed features (columns of the TF-IDF vectors)
+    directory:str                       # Directory the model is saved in ("" to not save it)
+    model:MiniBatchKMeans
+    hasher:FeatureHasher
+    doc_freqs:np.ndarray                # Number of articles with each feature, for the IDF weights
+    num_docs:int                        # Number of articles the model was updated with
+    trained:set[str]                    # Keys (see Seen_Article_Index) of the articles the model was updated with
+    pending:csr_matrix                  # Count vectors of the articles waiting for the first fit (None if there are none)
+    pending_keys:list[str]              # Keys of the rows of pending
+    cluster_labels:np.ndarray           # Cluster id of every article in all_articles (-1 if the model is not fit yet)
+    clusters:list[ArticleCluster]       # The clusters of all_articles
+    term_for_feature:dict[int, str]     # Hashed feature -> a term that hashes to it (only for the terms seen in this process)
+
+    # STATIC
+    fit_batch_size:int = 1024           # Number of articles per partial_fit()
+    seed:int = 42                       # Random state of new models
+    format_version:int = 1              # Version of the saved model, a model saved with another version is refit
     
-    def __init__(self, list_of_articles:list[RSS_Article], k:int, num_features:int=1000): 
-        super().__init__(list_of_articles)
+    def __init__(self, list_of_articles:list[RSS_Article], k:int, num_features:int=2**16, directory:str="", termMatrix:Term_Matrix=None): 
+        super().__init__(list_of_articles, termMatrix)
         self.k = k
         self.num_features = num_features
+        self.directory = directory
+        self.model = None
+        self.doc_freqs = np.zeros(num_features)
+        self.num_docs = 0
+        self.trained = set()
+        self.pending = None
+        self.pending_keys = []
+        self.cluster_labels= np.zeros(0, dtype=np.int32)
+        self.clusters = []
+        self.term_for_feature = {}
+
+        if directory: self.__load__()
+        if self.model is None: 
+            self.model = MiniBatchKMeans(n_clusters=self.k, random_state=KMeans_Article_Clustering.seed, batch_size=KMeans_Article_Clustering.fit_batch_size, n_init=3)
+        self.hasher = FeatureHasher(n_features=self.num_features, input_type='dict', alternate_sign=False)
+
+        if self.all_articles: self.__kMeans__()
         
-        
-    def __kMeans__(self): 
-        tfidf_vectorizer = TfidfVectorizer(max_features=self.num_features)   # Init TF-IDF Vectorizer
-        tfidf_matrix = tfidf_vectorizer.fit_transform(self.all_contents)
-
-        # Perform K Means clustering (initial groupings)
-        knn = KMeans(n_clusters=self.k, random_state=randint(0,100))
-        self.cluster_labels:np.ndarray = knn.fit_predict(tfidf_matrix)
-            
\ No newline at end of file
+    # ------------------------------------------------------------------------------------------- # 
+    ''' __kMeans__() - update the model with the articles in all_articles it has not seen yet, then assign every article to a cluster
+        :return void
+    '''
+    def __kMeans__(self) -> None: 
+        print(f"[+] Performing mini-batch k-means with k = {self.k} on {len(self.all_articles)} articles")
+        counts:csr_matrix = self.__countsFromMatrix__() if self.doc_term_matrix is not None else self.__counts__(self.all_tokenized_contents)
+
+        newRows:list[int] = self.__newRows__(self.all_articles)
+        self.__partialFit__([self.all_articles[i] for i in newRows], counts[newRows])
+
+        self.cluster_labels, self.clusters = self.__assign__(self.all_articles, counts)
+        if self.directory: self.save()
+
+    ''' update(articles) - assign the given (processed) articles to the existing clusters, then update the model with them and save it
+        :param articles:list[RSS_Article] the new articles (i.e. the articles stored during this run)
+        :return the clusters of the given articles (only the clusters with any of the articles)
+    '''
+    def update(self, articles:list[RSS_Article]) -> list[ArticleCluster]:
+        articles = [a for a in articles if a.article_tokens]
+        if not articles: return []
+
+        counts:csr_matrix = self.__counts__([a.article_tokens for a in articles])
+        _, clusters = self.__assign__(articles, counts)
+
+        newRows:list[int] = self.__newRows__(articles)
+        self.__partialFit__([articles[i] for i in newRows], counts[newRows])
+        if self.directory: self.save()
+
+        return [c for c in clusters if len(c)]
+
+    ''' assign(articles) - assign the given (processed) articles to the existing clusters without updating the model
+        :param articles:list[RSS_Article]
+        :return the clusters of the given articles (only the clusters with any of the articles)
+    '''
+    def assign(self, articles:list[RSS_Article]) -> list[ArticleCluster]:
+        articles = [a for a in articles if a.article_tokens]
+        if not articles: return []
+        _, clusters = self.__assign__(articles, self.__counts__([a.article_tokens for a in articles]))
+        return [c for c in clusters if len(c)]
+
+    ''' strClusters() - return self.clusters in meaningful str format
+        :return str
+    '''
+    def strClusters(self) -> str:
+        s:str = ""
+        for c in self.clusters: s += "\n\n" + c.toString()
+        return s
+
+    ''' save() - save the model (centroids, IDF state, the keys of the articles it was updated with and the articles waiting for the
+        first fit) to self.directory
+        :return False if error, True if success
+    '''
+    def save(self) -> bool:
+        path:str = os.path.join(self.directory, "kmeans.pickle")
+        state:dict = {'format_version': KMeans_Article_Clustering.format_version, 'model': self.model, 'doc_freqs': self.doc_freqs,
+                      'num_docs': self.num_docs, 'trained': self.trained, 'pending': self.pending, 'pending_keys': self.pending_keys}
+
+        try:
+            if not os.path.exists(self.directory): os.makedirs(self.directory)
+            with open(path + ".tmp", 'wb') as file: pickle.dump(state, file)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            print(f"ERROR in KMeans_Article_Clustering.save(): there was an error writing to \"{path}\".")
+            print(e)
+            return False
+
+        return True
+
+    # ------------------------------------------------------------------------------------------- # 
+    ''' __load__() - load the model saved in self.directory, if there is one
+        :return void
+    '''
+    def __load__(self) -> None:
+        path:str = os.path.join(self.directory, "kmeans.pickle")
+
+        try:
+            with open(path, 'rb') as file: state:dict = pickle.load(file)
+        except FileNotFoundError: return
+        except Exception as e:
+            print(f"NON-CRITICAL ERROR in KMeans_Article_Clustering.__load__(): there was an error reading \"{path}\". Starting a new model.")
+            print(e)
+            return
+
+        if state.get('format_version') != KMeans_Article_Clustering.format_version:
+            print(f"NOTICE: The saved k-means model in \"{self.directory}\" is from another version. Starting a new model.")
+            return
+
+        self.model, self.doc_freqs, self.num_docs, self.trained = state['model'], state['doc_freqs'], state['num_docs'], state['trained']
+        self.pending, self.pending_keys = state.get('pending'), state.get('pending_keys', [])
+        self.k, self.num_features = self.model.n_clusters, len(self.doc_freqs)
+        print(f"NOTICE: Loaded the k-means model with k = {self.k} ({self.num_docs} articles).")
+
+    ''' __counts__(tokensList) - hash the given token frequencies into count vectors
+        :param tokensList:list[dict[str, int]] (i.e. RSS_Article.article_tokens)
+        :return a csr_matrix of (number of dicts, num_features)
+    '''
+    def __counts__(self, tokensList:list[dict[str, int]]) -> csr_matrix:
+        for tokens in tokensList:
+            for t in tokens: self.term_for_feature.setdefault(self.__feature__(t), t)
+        return self.hasher.transform(tokensList).tocsr()
+
+    ''' __countsFromMatrix__() - hash the columns of self.doc_term_matrix (from a Term_Matrix) into count vectors without the tokens
+        :return a csr_matrix of (number of articles, num_features)
+    '''
+    def __countsFromMatrix__(self) -> csr_matrix:
+        features:np.ndarray = np.array([self.__feature__(self.id2word[i]) for i in range(len(self.id2word))], dtype=np.int32)
+        for i, f in enumerate(features): self.term_for_feature.setdefault(int(f), self.id2word[i])
+
+        m:csr_matrix = self.doc_term_matrix
+        counts = csr_matrix((np.asarray(m.data, dtype=np.float64), features[m.indices], np.array(m.indptr)), shape=(m.shape[0], self.num_features))
+        counts.sum_duplicates()     # Terms that hash to the same feature
+        return counts
+
+    ''' __feature__(term) - get the hashed feature of the given term (the same column as self.hasher)
+        :return int
+    '''
+    def __feature__(self, term:str) -> int: return abs(murmurhash3_32(term, seed=0)) % self.num_features
+
+    ''' __tfidf__(counts) - weight the given count vectors by the IDF of the articles the model was updated with
+        :return a csr_matrix with L2 normalized rows
+    '''
+    def __tfidf__(self, counts:csr_matrix) -> csr_matrix:
+        idf:np.ndarray = np.log((1 + self.num_docs) / (1 + self.doc_freqs)) + 1
+        return normalize(counts @ diags(idf))
+
+    ''' __partialFit__(articles, counts) - update the IDF weights and the model with the given new articles, one batch at a time
+        :param articles:list[RSS_Article]
+        :param counts:csr_matrix the count vectors of the articles
+        :return void
+    '''
+    def __partialFit__(self, articles:list[RSS_Article], counts:csr_matrix) -> None:
+        if not articles: return
+        keys:list[str] = [Seen_Article_Index.articleKey(a.article_link) for a in articles]
+
+        # The first batch has to have at least k articles to initialize the centroids, so keep the articles until there are enough
+        if not self.__isFit__():
+            if self.pending is not None:
+                counts = vstack([self.pending, counts]).tocsr()
+                keys = self.pending_keys + keys
+
+            if len(keys) < self.k:
+                print(f"NOTICE: Only {len(keys)} articles for k = {self.k} clusters. Keeping them until there are enough to fit the model.")
+                self.pending, self.pending_keys = counts, keys
+                return
+
+            self.pending, self.pending_keys = None, []
+
+        self.doc_freqs += np.bincount(counts.indices, minlength=self.num_features)
+        self.num_docs += counts.shape[0]
+        tfidf:csr_matrix = self.__tfidf__(counts)
+
+        # Fold a last batch smaller than k into the batch before it (see above)
+        starts:list[int] = list(range(0, len(keys), KMeans_Article_Clustering.fit_batch_size))
+        if len(starts) > 1 and len(keys) - starts[-1] < self.k: starts.pop()
+
+        for i, start in enumerate(starts):
+            end:int = starts[i + 1] if i + 1 < len(starts) else len(keys)
+            self.model.partial_fit(tfidf[start:end])
+
+        self.trained.update(keys)
+
+    ''' __newRows__(articles) - get the rows of the given articles the model was not updated with (and that are not waiting for the first fit)
+        :return list of rows
+    '''
+    def __newRows__(self, articles:list[RSS_Article]) -> list[int]:
+        pendingKeys:set[str] = set(self.pending_keys)
+        keys:list[str] = [Seen_Article_Index.articleKey(a.article_link) for a in articles]
+        return [i for i, key in enumerate(keys) if key not in self.trained and key not in pendingKeys]
+
+    ''' __assign__(articles, counts) - assign the given articles to the nearest centroids
+        :return (the cluster id of every article, the list of the k clusters)
+    '''
+    def __assign__(self, articles:list[RSS_Article], counts:csr_matrix) -> tuple[np.ndarray, list[ArticleCluster]]:
+        if not self.__isFit__(): return np.full(len(articles), -1, dtype=np.int32), []
+
+        tfidf:csr_matrix = self.__tfidf__(counts)
+        labels:np.ndarray = self.model.predict(tfidf)
+        distances:np.ndarray = self.model.transform(tfidf)[np.arange(len(articles)), labels]
+
+        clusters:list[ArticleCluster] = []
+        for c, centroid in enumerate(self.model.cluster_centers_):
+            topFeatures = [f for f in np.argsort(centroid)[::-1][:10] if centroid[f] > 0]
+            clusters.append(ArticleCluster(c, centroid, [self.term_for_feature.get(int(f), f"#{f}") for f in topFeatures]))
+
+        # Closest first, so every add() is an append
+        for i in np.argsort(distances, kind='stable'): clusters[labels[i]].add(articles[i], float(distances[i]))
+        return labels, clusters
+
+    def __isFit__(self) -> bool: return hasattr(self.model, 'cluster_centers_')
@@ -29,8 +29,11 @@ The program is completely autonomous and does not require user interaction after
     
     2. Initialize all RSS feeds - initialize the RSS_Feed objects locally using the respective classes located in "FP_Classes/Feeds/". During this step, the 
                                   articles for each RSS feed are collected and their contents preprocessed and tagged using the predefined keywords/tags. The 
-                                  script first reaches out to the DB to get a list of the article titles that we have already processed for this RSS feed to avoid
-                                  wasting resources and time on duplicates. 
+                                  script first reaches out to the DB to get an index of the articles (by link) that we have already processed to avoid
+                                  wasting resources and time on duplicates. The feeds are initialized concurrently by Feed_Scheduler using at most 
+                                  "thread-limit" (see config.json) worker threads. Once all of the feeds are initialized, Article_Fetcher downloads the 
+                                  content for the new articles from every feed at once over a shared pool of keep-alive connections. Feed links are 
+                                  polled with conditional requests (see Feed_Cache) so feeds that have not changed since the last run are skipped. 
 
     3. Clustering analysis - Not yet completed. 
     
@@ -45,7 +48,17 @@ The program is completely autonomous and does not require user interaction after
 # General imports 
 from FP_Classes.RSS_Feed import RSS_Feed, RSS_Article
 from FP_Classes.RSS_DB_Connection import RSS_DB_Connection
+from FP_Classes.Feed_Scheduler import Feed_Scheduler
+from FP_Classes.Article_Fetcher import Article_Fetcher
+from FP_Classes.Feed_Cache import Feed_Cache
+from FP_Classes.Page_Cache import Page_Cache
+from FP_Classes.Local_Index import Local_Index
+from FP_Classes.Duplicate_Index import Duplicate_Index
+from FP_Classes.Related_Index import Related_Index
 from FP_Classes.Tag import Tag
+from FP_Classes.Tag_Cache import Tag_Cache
+from FP_Classes.Term_Matrix import Term_Matrix
+from FP_Classes.Text_Preprocessor import Text_Preprocessor
 import json
 
 # Imports for cluster analysis 
@@ -84,76 +97,94 @@ except Exception as e:
 dbConn = RSS_DB_Connection(
             username=db_creds['username'],
             password=db_creds['password'],
-            host=db_creds['host']
+            host=db_creds['host'],
+            pool_size=config['db-pool-size'],
+            batch_size=config['db-batch-size']
         )
 
 # Get all tags and update DB 
 allTags:list[Tag] = []
 for d in json.load(open(configDir + config['tags-json-file'])): allTags.append(Tag.tagFromDict(d))
 
-if not dbConn.newTagsFromExcel(configDir + config['update-tags-filepath']): print("CRITICAL ERROR: There was an error adding tags to the DB. Moving on without updating remote DB.")
-else: print("SUCCESS: DB tags updated successfully.")
+# Only load the tags file into the DB if it changed since the last run
+tagCache = Tag_Cache(config['cache-dir'] + "tag_cache.json")
+tagsFilePath:str = configDir + config['update-tags-filepath']
+
+if not tagCache.fileChanged(tagsFilePath): print("NOTICE: The tags file has not changed since the last run. Skipping the DB tags update.")
+elif not dbConn.newTagsFromExcel(tagsFilePath): print("CRITICAL ERROR: There was an error adding tags to the DB. Moving on without updating remote DB.")
+else:
+    tagCache.markFile(tagsFilePath)
+    print("SUCCESS: DB tags updated successfully.")
 
 # ------------------------------------------------------------------------------ #
 # 2. Initialize all Feed objects 
 
-# BleepingComputer
-bc_seen_articles = dbConn.getAllArticleTitles(feedTitle=BleepingComputerRSS.BC_FeedTitle)
-print(f"NOTICE: Initializing BleepingComputer - the DB currently already contains {len(bc_seen_articles)} BleepingComputer articles.")
-bleepingComputerRss = BleepingComputerRSS(seen_article_titles=bc_seen_articles)
-
-# Censys Global Reach
-cens_seen_articles = dbConn.getAllArticleTitles(feedTitle=CensysRSS.CS_FeedTitle)
-print(f"NOTICE: Initializing Censys Global Reach - the DB currently already contains {len(cens_seen_articles)} Censys Global Reach articles.")
-censysRss = CensysRSS(seen_article_titles=cens_seen_articles)
-
-# Censys Director Blog
-censdir_seen_articles = dbConn.getAllArticleTitles(feedTitle=CensysDirRSS.CS_FeedTitle)
-print(f"NOTICE: Initializing Censys Director Blog - the DB currently already contains {len(censdir_seen_articles)} Censys Director Blog articles.")
-censysDirRss = CensysDirRSS(seen_article_titles=censdir_seen_articles)
-
-# Department of Defense
-dod_seen_articles = dbConn.getAllArticleTitles(feedTitle=DefenseDeptRSS.DoD_FeedTitle)
-print(f"NOTICE: Initializing DOD RSS - the DB currently already contains {len(dod_seen_articles)} DOD RSS articles.")
-defenseDeptRss = DefenseDeptRSS(seen_article_titles=dod_seen_articles)
-
-# Microsoft 
-ms_seen_articles = dbConn.getAllArticleTitles(feedTitle=MicrosoftRSS.MS_FeedTitle)
-print(f"NOTICE: Initializing Microsoft RSS - the DB currently already contains {len(ms_seen_articles)} Microsoft RSS articles.")
-microsoftRss = MicrosoftRSS(seen_article_titles=ms_seen_articles)
-
-# National Vulnerability Database (NVD)
-nvd_seen_articles = dbConn.getAllArticleTitles(feedTitle=NVD_RSS.NVD_FeedTitle)
-print(f"NOTICE: Initializing NVD - the DB currently already contains {len(nvd_seen_articles)} NVD articles.")
-nvdRss = NVD_RSS(seen_article_titles=nvd_seen_articles)
-
-# National Institute of Science and Technology (NIST)
-nist_seen_articles = dbConn.getAllArticleTitles(feedTitle=NIST_RSS.NIST_FeedTitle)
-print(f"NOTICE: Initializing NIST - the DB currently already contains {len(nist_seen_articles)} NIST articles.")
-nistRss = NIST_RSS(seen_article_titles=nist_seen_articles)
-
-# State Department
-sd_seen_articles = dbConn.getAllArticleTitles(feedTitle=StateDeptRSS.SD_FeedTitle)
-print(f"NOTICE: Initializing State Dept - the DB currently already contains {len(sd_seen_articles)} State Dept articles.")
-stateDeptRss = StateDeptRSS(seen_article_titles=sd_seen_articles)     
-
-# Hacker News 
-hn_seen_articles = dbConn.getAllArticleTitles(feedTitle=HackerNewsRSS.HN_FeedTitle)
-print(f"NOTICE: Initializing Hacker News - the DB currently already contains {len(hn_seen_articles)} Hacker News articles.")
-hackernewsRss = HackerNewsRSS(seen_article_titles=hn_seen_articles)
+# All of the RSS feed classes and their feed titles
+allFeedClasses:list[tuple[type, str]] = [
+    (BleepingComputerRSS, BleepingComputerRSS.BC_FeedTitle),    # BleepingComputer
+    (CensysRSS, CensysRSS.CS_FeedTitle),                        # Censys Global Reach
+    (CensysDirRSS, CensysDirRSS.CS_FeedTitle),                  # Censys Director Blog
+    (DefenseDeptRSS, DefenseDeptRSS.DoD_FeedTitle),             # Department of Defense
+    (MicrosoftRSS, MicrosoftRSS.MS_FeedTitle),                  # Microsoft
+    (NVD_RSS, NVD_RSS.NVD_FeedTitle),                           # National Vulnerability Database (NVD)
+    (NIST_RSS, NIST_RSS.NIST_FeedTitle),                        # National Institute of Science and Technology (NIST)
+    (StateDeptRSS, StateDeptRSS.SD_FeedTitle),                  # State Department
+    (HackerNewsRSS, HackerNewsRSS.HN_FeedTitle)                 # Hacker News
+]
+
+# Poll the feed links with conditional requests so feeds that have not changed since the last run are skipped
+RSS_Feed.feed_cache = Feed_Cache(config['cache-dir'] + "feed_cache.json")
+
+# Cache the article pages on disk so reruns and the clustering techniques do not request them again (see Page_Cache)
+RSS_Article.page_cache = Page_Cache(config['cache-dir'] + "page_cache", maxBytes=config['page-cache-max-mb'] * 2**20, ttl=config['page-cache-ttl'])
+
+# Schedule every feed, then initialize them all concurrently (bounded by "thread-limit" in the config)
+scheduler = Feed_Scheduler(threadLimit=config['thread-limit'])
+
+# Get the index of the articles we've already seen (the local copy from the last run + the rows added to the DB since then)
+seenIndexPath:str = config['cache-dir'] + "seen_articles.json"
+seenIndex = dbConn.getSeenArticleIndex(cachePath=seenIndexPath)
+
+# Load the local inverted index so searches (see RSS_DB_Connection.query_articles) do not need a round trip to the DB. It is only used
+# once it covers every stored article (the first run fills it from the DB), then dbConn keeps it up to date as articles are stored
+localIndexPath:str = config['cache-dir'] + "local_index.json"
+localIndex:Local_Index = Local_Index.load(localIndexPath) or Local_Index()
+if dbConn.fillLocalIndex(localIndex): dbConn.local_index = localIndex
+else: print("NOTICE: The local index could not be filled from the DB. Searches will use the DB.")
+
+# Load the related articles index (updated by dbConn.addArticles() as articles are stored)
+relatedIndexPath:str = config['cache-dir'] + "related_index"
+relatedIndex:Related_Index = Related_Index.load(relatedIndexPath) or Related_Index()
+dbConn.related_index = relatedIndex
+
+# Load the MinHash index of the stored articles for dropping near-duplicate articles across feeds
+duplicateIndexPath:str = config['cache-dir'] + "duplicate_index"
+duplicateIndex:Duplicate_Index = Duplicate_Index.load(duplicateIndexPath, config['duplicate-threshold']) or Duplicate_Index(config['duplicate-threshold'])
+
+# Open the stored document-term matrix(appended to as articles are stored) for the clustering techniques
+termMatrix = Term_Matrix(config['cache-dir'] + "term_matrix")
+
+for feedClass, feedTitle in allFeedClasses: 
+    print(f"NOTICE: Scheduling {feedTitle} - the DB currently already contains {seenIndex.countForFeed(feedTitle)} {feedTitle} articles.")
+    scheduler.addFeed(feedClass, seen_articles=seenIndex, process=False)
+
+# Load the NLTK corpora once up front (NLTK's lazy corpus loaders are not thread safe)
+Text_Preprocessor.shared()
 
 # Create a list of all the RSS Feed objects 
-allFeeds:list[RSS_Feed] = [
-    bleepingComputerRss,
-    censysRss,
-    censysDirRss,
-    defenseDeptRss,
-    microsoftRss,
-    nvdRss,
-    nistRss,
-    stateDeptRss, 
-    hackernewsRss
-]
+allFeeds:list[RSS_Feed] = scheduler.run()
+
+# Get the content for the articles from every feed at once over a shared pool of connections
+# NOTE: every request is bounded by connect/read/total deadlines ("max_req_time" is the total) and every feed by "feed-time-budget"
+RSS_Article.total_timeout = config['max_req_time']
+# NOTE: the article content is preprocessed by "preprocess-workers" processes (0 = one per core) while the downloads continue
+fetcher = Article_Fetcher(maxConnections=config['fetch-concurrency'], maxPerHost=config['fetch-per-host'], feedBudget=config['feed-time-budget'],
+                          preprocessWorkers=config['preprocess-workers'])
+fetcher.fetchFeeds(allFeeds)
+
+# Save the cached pages right away, so a run that fails after this point does not download them again
+print(f"[+] {RSS_Article.page_cache.strStats()}")
+RSS_Article.page_cache.save()
 
 # ------------------------------------------------------------------------------ #
 # 3. Clustering Analysis
@@ -174,8 +205,10 @@ print(s)
 # ------------------------------------------------------------------------------ #
 # 4. Section for interacting with the remote DB
             
-# Get all tags from the remote DB incase there are more than what we have locally
-allTags = dbConn.getAllTags()
+# Get all tags from the remote DB incase there are more than what we have locally (only queried if the tag tables changed)
+allTags = tagCache.getTags(dbConn)
+
+storedArticles:list[RSS_Article] = []     # The articles stored in the DB during this run
 
 for feed in allFeeds: 
     
@@ -185,13 +218,46 @@ for feed in allFeeds:
         print(f"ERROR: There was an error adding the feed {feed} to the DB. Skipping the rest of this feed.")
         continue
     
+    # Drop the near-duplicates of stored articles (i.e. the same story from another feed) so the same content is not stored, indexed
+    # or clustered again, and record them in the seen index (apart from the stored articles) so they are not fetched again either
+    feed.articles, duplicates = duplicateIndex.filterDuplicates(feed.articles)
+    for a, original, similarity in duplicates:
+        print(f"\tNOTICE: \"{a.article_title}\" is a near-duplicate of \"{original[1]}\" from {original[0]} (similarity = {similarity}). Skipping.")
+    seenIndex.addDuplicates([d[0] for d in duplicates])
+
     # Add these articles to the running list of all articles
     allArticles.extend(feed.articles)
 
     # Try to add these articles to the DB
     if dbConn.addArticles(feed.articles): print(f"\tSuccessfully added articles for {feed.feed_title}.")
-    else: print(f"\tThere was some error adding the articles for {feed.feed_title}. Moving on.")
+    else: 
+        print(f"\tThere was some error adding the articles for {feed.feed_title}. Moving on.")
+        continue
     
+    # Add the stored articles to the document-term matrix (the local inverted index is updated by dbConn.addArticles())
+    termMatrix.addArticles(feed.articles)
+    storedArticles.extend(feed.articles)
+
+    # Only mark this feed's links as seen once its articles are stored (and none of them failed to fetch) so they are retried next run
+    if not [f for f in fetcher.failures if f.feed_title == feed.feed_title]: RSS_Feed.feed_cache.commit(feed.polled_links)
+
+# Update the topic model with only this run's stored articles, then write their topics back to the DB
+topicModel = Online_LDA_Clustering(config['cache-dir'] + "lda", num_topics=config['lda-num-topics'])
+topicAssignments:list[tuple] = topicModel.update(storedArticles)
+if topicAssignments and topicModel.save(): dbConn.addArticleTopics(topicAssignments)
+
+# Assign this run's stored articles to the existing k-means clusters, then update the clusters with them
+kMeans = KMeans_Article_Clustering([], k=config['kmeans-k'], directory=config['cache-dir'] + "kmeans")
+for cluster in kMeans.update(storedArticles): print(f"\tNOTICE: {len(cluster)} new articles in cluster {cluster.cluster_id} ({', '.join(cluster.top_terms[:5])})")
+
+# Save the validators for the feeds that were stored successfully and the index of the stored articles for the next run
+RSS_Feed.feed_cache.save()
+seenIndex.save(seenIndexPath)
+localIndex.save(localIndexPath)
+duplicateIndex.save(duplicateIndexPath)
+relatedIndex.save(relatedIndexPath)
+tagCache.save()
+
 # Success message
 print("[+] SUCCESS: All threads for classifying articles in feeds are complete.")
 
@@ -204,5 +270,8 @@ if config['local-save']:
     for feed in allFeeds: 
         feed.to_excel(config['local-save'], feed.feed_title.replace(" ", "_") + ".csv")
         feed.articleTagsToCSV(config['local-save'], feed.feed_title.replace(" ", "_") + "-articleTags.csv")
+    
+    # Keep a record of the articles that could not be fetched (timeouts, bad status codes, etc.)
+    if fetcher.failures: fetcher.failuresToCSV(config['local-save'] + "fetch-failures.csv")
 
 print("\nDONE. Check output for errors or more details.")
\ No newline at end of file